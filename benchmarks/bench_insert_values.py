@@ -0,0 +1,96 @@
+"""
+Rows/sec of turning an INSERT ... VALUES statement into data ready for the storage writer.
+
+current path: sqlglot parse_one of every literal, row-wise values + pandas astype (the former InsertPlan.to_dataframe)
+new path:     SqlParser literal scanner + typed columnar Arrow build (InsertPlan.to_arrow)
+
+    PYTHONPATH=src python benchmarks/bench_insert_values.py --rows 100000
+"""
+import argparse
+import time
+import pandas as pd
+import pyarrow as pa
+from sqlglot import exp, parse_one
+
+from tiny_otf.config import SQL_TO_PANDAS_TYPES
+from tiny_otf.sql_parser import SqlParser
+
+SCHEMA = pa.schema([("first_name", pa.string()),
+                    ("last_name", pa.string()),
+                    ("age", pa.int64()),
+                    ("hire_date", pa.date32()),
+                    ("is_active", pa.bool_())])
+
+
+def insert_sql(n_rows: int) -> str:
+    rows = ", ".join(f"('first_{i}', 'last_{i}', {i % 90}, DATE '2022-01-{i % 28 + 1:02d}', {'true' if i % 2 else 'false'})"
+                     for i in range(n_rows))
+    return f"INSERT INTO bench (first_name, last_name, age, hire_date, is_active) VALUES {rows}"
+
+
+def row_wise_dataframe(expr: exp.Insert) -> pd.DataFrame:
+    """The former InsertPlan.to_dataframe: values row by row, types inferred from the first row"""
+    column_names = [col.name for col in expr.this.expressions]
+    values, dtypes = [], []
+    for i, row in enumerate(expr.expression.expressions):
+        row_value = []
+        for val in row.expressions:
+            match type(val):
+                case exp.Cast:
+                    row_value.append(val.this.this)
+                    if i == 0:
+                        dtypes.append("DATE")
+                case exp.Literal:
+                    row_value.append(val.this)
+                    if i == 0:
+                        dtypes.append("VARCHAR" if val.is_string else "INT")
+                case exp.Boolean:
+                    row_value.append(val.this)
+                    if i == 0:
+                        dtypes.append("BOOLEAN")
+        values.append(row_value)
+
+    df = pd.DataFrame(values, columns=column_names)
+    for col, col_type in zip(column_names, dtypes):
+        df[col] = df[col].astype(SQL_TO_PANDAS_TYPES[col_type])
+    return df
+
+
+def timed(fn) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def report(name: str, n_rows: int, seconds: float) -> None:
+    print(f"{name:<24}{seconds:8.3f}s {n_rows / seconds:>14,.0f} rows/sec")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    sql = insert_sql(args.rows)
+
+    # current path
+    parse_seconds, expr = timed(lambda: parse_one(sql, dialect="presto"))
+    build_seconds, _ = timed(lambda: row_wise_dataframe(expr))
+    current = parse_seconds + build_seconds
+
+    # new path
+    scan_seconds, plan = timed(lambda: SqlParser("presto", sql).to_plan())
+    arrow_seconds, _ = timed(lambda: plan.to_arrow(SCHEMA))
+    new = scan_seconds + arrow_seconds
+
+    print(f"rows: {args.rows}")
+    report("sqlglot parse", args.rows, parse_seconds)
+    report("pandas build", args.rows, build_seconds)
+    report("current path total", args.rows, current)
+    report("values scan", args.rows, scan_seconds)
+    report("arrow build", args.rows, arrow_seconds)
+    report("new path total", args.rows, new)
+    print(f"speedup: {current / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
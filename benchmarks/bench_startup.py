@@ -0,0 +1,105 @@
+"""
+Startup benchmark: import and initialization time of the CLI and the engine, every sample in a
+fresh interpreter. Besides the time budgets, each stage must not have imported the heavy modules
+it doesn't need (the CLI nothing of pyarrow / sqlglot, the engine no pandas, Minio SDK or
+pyarrow.dataset until a backend is used).
+
+    PYTHONPATH=src python benchmarks/bench_startup.py --repeats 10 --out startup.json
+
+Exits with status 1 when a stage is over its budget or imported a forbidden module.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# stage -> code timed in a fresh interpreter, after `import time`
+STAGES = {
+    "cli_import": "import tiny_otf",
+    "engine_import": "import tiny_otf.engine",
+    "engine_init": "from tiny_otf.engine import TinyEngine; TinyEngine('local_fs')",
+    "first_query": "from tiny_otf.engine import TinyEngine; TinyEngine('local_fs').query('CREATE TABLE startup_t (id INT)')",
+}
+# p50 budget of every stage in milliseconds, scaled with --slack on slow machines
+BUDGETS_MS = {
+    "cli_import": 50,
+    "engine_import": 500,
+    "engine_init": 500,
+    "first_query": 1_500,
+}
+FORBIDDEN_MODULES = {
+    "cli_import": ["pyarrow", "pandas", "sqlglot", "minio"],
+    "engine_import": ["pandas", "minio", "pyarrow.dataset", "pyarrow.fs"],
+    "engine_init": ["pandas", "minio", "pyarrow.dataset", "pyarrow.fs"],
+    "first_query": ["minio"],
+}
+WATCHED_MODULES = sorted({name for names in FORBIDDEN_MODULES.values() for name in names})
+
+SAMPLE = """
+import json, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "modules": [m for m in {watched!r} if m in sys.modules]}}))
+"""
+
+
+def sample(code: str, workdir: Path) -> dict:
+    """Time `code` in a new interpreter running in `workdir`, the result is its last line of output"""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(Path(__file__).parents[1] / "src"),
+                                                        os.environ.get("PYTHONPATH", "")])}
+    process = subprocess.run([sys.executable, "-c", SAMPLE.format(code=code, watched=WATCHED_MODULES)],
+                             cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run_stage(stage: str, repeats: int) -> dict:
+    timings, imported = [], set()
+    for _ in range(repeats):
+        # a clean scratch directory per sample: the first query creates the catalog
+        with tempfile.TemporaryDirectory(prefix="tiny-otf-startup-") as workdir:
+            (Path(workdir) / "src/tiny_otf/table_catalog").mkdir(parents=True)
+            result = sample(STAGES[stage], Path(workdir))
+        timings.append(result["ms"])
+        imported.update(result["modules"])
+    return {"stage": stage,
+            "repeats": repeats,
+            "p50_ms": statistics.median(timings),
+            "max_ms": max(timings),
+            "imported": sorted(imported)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters per stage")
+    parser.add_argument("--slack", type=float, default=1.0, help="multiplier of the time budgets")
+    parser.add_argument("--out", default=None, help="write the results as JSON")
+    args = parser.parse_args()
+
+    results, failures = [], []
+    for stage in args.stages:
+        result = run_stage(stage, args.repeats)
+        result["budget_ms"] = BUDGETS_MS[stage] * args.slack
+        result["forbidden_imported"] = sorted(set(result["imported"]) & set(FORBIDDEN_MODULES[stage]))
+        results.append(result)
+        print(f"{stage:<14} p50 {result['p50_ms']:8.1f} ms  max {result['max_ms']:8.1f} ms  "
+              f"budget {result['budget_ms']:8.1f} ms  imported {result['imported']}", file=sys.stderr)
+        if result["p50_ms"] > result["budget_ms"]:
+            failures.append(f"{stage}: p50 {result['p50_ms']:.1f} ms over the {result['budget_ms']:.1f} ms budget")
+        if result["forbidden_imported"]:
+            failures.append(f"{stage}: imported {result['forbidden_imported']}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({"python": sys.version, "results": results}, indent=2))
+    for failure in failures:
+        print("FAIL", failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
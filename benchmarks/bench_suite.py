@@ -0,0 +1,288 @@
+"""
+Reproducible benchmarks of the engine: SQL parsing, INSERT, full and filtered SELECT, bulk append
+and catalog commits, on synthetic tables of 1k to 10M rows in several file / partition layouts,
+against LocalFSDataStorage and MinioDataStorage over an in-process S3 stand-in (a local
+directory behind the S3 code path, no network latency).
+Everything runs in a scratch directory, results (rows/sec, p50/p99 latency, peak RSS) go to JSON.
+
+    PYTHONPATH=src python benchmarks/bench_suite.py run --sizes 1000 100000 1000000 --out bench.json
+    PYTHONPATH=src python benchmarks/bench_suite.py compare baseline.json bench.json --threshold 0.15
+
+`compare` exits with status 1 when a benchmark got slower than the threshold allows.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator
+import numpy as np
+import pyarrow as pa
+import pyarrow.fs as fs
+
+from tiny_otf.engine import TinyEngine
+from tiny_otf.sql_parser import SqlParser
+
+BACKENDS = ["local_fs", "s3_stand_in"]
+# layout -> (number of appends, i.e. files per partition, partition transforms)
+LAYOUTS = {
+    "1-file": (1, None),
+    "16-files": (16, None),
+    "bucketed": (4, ["bucket(8, k)"]),
+}
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+APPEND_BATCH_ROWS = 100_000
+SEED = 42
+
+
+class PeakRss:
+    """Peak resident memory while the block runs, sampled from /proc (ru_maxrss elsewhere)"""
+    INTERVAL = 0.005
+
+    def __init__(self):
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:  # not Linux: the process-wide peak, in KB on Linux and bytes on macOS
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self.current())
+            time.sleep(self.INTERVAL)
+
+    def __enter__(self) -> "PeakRss":
+        self.peak_bytes = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.current())
+
+
+def measure(fn: Callable[[], int | None], repeats: int) -> dict:
+    """Time `fn` (returning the number of rows it processed) over `repeats` runs"""
+    latencies, rows = [], 0
+    with PeakRss() as rss:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rows = fn() or 0
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    return {"repeats": repeats,
+            "rows_per_sec": rows / p50 if rows and p50 else None,
+            "p50_ms": p50 * 1000,
+            "p99_ms": latencies[min(len(latencies) - 1, int(round(0.99 * (len(latencies) - 1))))] * 1000,
+            "peak_rss_mb": rss.peak_bytes / 2**20}
+
+
+def synthetic_batches(n_rows: int, start: int = 0) -> Iterator[pa.RecordBatch]:
+    """Deterministic rows: sequential ids, a low cardinality int, a double, a string and a date"""
+    rng = np.random.default_rng(SEED + start)
+    for offset in range(start, start + n_rows, APPEND_BATCH_ROWS):
+        n = min(APPEND_BATCH_ROWS, start + n_rows - offset)
+        ids = np.arange(offset, offset + n)
+        yield pa.record_batch({
+            "id": ids,
+            "k": rng.integers(0, 100, n),
+            "v": rng.random(n),
+            "s": pa.array(np.char.add("name_", (ids % 1000).astype(str))),
+            "d": pa.array(20000 + ids % 365, pa.int32()).cast(pa.date32()),
+        })
+
+
+def insert_sql(table_name: str, n_rows: int, start: int) -> str:
+    rows = ", ".join(f"({i}, {i % 100}, {i * 0.5}, 'name_{i % 1000}', DATE '2025-01-{i % 28 + 1:02d}')"
+                     for i in range(start, start + n_rows))
+    return f"INSERT INTO {table_name} (id, k, v, s, d) VALUES {rows}"
+
+
+def create_sql(table_name: str, partitioning: list[str] | None) -> str:
+    sql = f"CREATE TABLE {table_name} (id BIGINT, k INT, v DOUBLE, s VARCHAR, d DATE)"
+    if partitioning:
+        sql += " WITH (partitioning = ARRAY[{}])".format(", ".join(f"'{spec}'" for spec in partitioning))
+    return sql
+
+
+def make_engine(backend: str, workdir: Path) -> TinyEngine:
+    if backend == "local_fs":
+        return TinyEngine("local_fs")
+    (workdir / "s3" / "bench").mkdir(parents=True, exist_ok=True)
+    return TinyEngine("minio",
+                      filesystem=fs.SubTreeFileSystem(str(workdir / "s3"), fs.LocalFileSystem()),
+                      bucket_name="bench",
+                      cache_dir=None)
+
+
+def run_table(engine: TinyEngine, backend: str, layout: str, size: int, args) -> list[dict]:
+    appends, partitioning = LAYOUTS[layout]
+    table_name = f"{backend}_{layout.replace('-', '_')}_{size}"
+    results = []
+
+    def record(name: str, result: dict) -> None:
+        results.append({"name": name, "backend": backend, "layout": layout, "rows": size, **result})
+        print(f"{name:<16}{backend:<13}{layout:<10}{size:>10,} rows  p50 {result['p50_ms']:10.1f} ms  "
+              f"p99 {result['p99_ms']:10.1f} ms  {result['rows_per_sec'] or 0:>14,.0f} rows/s  "
+              f"peak {result['peak_rss_mb']:8.1f} MB", file=sys.stderr)
+
+    engine.query(create_sql(table_name, partitioning))
+
+    # load the table, one commit (one file per partition) per append
+    per_append = -(-size // appends)
+    def load() -> int:
+        for i in range(appends):
+            engine.append(table_name, synthetic_batches(min(per_append, size - i * per_append), i * per_append))
+        return size
+    record("append", measure(load, 1))
+
+    full = SqlParser("presto", f"SELECT * FROM {table_name}").to_plan()
+    record("select_full", measure(lambda: engine.execute(full, "arrow").num_rows, args.repeats))
+    # ~1% of the rows, files and row groups are pruned on the id statistics
+    filtered = SqlParser("presto", f"SELECT id, v FROM {table_name} WHERE id < {max(1, size // 100)} AND k < 50").to_plan()
+    def select_filtered() -> int:
+        engine.execute(filtered, "arrow")
+        return size  # rows of the table, so pruning shows up as throughput
+    record("select_filter", measure(select_filtered, args.repeats))
+
+    # parse and insert a VALUES statement, capped so the SQL text stays reasonable
+    sql_rows = min(size, args.max_sql_rows)
+    sql = insert_sql(table_name, sql_rows, size)
+    record("parse_insert", {**measure(lambda: SqlParser("presto", sql).to_plan() and sql_rows, args.repeats), "sql_rows": sql_rows})
+    plans = iter([SqlParser("presto", insert_sql(table_name, sql_rows, size + (i + 1) * sql_rows)).to_plan()
+                  for i in range(args.repeats)])
+    record("insert", {**measure(lambda: engine._execute_insert(next(plans)) or sql_rows, args.repeats), "sql_rows": sql_rows})
+    return results
+
+
+def run_commits(engine: TinyEngine, backend: str, args) -> dict:
+    """Latency of a manifest commit of one more file, the data file itself is not rewritten"""
+    table_name = f"{backend}_commits"
+    engine.query(create_sql(table_name, None))
+    engine.append(table_name, synthetic_batches(1_000))
+    template = engine.catalog.get_manifest(table_name).files[0]
+    counter = iter(range(args.commits))
+    def commit() -> None:
+        data_file = replace(template, path=f"{template.path}.{next(counter)}")
+        engine.catalog.append_files(table_name, [data_file])
+    result = {"name": "catalog_commit", "backend": backend, "layout": None, "rows": None, **measure(commit, args.commits)}
+    print(f"{'catalog_commit':<16}{backend:<13}p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms", file=sys.stderr)
+    return result
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"started": datetime.now(timezone.utc).isoformat(),
+            "git_commit": commit,
+            "python": platform.python_version(),
+            "pyarrow": pa.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+
+def run(args) -> None:
+    out = Path(args.out).absolute()
+    workdir = Path(tempfile.mkdtemp(prefix="tiny_otf_bench_"))
+    cwd = os.getcwd()
+    os.chdir(workdir)  # the catalog and the local storage live under relative paths
+    report = {"environment": environment(),
+              "config": {"sizes": args.sizes, "layouts": args.layouts, "backends": args.backends,
+                         "repeats": args.repeats, "max_sql_rows": args.max_sql_rows, "commits": args.commits},
+              "results": []}
+    devnull = open(os.devnull, "w")
+    try:
+        with contextlib.redirect_stdout(devnull):  # the engine reports progress on stdout, results go to stderr
+            for backend in args.backends:
+                engine = make_engine(backend, workdir)
+                report["results"].append(run_commits(engine, backend, args))
+                for size in args.sizes:
+                    for layout in args.layouts:
+                        report["results"].extend(run_table(engine, backend, layout, size, args))
+    finally:
+        devnull.close()
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out}", file=sys.stderr)
+
+
+def compare(args) -> int:
+    """
+    Flag benchmarks whose p50 latency grew by more than the threshold (and by at least
+    `min_delta_ms`, so timer noise of millisecond operations isn't reported)
+    """
+    def by_key(path: str) -> dict:
+        results = json.loads(Path(path).read_text())["results"]
+        return {(r["name"], r["backend"], r["layout"], r["rows"]): r for r in results}
+    baseline, current = by_key(args.baseline), by_key(args.current)
+
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys(), key=str):
+        before, after = baseline[key], current[key]
+        change = after["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        regressed = change > args.threshold and after["p50_ms"] - before["p50_ms"] >= args.min_delta_ms
+        regressions += regressed
+        name, backend, layout, rows = key
+        print(f"{'REGRESSION' if regressed else 'ok':<11}{name:<16}{backend:<13}{layout or '':<10}{rows or '':>10}  "
+              f"p50 {before['p50_ms']:10.1f} -> {after['p50_ms']:10.1f} ms ({change:+.0%})  "
+              f"peak {before['peak_rss_mb']:.0f} -> {after['peak_rss_mb']:.0f} MB")
+    for key in sorted(baseline.keys() ^ current.keys(), key=str):
+        print(f"{'missing':<11}{key} only in {'baseline' if key in baseline else 'current'}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write the results as JSON")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="table sizes in rows, up to 10M")
+    run_parser.add_argument("--layouts", nargs="+", choices=list(LAYOUTS), default=list(LAYOUTS))
+    run_parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    run_parser.add_argument("--repeats", type=int, default=5, help="runs of every timed operation")
+    run_parser.add_argument("--max-sql-rows", type=int, default=10_000, help="rows of the parsed / inserted VALUES statements")
+    run_parser.add_argument("--commits", type=int, default=50, help="timed catalog commits per backend")
+    run_parser.add_argument("--out", default="bench.json")
+    run_parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="allowed p50 slowdown, 0.15 = 15%%")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=2.0, help="smallest p50 slowdown reported")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,49 @@
-from tiny_otf.sql_parser import SqlParser
-from tiny_otf.engine import TinyEngine
+import argparse
+from datetime import datetime
+from tiny_otf.config import CATALOG_BACKEND, COMPACTION_TARGET_FILE_SIZE, STORAGE_TYPE
+
+# the engine (pyarrow, sqlglot) is imported by the commands that need it, `tiny-otf --help` stays instant
 
 def main() -> None:
+    parser = argparse.ArgumentParser(prog="tiny-otf")
+    parser.add_argument("--storage", default=STORAGE_TYPE, help="Storage type: local_fs or minio")
+    parser.add_argument("--catalog", default=CATALOG_BACKEND, help="Catalog backend: sqlite or json_log")
+    subparsers = parser.add_subparsers(dest="command")
+
+    compact_parser = subparsers.add_parser("compact", help="Merge small data files of a table per partition")
+    compact_parser.add_argument("table", help="Table name")
+    compact_parser.add_argument("--target-size", type=int, default=COMPACTION_TARGET_FILE_SIZE,
+                                help="Target size of the merged files in bytes")
+    compact_parser.add_argument("--sort-by", default=None,
+                                help="Comma separated columns to sort the merged files by")
+
+    expire_parser = subparsers.add_parser("expire", help="Expire old snapshots of a table and delete unreferenced files")
+    expire_parser.add_argument("table", help="Table name")
+    expire_parser.add_argument("--older-than", type=datetime.fromisoformat, default=None,
+                               help="Expire snapshots committed before this UTC timestamp (default: 7 days ago)")
+    expire_parser.add_argument("--retain-last", type=int, default=1,
+                               help="Number of most recent snapshots always kept")
+
+    args = parser.parse_args()
+    from tiny_otf.engine import TinyEngine
+
+    match args.command:
+        case "compact":
+            engine = TinyEngine(args.storage, args.catalog)
+            sort_by = args.sort_by.split(",") if args.sort_by else None
+            print(engine.compact(args.table, target_file_size=args.target_size, sort_by=sort_by))
+        case "expire":
+            engine = TinyEngine(args.storage, args.catalog)
+            print(engine.expire_snapshots(args.table, older_than=args.older_than, retain_last=args.retain_last))
+        case _:
+            demo(args.storage, args.catalog)
+
+def demo(storage_type: str = STORAGE_TYPE, catalog_backend: str = CATALOG_BACKEND) -> None:
+    from tiny_otf.engine import TinyEngine
+    from tiny_otf.sql_parser import SqlParser
     print("Hello from tiny-otf!")
 
-    engine = TinyEngine()
+    engine = TinyEngine(storage_type, catalog_backend)
 
     sqls = [
         "create table test_table (first_name VARCHAR, last_name VARCHAR, age INT)",
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+from typing import Any
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlglot import exp
+
+from tiny_otf.table_catalog.manifest import DataFile
+
+# SQL aggregate -> name of the function in an Aggregate
+AGGREGATE_FUNCTIONS = {exp.Count: "count", exp.Sum: "sum", exp.Min: "min", exp.Max: "max", exp.Avg: "avg"}
+# partial aggregates of single batches are merged once they add up to this many groups
+PARTIAL_MERGE_ROWS = 65536
+
+
+@dataclass
+class Aggregate:
+    """
+    One item of an aggregate SELECT list: an aggregate function of a column (`column` is None
+    for COUNT(*)) or, when `function` is None, a GROUP BY column passed through.
+    """
+    function: str | None  # count, sum, min, max, avg
+    column: str | None
+    name: str  # output column
+    table: str | None = None  # qualifier of the column, e.g. `c` of `MAX(c.age)`
+
+    @staticmethod
+    def from_expr(node: exp.Expression) -> "Aggregate":
+        # output names follow the SELECT list: the alias, the column name or the call, e.g. `COUNT(*)`
+        name = node.alias if isinstance(node, exp.Alias) else node.sql()
+        node = node.unalias()
+        if isinstance(node, exp.Column):
+            return Aggregate(None, node.name, name if name != node.sql() else node.name, node.table or None)
+
+        function = AGGREGATE_FUNCTIONS.get(type(node))
+        if function is None:
+            raise NotImplementedError(f"Unsupported expression in aggregate SELECT: {node.sql()}")
+        if isinstance(node.this, exp.Star) and function == "count":
+            return Aggregate("count", None, name)
+        if isinstance(node.this, exp.Distinct):
+            raise NotImplementedError(f"DISTINCT aggregates are not supported yet: {node.sql()}")
+        if not isinstance(node.this, exp.Column):
+            raise NotImplementedError(f"Only aggregates of a single column are supported: {node.sql()}")
+        return Aggregate(function, node.this.name, name, node.this.table or None)
+
+    @property
+    def partials(self) -> list[tuple[str, pc.FunctionOptions | None, str]]:
+        """(per batch function, its options, function merging the partial results) of the aggregate"""
+        match self.function:
+            case "count":
+                return [("count", pc.CountOptions(mode="all" if self.column is None else "only_valid"), "sum")]
+            case "sum":
+                return [("sum", None, "sum")]
+            case "min" | "max":
+                return [(self.function, None, self.function)]
+            case "avg":
+                return [("sum", None, "sum"), ("count", None, "sum")]
+        return []
+
+
+class StreamingAggregator:
+    """
+    Aggregate record batches as they stream in: every batch is reduced to per-group partial
+    aggregates (counts, sums, mins, maxes) with `Table.group_by`, and the partials are merged
+    the same way whenever they pile up. Memory grows with the number of groups, not rows.
+    """
+    def __init__(self, group_by: list[str], aggregates: list[Aggregate], schema: pa.Schema):
+        self.group_by = group_by
+        self.aggregates = [a for a in aggregates if a.function is not None]
+        self.outputs = aggregates
+        self.schema = schema
+        self._partials: list[pa.Table] = []
+        self._partial_rows = 0
+
+    def _partial_specs(self, merge: bool) -> list[tuple[str, str, pc.FunctionOptions | None]]:
+        specs = []
+        for i, aggregate in enumerate(self.aggregates):
+            for j, (function, options, merge_function) in enumerate(aggregate.partials):
+                name = f"__p{i}_{j}"
+                specs.append((name, merge_function, None) if merge else (name, function, options))
+        return specs
+
+    def _reduce(self, table: pa.Table, merge: bool) -> pa.Table:
+        specs = self._partial_specs(merge)
+        result = table.group_by(self.group_by, use_threads=False).aggregate(
+            [(name, function, options) if options else (name, function) for name, function, options in specs])
+        # `<name>_<function>` back to `<name>`, so partials merge into the same columns
+        return result.rename_columns([name.rsplit("_", 1)[0] if name.startswith("__p") else name
+                                      for name in result.column_names])
+
+    def update(self, batch: pa.RecordBatch) -> None:
+        names = {name.upper(): name for name in batch.schema.names}
+        columns = {key: batch.column(names[key.upper()]) for key in self.group_by}
+        for i, aggregate in enumerate(self.aggregates):
+            # COUNT(*) counts the rows of any column, nulls included
+            source = batch.column(names[aggregate.column.upper()] if aggregate.column else 0)
+            for j in range(len(aggregate.partials)):
+                columns[f"__p{i}_{j}"] = source
+        self._partials.append(self._reduce(pa.table(columns), merge=False))
+        self._partial_rows += self._partials[-1].num_rows
+        if self._partial_rows >= PARTIAL_MERGE_ROWS and len(self._partials) > 1:
+            self._merge()
+
+    def _merge(self) -> None:
+        merged = self._reduce(pa.concat_tables(self._partials), merge=True)
+        self._partials, self._partial_rows = [merged], merged.num_rows
+
+    def result(self) -> pa.Table:
+        if not self._partials:  # no rows: an empty group-by result, or one row for a global aggregate
+            self.update(pa.RecordBatch.from_pylist([], schema=self.schema))
+        self._merge()
+        partials = self._partials[0]
+
+        keys = {key.upper(): key for key in self.group_by}
+        columns, names = [], []
+        aggregate_index = 0
+        for output in self.outputs:
+            if output.function is None:
+                columns.append(partials.column(keys[output.column.upper()]))
+            else:
+                i, aggregate_index = aggregate_index, aggregate_index + 1
+                value = partials.column(f"__p{i}_0")
+                if output.function == "avg":
+                    value = pc.divide(pc.cast(value, pa.float64()), pc.cast(partials.column(f"__p{i}_1"), pa.float64()))
+                columns.append(value)
+            names.append(output.name)
+        return pa.table(columns, names=names)
+
+
+def _stat_value(value: Any, arrow_type: pa.DataType) -> pa.Scalar:
+    """Manifest statistic (json, dates as ISO strings) as a scalar of the column type"""
+    return pa.scalar(value).cast(arrow_type)
+
+
+def aggregate_from_stats(aggregates: list[Aggregate],
+                         files: list[DataFile],
+                         field_types: dict[str, pa.DataType]) -> pa.Table | None:
+    """
+    Answer COUNT(*), COUNT(col), MIN and MAX over whole files from the manifest: row counts,
+    null counts and min/max statistics, without reading any data pages.
+    Returns None when an aggregate needs statistics that aren't recorded, or that still
+    cover rows deleted since the file was written.
+    """
+    types = {name.upper(): arrow_type for name, arrow_type in field_types.items()}
+    columns = []
+    for aggregate in aggregates:
+        if aggregate.function not in ("count", "min", "max"):
+            return None
+        if aggregate.column is None:
+            columns.append(pa.array([sum(f.live_count for f in files)], type=pa.int64()))
+            continue
+        if any(f.deleted_count for f in files):
+            return None
+
+        arrow_type = types.get(aggregate.column.upper())
+        stats = [f.column_stats.get(aggregate.column) for f in files]
+        if arrow_type is None or any(s is None or s.get("null_count") is None for s in stats):
+            return None
+        if aggregate.function == "count":
+            columns.append(pa.array([sum(f.record_count - s["null_count"] for f, s in zip(files, stats))], type=pa.int64()))
+            continue
+
+        values = []
+        for data_file, s in zip(files, stats):
+            if s["null_count"] == data_file.record_count:
+                continue  # only NULLs, no min/max
+            if s[aggregate.function] is None:
+                return None
+            values.append(s[aggregate.function])
+        try:
+            scalars = pa.array([_stat_value(v, arrow_type).as_py() for v in values], type=arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            return None
+        columns.append(pa.array([getattr(pc, aggregate.function)(scalars).as_py()], type=arrow_type))
+    return pa.table(columns, names=[a.name for a in aggregates])
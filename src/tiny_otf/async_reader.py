@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import Executor
+import pyarrow as pa
+
+from tiny_otf.config import ASYNC_BUFFERED_BATCHES
+
+
+class AsyncBatchReader:
+    """
+    Async iterator over the record batches of a streamed SELECT result. Batches are pulled
+    from the blocking RecordBatchReader on `executor` threads (object store reads and decoding
+    never run on the event loop), at most `max_buffered_batches` ahead of the consumer: a slow
+    consumer pauses the scan instead of buffering the table.
+
+        async with await engine.query_async(sql, result_format="reader") as batches:
+            async for batch in batches:
+                ...
+    """
+    def __init__(self,
+                 reader: pa.RecordBatchReader,
+                 executor: Executor,
+                 max_buffered_batches: int = ASYNC_BUFFERED_BATCHES):
+        self.schema = reader.schema
+        self._reader = reader
+        self._executor = executor
+        self._max_buffered_batches = max_buffered_batches
+        self._queue: asyncio.Queue | None = None
+        self._producer: asyncio.Task | None = None
+        # the reader is a generator: it's never advanced and closed at the same time
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _next_batch(self) -> pa.RecordBatch | None:
+        with self._lock:
+            if self._closed:
+                return None
+            try:
+                return self._reader.read_next_batch()
+            except StopIteration:
+                return None
+
+    def _close_reader(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._reader.close()
+
+    async def _produce(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = await loop.run_in_executor(self._executor, self._next_batch)
+                await self._queue.put(batch)  # waits while the consumer is behind
+                if batch is None:
+                    return
+        except Exception as error:  # raised to the consumer at its next batch
+            await self._queue.put(error)
+
+    def __aiter__(self) -> "AsyncBatchReader":
+        return self
+
+    async def __anext__(self) -> pa.RecordBatch:
+        if self._producer is None:
+            self._queue = asyncio.Queue(maxsize=self._max_buffered_batches)
+            self._producer = asyncio.create_task(self._produce())
+        item = await self._queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def read_all(self) -> pa.Table:
+        return pa.Table.from_batches([batch async for batch in self], schema=self.schema)
+
+    async def aclose(self) -> None:
+        """Stop the scan, e.g. when the consumer is done before the end of the result"""
+        if self._producer is not None:
+            self._producer.cancel()
+            try:
+                await self._producer
+            except asyncio.CancelledError:
+                pass
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_reader)
+
+    async def __aenter__(self) -> "AsyncBatchReader":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -0,0 +1,41 @@
+import uuid
+from datetime import datetime, timezone
+from tiny_otf.table_catalog.manifest import DataFile
+
+
+def group_by_partition(files: list[DataFile]) -> dict[tuple, list[DataFile]]:
+    """
+    Group data files by their partition values, keeping manifest order within a partition.
+    """
+    partitions: dict[tuple, list[DataFile]] = {}
+    for data_file in files:
+        partitions.setdefault(tuple(sorted(data_file.partition.items())), []).append(data_file)
+    return partitions
+
+
+def plan_compaction(files: list[DataFile], target_file_size: int) -> list[list[DataFile]]:
+    """
+    Bin-pack the small files of one partition into groups of up to `target_file_size` bytes.
+    Files already at the target size and groups of a single file are left alone, unless they
+    have deleted rows: rewriting them folds their deletion vectors in.
+    """
+    groups, current, current_size = [], [], 0
+
+    for data_file in files:
+        if data_file.file_size_bytes >= target_file_size:
+            if data_file.deleted_count:
+                groups.append([data_file])
+            continue
+        if current and current_size + data_file.file_size_bytes > target_file_size:
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(data_file)
+        current_size += data_file.file_size_bytes
+
+    groups.append(current)
+    return [group for group in groups if len(group) > 1 or (group and group[0].deleted_count)]
+
+
+def compacted_file_name() -> str:
+    """Unique name for a compaction output, several can be written within the same second"""
+    return f"compacted_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}.parquet"
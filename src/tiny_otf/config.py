@@ -1,10 +1,33 @@
+import importlib
+from datetime import timedelta
 from enum import Enum
-from tiny_otf.storage.storage import LocalFSDataStorage, MinioDataStorage
 
 
 STORAGE_TYPE = "minio"
 STORAGE_PATH = "data/"
 METADATA_PATH = "src/tiny_otf/table_catalog/table_metadata.json"
+MANIFEST_PATH = "src/tiny_otf/table_catalog/manifests/"
+KEY_INDEX_PATH = "src/tiny_otf/table_catalog/key_index/"
+DELETION_VECTOR_PATH = "src/tiny_otf/table_catalog/deletion_vectors/"
+CATALOG_BACKEND = "sqlite"
+CATALOG_PATHS = {
+    "sqlite": "src/tiny_otf/table_catalog/catalog.db",
+    "json_log": "src/tiny_otf/table_catalog/catalog_log/",
+}
+CATALOG_COMMIT_RETRIES = 20  # compare-and-swap attempts before giving up on a commit
+MANIFEST_CACHE_SIZE = 256  # parsed manifests kept in memory per catalog
+KEY_INDEX_CACHE_BYTES = 256 * 1024 * 1024  # key indexes kept in memory per catalog
+DELETION_VECTOR_CACHE_BYTES = 64 * 1024 * 1024  # deletion vectors kept in memory per catalog
+COMPACTION_TARGET_FILE_SIZE = 128 * 1024 * 1024  # bytes
+SNAPSHOT_RETENTION = timedelta(days=7)  # default age of the snapshots removed by expire_snapshots
+ORPHAN_FILE_MIN_AGE = timedelta(hours=1)  # younger unreferenced files may belong to a commit in flight, never deleted
+SQL_DIALECT = "presto"
+PLAN_CACHE_SIZE = 256  # number of cached statements
+PLAN_CACHE_MAX_SQL_LENGTH = 10_000  # longer statements (batch INSERTs) are not cached
+ASYNC_QUERY_WORKERS = 32  # threads running the blocking parts of execute_async, shared by concurrent queries
+ASYNC_BUFFERED_BATCHES = 4  # batches of an async result read ahead of the consumer
+GROUP_COMMIT_WINDOW = 0.05  # seconds INSERTs into a table are buffered in group commit mode
+GROUP_COMMIT_MAX_ROWS = 100_000  # buffered rows of a table flushed without waiting for the window
 
 SQL_TO_PANDAS_TYPES = {
     "INT": "int64",
@@ -15,9 +38,32 @@ SQL_TO_PANDAS_TYPES = {
     "VARCHAR": "string",
     "TEXT": "string",
     "DATE": "datetime64[ns]",
+    "TIMESTAMP": "datetime64[ns]",
     "BOOLEAN": "bool"
 }
 
+def _sql_to_arrow_types() -> dict:
+    import pyarrow as pa
+    return {
+        "INT": pa.int64(),
+        "INTEGER": pa.int64(),
+        "BIGINT": pa.int64(),
+        "FLOAT": pa.float64(),
+        "DOUBLE": pa.float64(),
+        "VARCHAR": pa.string(),
+        "TEXT": pa.string(),
+        "DATE": pa.date32(),
+        "TIMESTAMP": pa.timestamp("us"),
+        "BOOLEAN": pa.bool_()
+    }
+
+def __getattr__(name: str):
+    # SQL_TO_ARROW_TYPES is built on first access, so that reading the settings doesn't import pyarrow
+    if name == "SQL_TO_ARROW_TYPES":
+        globals()[name] = _sql_to_arrow_types()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 class Plans(Enum):
     """
     Enum for different query plans.
@@ -25,18 +71,63 @@ class Plans(Enum):
     CREATE = "CreateTablePlan"
     INSERT = "InsertPlan"
     SELECT = "SelectPlan"
+    DELETE = "DeletePlan"
+    UPDATE = "UpdatePlan"
+    CTAS = "CTASPlan"
+    INSERT_SELECT = "InsertSelectPlan"
+
+class ResultFormat(Enum):
+    """
+    Result format of a SELECT, conversion happens only at the edge.
+    """
+    READER = "reader"  # streaming pyarrow.RecordBatchReader
+    ARROW = "arrow"  # materialized pyarrow.Table
+    PANDAS = "pandas"  # pandas.DataFrame, kept for backward compatibility
+
+# Backends by name, as "module:class". A backend module (and its dependencies: pyarrow.dataset,
+# the Minio SDK, ...) is only imported once the backend is selected.
+STORAGE_BACKENDS = {
+    "local_fs": "tiny_otf.storage.storage:LocalFSDataStorage",
+    "minio": "tiny_otf.storage.storage:MinioDataStorage",
+}
+CATALOG_BACKENDS = {
+    "sqlite": "tiny_otf.table_catalog.catalog_backend:SqliteCatalogBackend",
+    "json_log": "tiny_otf.table_catalog.catalog_backend:JsonLogCatalogBackend",
+}
 
-class StorageConfig(Enum):
-    LOCAL_FS = LocalFSDataStorage
-    MINIO = MinioDataStorage
+def register_storage_backend(name: str, target: str) -> None:
+    """Make a storage class, given as "module:class", selectable by `name`"""
+    STORAGE_BACKENDS[name.lower()] = target
+
+def register_catalog_backend(name: str, target: str, path: str) -> None:
+    """Make a catalog backend class, given as "module:class", selectable by `name`, stored under `path`"""
+    CATALOG_BACKENDS[name.lower()] = target
+    CATALOG_PATHS[name.lower()] = path
+
+def _load_backend(backends: dict[str, str], name: str, kind: str) -> type:
+    try:
+        module_name, class_name = backends[name.lower()].split(":")
+    except KeyError:
+        raise ValueError(f"Unsupported {kind}: {name}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+def initialize_catalog_backend(backend_type: str = CATALOG_BACKEND):
+    """
+    Initialize the catalog backend, importing the tables of the legacy
+    table_metadata.json the first time it is used.
+    """
+    from tiny_otf.instrumentation import INSTRUMENTATION
+    backend_class = _load_backend(CATALOG_BACKENDS, backend_type, "catalog backend")
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.emit("catalog", backend=backend_type, path=CATALOG_PATHS[backend_type.lower()])
+    return backend_class(CATALOG_PATHS[backend_type.lower()], legacy_path=METADATA_PATH)
 
 def initialize_storage(storage_type: str = STORAGE_TYPE, **kwargs):
     """
     Initialize the storage layer based on the storage configuration.
     """
-    try:
-        storage_config = StorageConfig[storage_type.upper()]
-        print("Initializing storage with type:", storage_type)
-        return storage_config.value(base_path=STORAGE_PATH, **kwargs)
-    except KeyError:
-        raise ValueError(f"Unsupported storage type: {STORAGE_TYPE}")
\ No newline at end of file
+    from tiny_otf.instrumentation import INSTRUMENTATION
+    storage_class = _load_backend(STORAGE_BACKENDS, storage_type, "storage type")
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.emit("storage", type=storage_type, path=STORAGE_PATH)
+    return storage_class(base_path=STORAGE_PATH, **kwargs)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from tiny_otf.table_catalog.deletion_vector import DeletionVector
+
+
+def evaluate(table: pa.Table, expressions: dict[str, pc.Expression]) -> pa.Table:
+    """One column per expression, evaluated on every row of `table`"""
+    import pyarrow.dataset as ds
+    return ds.dataset(table).to_table(columns=expressions)
+
+
+def matching_positions(table: pa.Table,
+                       row_filter: pc.Expression | None,
+                       deletion_vector: DeletionVector | None = None) -> np.ndarray:
+    """
+    Positions of the rows of a data file matching `row_filter` (NULL doesn't match) that aren't
+    deleted yet. `table` holds all rows of the file in file order, e.g. from `scan_files` without deletes.
+    """
+    if row_filter is None:
+        mask = np.ones(table.num_rows, dtype=bool)
+    else:
+        matches = evaluate(table, {"match": row_filter}).column("match")
+        mask = pc.fill_null(matches, False).to_numpy(zero_copy_only=False).copy()
+    if deletion_vector is not None:
+        keep = deletion_vector.keep_mask(0, table.num_rows)
+        if keep is not None:
+            mask &= keep
+    return np.flatnonzero(mask)
+
+
+def updated_rows(rows: pa.Table,
+                 assignments: dict[str, pc.Expression],
+                 schema: pa.Schema) -> pa.Table:
+    """`rows` with the SET `assignments` (by column name) applied, cast to the table `schema`"""
+    values = evaluate(rows, assignments) if assignments else None
+    columns = [values.column(field.name) if field.name in assignments else rows.column(field.name)
+               for field in schema]
+    try:
+        return pa.Table.from_arrays([column.cast(field.type) for column, field in zip(columns, schema)], schema=schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as error:
+        raise ValueError(f"Cannot convert the updated values to the table schema: {error}") from error
@@ -1,28 +1,253 @@
 
-import pandas as pd
-from tiny_otf.sql_parser import BasePlan, CreateTablePlan, InsertPlan, SelectPlan
-from tiny_otf.table_catalog.table_catalog import TableMetadata
-from datetime import datetime
-from tiny_otf.config import SQL_TO_PANDAS_TYPES, initialize_storage
+import asyncio
+import re
+import threading
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Callable, Iterable, Iterator, Sequence
+from tiny_otf.sql_parser import (EXPLAIN_PREFIX, BasePlan, CreateTablePlan, CTASPlan, DeletePlan, ExplainPlan, InsertPlan,
+                                  InsertSelectPlan, SelectPlan, SqlParser, UpdatePlan)
+from tiny_otf.table_catalog.table_catalog import TableMetadata, utc_naive
+from tiny_otf.predicates import (exact_partition_files, literal_value, prune_files, range_may_match, referenced_columns,
+                                 resolve_columns, to_arrow_filter, to_arrow_value)
+from tiny_otf.dml import matching_positions, updated_rows
+from tiny_otf.aggregation import StreamingAggregator, aggregate_from_stats
+from tiny_otf.join import BUILD_ROW, HashJoin, JoinScope, conjuncts
+from tiny_otf.async_reader import AsyncBatchReader
+from tiny_otf.group_commit import GroupCommitter
+from tiny_otf.instrumentation import INSTRUMENTATION, QueryProfile
+from tiny_otf.ingest import AppendSource, conform_to_schema, source_reader, sql_columns
+from tiny_otf.storage.metadata_cache import FOOTER_CACHE
+from tiny_otf.table_catalog.manifest import DEFAULT_PARTITION_FIELD, DataFile, Manifest
+from tiny_otf.table_catalog.deletion_vector import DeletionVector
+from tiny_otf.table_catalog.key_index import KEY_SEPARATOR, KeyIndex, encode_keys, key_hashes, lookup_keys
+from tiny_otf.compaction import compacted_file_name, group_by_partition, plan_compaction
+from tiny_otf.partitioning import PARTITION_FIELDS, PartitionField, parse_partitioning, split_by_partition
+from datetime import date, datetime, timezone
+from sqlglot import exp
+from tiny_otf.config import (ASYNC_QUERY_WORKERS, CATALOG_BACKEND, CATALOG_BACKENDS, COMPACTION_TARGET_FILE_SIZE,
+                             GROUP_COMMIT_MAX_ROWS, ORPHAN_FILE_MIN_AGE, SNAPSHOT_RETENTION, STORAGE_BACKENDS, SQL_DIALECT, SQL_TO_ARROW_TYPES, STORAGE_TYPE,
+                             ResultFormat, initialize_catalog_backend, initialize_storage)
 
 class TinyEngine:
-    def __init__(self):
-        self.catalog = TableMetadata()
-        self.storage = initialize_storage()
+    def __init__(self,
+                 storage_type: str = STORAGE_TYPE,
+                 catalog_backend: str = CATALOG_BACKEND,
+                 group_commit_window: float | None = None,
+                 group_commit_max_rows: int = GROUP_COMMIT_MAX_ROWS,
+                 **storage_options):
+        """
+        With a `group_commit_window` (seconds), INSERTs into the same table are buffered for that
+        long (or up to `group_commit_max_rows` rows) and committed together as one data file,
+        each INSERT returns once its group is committed. See GroupCommitter.
+        The catalog and the storage are opened (and their backend modules imported) on first use.
+        """
+        if storage_type.lower() not in STORAGE_BACKENDS:
+            raise ValueError(f"Unsupported storage type: {storage_type}")
+        if catalog_backend.lower() not in CATALOG_BACKENDS:
+            raise ValueError(f"Unsupported catalog backend: {catalog_backend}")
+        self.storage_type = storage_type
+        self.catalog_backend = catalog_backend
+        self.storage_options = storage_options
+        self._catalog: TableMetadata | None = None
+        self._storage = None
+        self._init_lock = threading.Lock()
+        self.group_commit = None
+        if group_commit_window is not None:
+            self.group_commit = GroupCommitter(self._commit_inserts, group_commit_window, group_commit_max_rows)
+        self._query_executor: ThreadPoolExecutor | None = None
+        self._query_executor_lock = threading.Lock()
 
-    def execute(self, plan: BasePlan):
+    @property
+    def catalog(self) -> TableMetadata:
+        """Table catalog, opened on the first statement (legacy table_metadata.json imported then)"""
+        if self._catalog is None:
+            with self._init_lock:
+                if self._catalog is None:
+                    self._catalog = TableMetadata(initialize_catalog_backend(self.catalog_backend))
+        return self._catalog
+
+    @property
+    def storage(self):
+        """Storage of the data files, created on the first statement that reads or writes them"""
+        if self._storage is None:
+            with self._init_lock:
+                if self._storage is None:
+                    self._storage = initialize_storage(self.storage_type, **self.storage_options)
+        return self._storage
+
+    def execute(self, plan: BasePlan, result_format: str | ResultFormat = ResultFormat.PANDAS):
+        """
+        Execute a plan. SELECT results are returned as `result_format`: a streaming
+        pyarrow.RecordBatchReader ("reader"), a pyarrow.Table ("arrow") or a pandas DataFrame ("pandas"),
+        as well as the one `plan` column of EXPLAIN [ANALYZE].
+        """
         match plan:
             case CreateTablePlan():
-                return self._execute_create(plan)
+                with INSTRUMENTATION.stage("query", statement="CREATE", table=plan.table_name):
+                    return self._execute_create(plan)
 
             case InsertPlan():
-                return self._execute_insert(plan)
-            
+                with INSTRUMENTATION.stage("query", statement="INSERT", table=plan.table_name):
+                    return self._execute_insert(plan)
+
+            case CTASPlan():
+                with INSTRUMENTATION.stage("query", statement="CREATE", table=plan.table_name):
+                    return self._execute_ctas(plan)
+
+            case InsertSelectPlan():
+                with INSTRUMENTATION.stage("query", statement="INSERT", table=plan.table_name):
+                    return self._execute_insert_select(plan)
+
+            case DeletePlan():
+                with INSTRUMENTATION.stage("query", statement="DELETE", table=plan.table_name):
+                    return self._execute_delete(plan)
+
+            case UpdatePlan():
+                with INSTRUMENTATION.stage("query", statement="UPDATE", table=plan.table_name):
+                    return self._execute_update(plan)
+
             case SelectPlan():
-                return self._execute_select(plan)
+                return self._to_result(self._select(plan), ResultFormat(result_format))
+
+            case ExplainPlan():
+                return self._to_result(self._explain(plan), ResultFormat(result_format))
 
             case _:
-                raise NotImplementedError("Only CREATE, INSERT and SELECT supported for now.")
+                raise NotImplementedError("Only CREATE, INSERT, DELETE, UPDATE and SELECT supported for now.")
+
+    def query(self,
+              sql: str,
+              params: Sequence[Any] | dict[str, Any] | None = None,
+              dialect: str = SQL_DIALECT,
+              result_format: str | ResultFormat = ResultFormat.PANDAS):
+        """
+        Run a SQL statement. Plans come from the parser's plan cache, and statements with
+        `?` / `:name` placeholders get `params` bound to the cached plan without parsing again.
+        """
+        if not EXPLAIN_PREFIX.match(sql):
+            statement = SqlParser(dialect, sql).prepare()
+            return self.execute(statement.bind(params), result_format)
+
+        # EXPLAIN [ANALYZE]: the parsing is profiled too
+        profile = QueryProfile()
+        with INSTRUMENTATION.profile(profile=profile):
+            plan = SqlParser(dialect, sql).prepare().bind(params)
+        return self._to_result(self._explain(plan, profile), ResultFormat(result_format))
+
+    @property
+    def query_executor(self) -> ThreadPoolExecutor:
+        """
+        Threads running the blocking work of async queries, created on the first one. Concurrent
+        queries share it, as well as the engine's storage (connection pool, scan pool, disk cache).
+        """
+        with self._query_executor_lock:
+            if self._query_executor is None:
+                self._query_executor = ThreadPoolExecutor(max_workers=ASYNC_QUERY_WORKERS, thread_name_prefix="tiny-otf-query")
+            return self._query_executor
+
+    async def execute_async(self, plan: BasePlan, result_format: str | ResultFormat = ResultFormat.PANDAS):
+        """
+        Execute a plan without blocking the event loop: catalog lookups, object store reads and
+        decoding run on the query executor. SELECT results as "reader" are an AsyncBatchReader
+        streaming the batches with backpressure, "arrow" and "pandas" results are materialized
+        off the loop as well.
+        """
+        loop = asyncio.get_running_loop()
+        result_format = ResultFormat(result_format)
+        if not isinstance(plan, SelectPlan):
+            return await loop.run_in_executor(self.query_executor, self.execute, plan)
+
+        reader = await loop.run_in_executor(self.query_executor, self._select, plan)
+        if result_format == ResultFormat.READER:
+            return AsyncBatchReader(reader, self.query_executor)
+        return await loop.run_in_executor(self.query_executor, self._to_result, reader, result_format)
+
+    async def query_async(self,
+                          sql: str,
+                          params: Sequence[Any] | dict[str, Any] | None = None,
+                          dialect: str = SQL_DIALECT,
+                          result_format: str | ResultFormat = ResultFormat.PANDAS):
+        """Async `query`, parsing included, see `execute_async`"""
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(self.query_executor,
+                                          lambda: SqlParser(dialect, sql).prepare().bind(params))
+        return await self.execute_async(plan, result_format)
+
+    def _select(self, plan: SelectPlan) -> pa.RecordBatchReader:
+        """
+        `_execute_select`, reported as a `query` event once the result is consumed when
+        instrumented: planning time, rows, time spent producing them and footer cache activity.
+        """
+        if not INSTRUMENTATION.enabled:
+            return self._execute_select(plan)
+
+        footers, start = FOOTER_CACHE.info(), time.perf_counter()
+        reader = self._execute_select(plan)
+        fields = {"statement": "SELECT", "tables": plan.table_names, "planning_ms": (time.perf_counter() - start) * 1000}
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            yield from reader
+            after = FOOTER_CACHE.info()
+            fields["footer_cache_hits"] = after["hits"] - footers["hits"]
+            fields["footer_cache_misses"] = after["misses"] - footers["misses"]
+        return pa.RecordBatchReader.from_batches(reader.schema, INSTRUMENTATION.counted("query", batches(), fields))
+
+    def _explain(self, plan: ExplainPlan, profile: QueryProfile | None = None) -> pa.RecordBatchReader:
+        """
+        One `plan` line per event of the statement: parsing, files listed / pruned per table,
+        aggregation and join strategies. EXPLAIN plans the scans without reading them; EXPLAIN ANALYZE
+        runs the statement (its result is discarded) and adds the files, row groups, bytes and rows
+        read by every scan, the timings and the cache hits. Appended to the events of `profile`.
+        """
+        statement = plan.statement
+        with INSTRUMENTATION.profile(plan_only=not plan.analyze, profile=profile) as profile:
+            match statement:
+                case SelectPlan():
+                    for _ in self._select(statement):
+                        pass
+                case InsertPlan() | CreateTablePlan() | DeletePlan() | UpdatePlan() | CTASPlan() | InsertSelectPlan() if plan.analyze:
+                    self.execute(statement)
+                case CTASPlan() | InsertSelectPlan():
+                    # the query is planned, its rows would stream into the table's files
+                    for _ in self._select(statement.query):
+                        pass
+                    INSTRUMENTATION.emit("create" if isinstance(statement, CTASPlan) else "insert",
+                                         table=statement.table_name, source="select")
+                case InsertPlan():
+                    INSTRUMENTATION.emit("insert", table=statement.table_name, rows=len(statement.raw_expr.expression.expressions),
+                                         group_commit=self.group_commit is not None)
+                case CreateTablePlan():
+                    INSTRUMENTATION.emit("create", table=statement.table_name, primary_key=statement.primary_key,
+                                         partitioning=statement.partitioning)
+                case DeletePlan() | UpdatePlan():
+                    INSTRUMENTATION.emit("delete" if isinstance(statement, DeletePlan) else "update",
+                                         table=statement.table_name,
+                                         where=statement.where.sql() if statement.where is not None else None)
+                case _:
+                    raise NotImplementedError("Only CREATE, INSERT, DELETE, UPDATE and SELECT supported for now.")
+        return pa.RecordBatchReader.from_batches(pa.schema([("plan", pa.string())]),
+                                                 pa.table({"plan": pa.array(profile.lines(), pa.string())}).to_batches())
+
+    @staticmethod
+    def cache_info() -> dict:
+        """Statistics of the process-wide plan and Parquet footer caches, e.g. to size their budgets"""
+        return {"plans": SqlParser.cache_info(), "footers": FOOTER_CACHE.info()}
+
+    @staticmethod
+    def _to_result(reader: pa.RecordBatchReader, result_format: ResultFormat):
+        """Convert the streamed SELECT result only at the edge"""
+        match result_format:
+            case ResultFormat.READER:
+                return reader
+            case ResultFormat.ARROW:
+                return reader.read_all()
+            case ResultFormat.PANDAS:
+                return reader.read_all().to_pandas()
 
     def _execute_create(self, plan: CreateTablePlan):
         if self.catalog.table_exists(plan.table_name):
@@ -30,7 +255,7 @@ class TinyEngine:
         
         table_name = plan.table_name
         columns = plan.columns
-        self.catalog.add_table(table_name, columns)
+        self.catalog.add_table(table_name, columns, plan.primary_key, plan.partitioning)
 
         print(f"Table '{table_name}' created successfully.")
 
@@ -39,49 +264,882 @@ class TinyEngine:
         
         table_name = plan.table_name
         column_names = plan.column_names
-        data = plan.column_values
-        dtypes = plan.inferred_types
 
         if not self.catalog.table_exists(table_name):
             raise ValueError(f"Table '{table_name}' does not exist.")
 
         table_manifest = self.catalog.get_table(table_name)
         schema = table_manifest.get("schema", None)
-        
-        df = plan.to_dataframe(SQL_TO_PANDAS_TYPES)
+        schema_column_names = [c["name"].upper() for c in schema]
+
+        if column_names:
+            invalid_cols = [col for col in column_names if col.upper() not in schema_column_names]
+            if invalid_cols:
+                raise ValueError(f"Column(s) '{invalid_cols}' do not exist in table {table_name}.")
+
+        # Typed columnar build against the catalog schema, no pandas round trip
+        table = plan.to_arrow(self.catalog.arrow_schema(table_name))
+
+        if self.group_commit is not None:
+            # acknowledged once the group holding the rows is committed
+            return self.group_commit.submit(table_name, table).result()
+        error = self._commit_inserts(table_name, [table])[0]
+        if error is not None:
+            raise error
+
+    def _commit_inserts(self, table_name: str, tables: list[pa.Table]) -> list[Exception | None]:
+        """
+        Write the rows of one or more INSERTs as one data file per partition and commit them at once.
+        With a primary key, an INSERT duplicating keys (within itself, of an earlier INSERT of the
+        group or of the table) is left out, its error is returned in its place.
+        """
+        # First manifest commit of a table written before manifests: take over its files once
+        existing_files = []
+        manifest = self.catalog.get_manifest(table_name)
+        if manifest is None:
+            existing_files = self.storage.list_files(table_name)
 
-        # Create and save files under date partitions
-        # storage = self.catalog.dispatch_storage(table_name)
-        self.storage.write(table_name, df, datetime.today())
+        # Primary key: reject duplicates within the batch and against the key indexes of the table files
+        primary_key = self.catalog.primary_key(table_name)
+        errors: list[Exception | None] = [None] * len(tables)
+        validate = None
+        if primary_key:
+            files = (manifest.files if manifest else []) + existing_files
+            accepted: list[pa.Array] = []
+            for i, table in enumerate(tables):
+                keys = encode_keys(table, primary_key)
+                try:
+                    if len(pc.unique(keys)) != len(keys):
+                        raise ValueError(f"Duplicate primary key value(s) within the inserted rows of table {table_name}.")
+                    if accepted and pc.any(pc.is_in(keys, value_set=pa.concat_arrays(accepted))).as_py():
+                        raise ValueError(f"Duplicate primary key value(s) of a previous INSERT of the commit group in table {table_name}.")
+                    key_ranges = self._key_ranges(primary_key, table)
+                    self._check_unique_keys(table_name, primary_key, keys, files, set(), key_ranges)
+                except ValueError as error:
+                    errors[i] = error
+                    continue
+                accepted.append(keys)
+            tables = [table for table, error in zip(tables, errors) if error is None]
+            if not tables:
+                return errors
+            keys = pa.concat_arrays(accepted)
+            key_ranges = self._key_ranges(primary_key, pa.concat_tables(tables))
+            checked = {f.path for f in files}
+            # re-checked at commit time against files committed concurrently
+            validate = lambda files: self._check_unique_keys(table_name, primary_key, keys, files, checked, key_ranges)
+        table = pa.concat_tables(tables)
+
+        # Create and save files under date partitions, or one file per partition of the table's transforms
+        partitioning = self.catalog.partitioning(table_name)
+        partitions = split_by_partition(table, partitioning) if partitioning else [(None, table)]
+        data_files = []
+        for partition, partition_table in partitions:
+            data_file = self.storage.write(table_name, partition_table, datetime.today(), partition=partition)
+            if primary_key:
+                data_file.key_index = self.catalog.write_key_index(table_name, encode_keys(partition_table, primary_key))
+            data_files.append(data_file)
+
+        # Commit the new files to the table manifest at once
+        self.catalog.append_files(table_name, existing_files + data_files, validate)
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("commit", table=table_name, inserts=len(tables), rows=table.num_rows,
+                                 files=len(data_files), rejected=sum(error is not None for error in errors))
+        return errors
+
+    def _key_index(self, table_name: str, data_file: DataFile, primary_key: list[str]) -> KeyIndex:
+        """
+        Persisted key index of a data file. Files written without one get it built from their key
+        columns once and recorded on their DataFile, the table's next manifest commit persists it.
+        """
+        if not data_file.key_index:
+            keys = pa.Table.from_batches(self.storage.scan_files([data_file], columns=primary_key))
+            data_file.key_index = self.catalog.write_key_index(table_name, encode_keys(keys, primary_key))
+        return self.catalog.key_index(data_file.key_index)
+
+    @staticmethod
+    def _key_ranges(primary_key: list[str], table: pa.Table) -> list[tuple[str, Any, Any]]:
+        """
+        Column, min and max of every primary key column in `table`, to skip files by their stats:
+        a file holds none of the keys if the stats (or partition values) of any key column exclude its range.
+        """
+        if table.num_rows == 0:
+            return []
+        ranges = []
+        for key in primary_key:
+            name = next(n for n in table.column_names if n.upper() == key.upper())
+            bounds = pc.min_max(table.column(name)).as_py()
+            ranges.append((name, bounds["min"], bounds["max"]))
+        return ranges
+
+    @staticmethod
+    def _stats_key_ranges(primary_key: list[str], data_files: list[DataFile]) -> list[tuple[str, Any, Any]]:
+        """`_key_ranges` of the rows of written files, from their min/max stats"""
+        ranges = []
+        for key in primary_key:
+            name, lows, highs = None, [], []
+            for data_file in data_files:
+                name = next((n for n in data_file.column_stats if n.upper() == key.upper()), None)
+                stats = data_file.column_stats.get(name) or {}
+                if stats.get("min") is None or stats.get("max") is None:
+                    break  # the column can't be bounded, the others still can
+                lows.append(stats["min"])
+                highs.append(stats["max"])
+            else:
+                if name:
+                    ranges.append((name, min(lows), max(highs)))
+        return ranges
+
+    def _check_unique_keys(self,
+                           table_name: str,
+                           primary_key: list[str],
+                           keys: pa.Array,
+                           files: list[DataFile],
+                           checked: set[str],
+                           key_ranges: list[tuple[str, Any, Any]] | None = None) -> None:
+        """
+        Raise if any of `keys` is already in one of `files`. Files whose min/max stats exclude
+        one of `key_ranges` (see `_key_ranges`) are skipped, the others cost a Bloom filter probe per key,
+        only its positives are binary searched in the file's sorted keys.
+        Key indexes still hold the keys of deleted rows, so the positives of files with
+        a deletion vector are checked against the keys of their live rows.
+        """
+        hashes = None
+        for data_file in files:
+            if data_file.path in checked:
+                continue
+            if key_ranges and not all(range_may_match(data_file, *key_range) for key_range in key_ranges):
+                checked.add(data_file.path)
+                continue
+            if hashes is None:
+                hashes = key_hashes(keys)
+            found = self._key_index(table_name, data_file, primary_key).contains(keys, hashes)
+            if found.any() and data_file.deletion_vector:
+                live = pa.Table.from_batches(self.storage.scan_files([data_file], primary_key, self._deletes([data_file])))
+                found &= pc.is_in(keys, value_set=encode_keys(live, primary_key)).to_numpy(zero_copy_only=False)
+            if found.any():
+                duplicates = [tuple(key.split(KEY_SEPARATOR)) if len(primary_key) > 1 else key
+                              for key in keys.filter(pa.array(found)).to_pylist()]
+                raise ValueError(f"Duplicate primary key value(s) {duplicates[:10]} for {primary_key} in table {table_name}.")
+            checked.add(data_file.path)
+
+    def _dml_files(self, table_name: str, meta: dict, condition: exp.Expression | None) -> list[DataFile]:
+        """Current files of a DELETE / UPDATE target that can hold rows matching `condition`"""
+        with INSTRUMENTATION.stage("plan_files", table=table_name) as stage:
+            manifest = self.catalog.get_manifest(table_name)
+            if manifest is None:
+                # table written before manifests: take over its files first
+                manifest = self.catalog.append_files(table_name, self.storage.list_files(table_name))
+            files = self._candidate_files(table_name, meta, manifest.files, condition)
+            stage.update(snapshot=manifest.sequence_number, files_total=len(manifest.files),
+                         files_pruned=len(manifest.files) - len(files), files_to_read=len(files))
+        return files
+
+    def _dml_filter(self, schema: list[dict[str, str]], where: exp.Expression | None) -> pc.Expression | None:
+        if where is None:
+            return None
+        return to_arrow_filter(where, self._field_types(schema))
+
+    def _execute_delete(self, plan: DeletePlan) -> int:
+        """
+        Merge-on-read DELETE: the positions of the matching rows of every candidate file are
+        committed as deletion vectors, data files are not rewritten (until compaction).
+        Files matched as a whole by partition values are not read at all.
+        """
+        table_name = plan.table_name
+        meta = self._table(table_name)
+        where = self._resolve_columns(table_name, meta["schema"], plan.where)
+        row_filter = self._dml_filter(meta["schema"], where)
+        files = self._dml_files(table_name, meta, where)
+
+        exact_files = exact_partition_files(files, where, self._partition_types(meta))
+        deletes, deleted = {}, 0
+        if exact_files is not None:
+            for data_file in exact_files:
+                deletes[data_file.path] = DeletionVector.build(np.arange(data_file.record_count))
+                deleted += data_file.live_count
+        else:
+            columns = referenced_columns(where)
+            arrow_schema = self.catalog.arrow_schema(table_name)
+            for data_file in files:
+                # all rows in file order (no deletes applied), so positions are those of the file
+                table = pa.Table.from_batches(self.storage.scan_files([data_file], columns, schema=arrow_schema))
+                vector = self.catalog.deletion_vector(data_file.deletion_vector) if data_file.deletion_vector else None
+                positions = matching_positions(table, row_filter, vector)
+                if len(positions):
+                    deletes[data_file.path] = DeletionVector.build(positions)
+                    deleted += len(positions)
+
+        if deletes:
+            self.catalog.delete_rows(table_name, deletes)
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("commit", table=table_name, rows=deleted, files=len(deletes))
+        return deleted
+
+    def _execute_update(self, plan: UpdatePlan) -> int:
+        """
+        Merge-on-read UPDATE: the matching rows are marked deleted in their files' deletion vectors
+        and their updated versions written as new data files, committed together in one manifest.
+        Updated rows stay in the `_dt` partition of their file, or move to the partition of
+        their new values on tables with partition transforms.
+        """
+        table_name = plan.table_name
+        meta = self._table(table_name)
+        schema = meta["schema"]
+        names = {c["name"].upper(): c["name"] for c in schema}
+        invalid_cols = [col for col in plan.assignments if col.upper() not in names]
+        if invalid_cols:
+            raise ValueError(f"Column(s) '{invalid_cols}' do not exist in table {table_name}.")
+        primary_key = meta.get("primary_key")
+        if primary_key and any(col.upper() in {key.upper() for key in primary_key} for col in plan.assignments):
+            raise NotImplementedError(f"Updating the primary key {primary_key} of table {table_name} is not supported.")
+
+        field_types = self._field_types(schema)
+        assignments = {}
+        for col, value in plan.assignments.items():
+            value = self._resolve_columns(table_name, schema, value)
+            assignments[names[col.upper()]] = to_arrow_value(value, field_types, field_types[names[col.upper()]])
+        where = self._resolve_columns(table_name, schema, plan.where)
+        row_filter = self._dml_filter(schema, where)
+        files = self._dml_files(table_name, meta, where)
+
+        arrow_schema = self.catalog.arrow_schema(table_name)
+        referenced = {col.upper() for col in referenced_columns(where)} if where is not None else set()
+        columns = arrow_schema.names + [name for name in PARTITION_FIELDS.names if name.upper() in referenced]
+        partitioning = self.catalog.partitioning(table_name)
+        deletes, updated = {}, {}
+        for data_file in files:
+            table = pa.Table.from_batches(self.storage.scan_files([data_file], columns, schema=arrow_schema))
+            vector = self.catalog.deletion_vector(data_file.deletion_vector) if data_file.deletion_vector else None
+            positions = matching_positions(table, row_filter, vector)
+            if not len(positions):
+                continue
+            deletes[data_file.path] = DeletionVector.build(positions)
+            rows = updated_rows(table.take(pa.array(positions)), assignments, arrow_schema)
+            updated.setdefault(None if partitioning else data_file.partition.get(DEFAULT_PARTITION_FIELD), []).append(rows)
+
+        data_files = []
+        try:
+            for partition_date, tables in updated.items():
+                table = pa.concat_tables(tables)
+                if partitioning:
+                    partitions, partition_date = split_by_partition(table, partitioning), datetime.today()
+                else:
+                    partitions = [(None, table)]
+                    partition_date = datetime.strptime(partition_date, "%Y-%m-%d") if partition_date else datetime.today()
+                for partition, partition_table in partitions:
+                    data_file = self.storage.write(table_name, partition_table, partition_date, partition=partition)
+                    if primary_key:
+                        data_file.key_index = self.catalog.write_key_index(table_name, encode_keys(partition_table, primary_key))
+                    data_files.append(data_file)
+            if deletes:
+                # exclusive: a row updated concurrently must not be written twice
+                self.catalog.delete_rows(table_name, deletes, data_files, exclusive=True, operation="update")
+        except BaseException:
+            self.storage.delete_files([f.path for f in data_files])
+            raise
+
+        count = sum(len(vector) for vector in deletes.values())
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("commit", table=table_name, rows=count, files=len(data_files))
+        return count
 
     def _execute_select(self, 
-                        plan: SelectPlan) -> pd.DataFrame:
-        
-        table_names = plan.table_names
-        column_names = plan.column_names or [[]]
+                        plan: SelectPlan) -> pa.RecordBatchReader:
+        if plan.joins:
+            return self._execute_join(plan)
+
+        table_name = plan.table_names[0]
+        columns = (plan.column_names or [[]])[0]
+
+        meta = self._table(table_name)
+        schema = meta.get("schema", None)
+        self._check_columns(table_name, schema, columns)
+
+        where = self._resolve_columns(table_name, schema, plan.where)
+        row_filter = to_arrow_filter(where, self._field_types(schema)) if where is not None else None
+
+        manifest, files = self._plan_files(plan, table_name, meta, where)
+
+        if plan.aggregates is not None:
+            if manifest and not plan.group_by:
+                # files matched as a whole by partition-only predicates can be aggregated from their stats
+                exact_files = exact_partition_files(manifest.files, where, self._partition_types(meta))
+                if exact_files is not None:
+                    result = aggregate_from_stats(plan.aggregates, exact_files, self._field_types(schema))
+                    if result is not None:
+                        if INSTRUMENTATION.enabled:
+                            INSTRUMENTATION.emit("aggregate", table=table_name, strategy="statistics", files=len(exact_files))
+                        return self._limit_result(result, plan)
+            return self._aggregate(plan, table_name, columns, files, row_filter)
+
+        if files == []:
+            return self._empty_result(table_name, columns)
+
+        return self.storage.scan(table_name=table_name,
+                                 columns=columns,
+                                 limit=plan.limit,
+                                 offset=plan.offset,
+                                 files=files,
+                                 filter=row_filter,
+                                 deletes=self._deletes(files),
+                                 schema=self.catalog.arrow_schema(table_name))
+
+    def _table(self, table_name: str) -> dict:
+        if not self.catalog.table_exists(table_name):
+            raise ValueError(f"Table '{table_name}' does not exist.")
+        return self.catalog.get_table(table_name)
+
+    @staticmethod
+    def _check_columns(table_name: str, schema: list[dict[str, str]], columns: list[str]) -> None:
+        # hidden partition columns can be selected and filtered on too
+        schema_column_names = [c["name"].upper() for c in schema] + [n.upper() for n in PARTITION_FIELDS.names]
+        invalid_cols = [col for col in columns if col.upper() not in schema_column_names]
+        if invalid_cols:
+            raise ValueError(f"Column(s) '{invalid_cols}' do not exist in table {table_name}.")
+
+    @classmethod
+    def _resolve_columns(cls,
+                         table_name: str,
+                         schema: list[dict[str, str]],
+                         expr: exp.Expression | None) -> exp.Expression | None:
+        """
+        `expr` with its columns checked and named as stored: filters, stats and partition
+        values are looked up by the stored names, SQL names match them case-insensitively.
+        """
+        if expr is None:
+            return None
+        cls._check_columns(table_name, schema, referenced_columns(expr))
+        return resolve_columns(expr, [c["name"] for c in schema] + PARTITION_FIELDS.names)
+
+    def _plan_files(self,
+                    plan: SelectPlan,
+                    table_name: str,
+                    meta: dict,
+                    condition: exp.Expression | None) -> tuple[Manifest | None, list[DataFile] | None]:
+        """
+        Manifest of the table (at the requested snapshot) and its files that can match `condition`,
+        (None, None) for tables without a manifest, which fall back to listing.
+        """
+        with INSTRUMENTATION.stage("plan_files", table=table_name) as stage:
+            return self._prune_files(plan, table_name, meta, condition, stage)
+
+    def _prune_files(self,
+                     plan: SelectPlan,
+                     table_name: str,
+                     meta: dict,
+                     condition: exp.Expression | None,
+                     stage: dict) -> tuple[Manifest | None, list[DataFile] | None]:
+        version, timestamp = self._as_of(plan, table_name)
+        manifest = self.catalog.get_manifest(table_name, version, timestamp)
+        if manifest is None and (version is not None or timestamp is not None):
+            raise ValueError(f"Table '{table_name}' has no snapshot history.")
+        if manifest is None:
+            stage["manifest"] = False
+            return None, None
+
+        files = self._candidate_files(table_name, meta, manifest.files, condition)
+        stage.update(snapshot=manifest.sequence_number, files_total=len(manifest.files),
+                     files_pruned=len(manifest.files) - len(files), files_to_read=len(files))
+        return manifest, files
+
+    def _candidate_files(self,
+                         table_name: str,
+                         meta: dict,
+                         files: list[DataFile],
+                         condition: exp.Expression | None) -> list[DataFile]:
+        """The `files` that can hold rows matching `condition`"""
+        schema = meta["schema"]
+        # skip partitions and files whose stats can't match before opening them
+        partitioning = parse_partitioning(meta.get("partitioning"), [c["name"] for c in schema])
+        files = prune_files(files, condition, partitioning, self._field_types(schema))
+        # point lookups on the primary key only read the files whose key index holds the key
+        primary_key = meta.get("primary_key")
+        lookup = lookup_keys(condition, primary_key, self._field_types(schema)) if primary_key else None
+        if lookup is not None:
+            lookup = pa.array(lookup, type=pa.string())
+            files = [f for f in files if self._key_index(table_name, f, primary_key).contains(lookup).any()]
+        return files
+
+    def _deletes(self, files: list[DataFile] | None) -> dict[str, DeletionVector] | None:
+        """Deletion vectors of the files to scan by path, None when no rows of them are deleted"""
+        deletes = {f.path: self.catalog.deletion_vector(f.deletion_vector) for f in files or [] if f.deletion_vector}
+        return deletes or None
+
+    def _partition_types(self, meta: dict) -> dict[str, pa.DataType]:
+        """Arrow types of the columns whose values every file holds as a whole: `_dt` and identity partitions"""
+        schema = meta["schema"]
+        column_types = {c["name"].upper(): SQL_TO_ARROW_TYPES.get(c["type"].upper()) for c in schema}
+        partition_types = {f.name: f.type for f in PARTITION_FIELDS}
+        partition_types.update({f.source: column_types[f.source.upper()]
+                                for f in parse_partitioning(meta.get("partitioning"), [c["name"] for c in schema])
+                                if f.transform == "identity"})
+        return partition_types
+
+    def _execute_join(self, plan: SelectPlan) -> pa.RecordBatchReader:
+        """
+        Hash join `FROM a JOIN b ON ... [JOIN c ON ...]`. WHERE terms on a single table are pushed
+        to its scan, and through the equi-join keys to the scans of the tables joined on them.
+        The smaller side of the first join (by manifest row counts) is built in memory and the
+        other side streams through it; every further table is the build side of the streamed result.
+        """
+        aliases, metas = plan.aliases, {}
+        for alias, table_name in zip(aliases, plan.table_names):
+            metas[alias] = self._table(table_name)
+        names = {alias: [c["name"] for c in meta["schema"]] for alias, meta in metas.items()}
+        scope = JoinScope(aliases, {alias: names[alias] + PARTITION_FIELDS.names for alias in aliases})
+        null_extended = {join.alias for join in plan.joins if join.how == "left"}
+
+        # key pairs (earlier table column, joined table column) of every join, as internal names
+        join_keys = []
+        for i, join in enumerate(plan.joins, start=1):
+            pairs = []
+            for left, right in join.key_pairs():
+                if scope.resolve(left)[0] == join.alias:
+                    left, right = right, left
+                if scope.resolve(right)[0] != join.alias or scope.resolve(left)[0] not in aliases[:i]:
+                    raise NotImplementedError(f"Join condition must compare '{join.alias}' with an earlier table: {join.on.sql()}")
+                pairs.append((left, right))
+            join_keys.append(pairs)
+
+        # WHERE terms on a single (not null extended) table filter its scan, the rest the joined rows
+        pushed: dict[str, list[exp.Expression]] = {alias: [] for alias in aliases}
+        residual = []
+        for term in conjuncts(plan.where):
+            owners = {scope.resolve(col)[0] for col in term.find_all(exp.Column)}
+            if len(owners) == 1 and not owners & null_extended:
+                pushed[owners.pop()].append(scope.localize(term))
+            else:
+                residual.append(scope.internalize(term))
+        # `a.k = 5` with `ON a.k = b.k` also holds for b.k, in both directions
+        for pairs in join_keys:
+            for left, right in pairs:
+                for source, target in ((left, right), (right, left)):
+                    (source_alias, source_col), (target_alias, target_col) = scope.resolve(source), scope.resolve(target)
+                    for term in list(pushed[source_alias]):
+                        if [col.upper() for col in referenced_columns(term)] == [source_col.upper()]:
+                            pushed[target_alias].append(term.transform(
+                                lambda node: exp.column(target_col) if isinstance(node, exp.Column) else node))
+
+        # output columns as (internal name, output name), and the columns each scan has to read
+        if plan.aggregates is not None:
+            group = plan.select_expr.args.get("group")
+            group_by = [scope.internal(col) for col in (group.expressions if group else [])]
+            aggregates = [replace(a, column=scope.internal(exp.column(a.column, table=a.table)), table=None)
+                          if a.column else a for a in plan.aggregates]
+            referenced = group_by + [a.column for a in aggregates if a.column]
+        elif plan.is_select_star:
+            outputs = [(f"{alias}.{name}", name) for alias in aliases for name in names[alias]]
+            referenced = [internal for internal, _ in outputs]
+        else:
+            outputs = []
+            for node in plan.select_expr.expressions:
+                if not isinstance(node.unalias(), exp.Column):
+                    raise NotImplementedError(f"Unsupported expression in SELECT with joins: {node.sql()}")
+                outputs.append((scope.internal(node.unalias()), node.alias or node.unalias().name))
+            referenced = [internal for internal, _ in outputs]
+        referenced += [scope.internal(col) for pairs in join_keys for pair in pairs for col in pair]
+        referenced += [col for term in residual for col in referenced_columns(term)]
+        needed = {alias: [] for alias in aliases}
+        for internal in dict.fromkeys(referenced):
+            alias, name = internal.split(".", 1)
+            needed[alias].append(name)
+
+        # plan every scan from its manifest with the pushed down predicates
+        inputs = {}
+        for alias, table_name in zip(aliases, plan.table_names):
+            condition = exp.and_(*pushed[alias]) if pushed[alias] else None
+            _, files = self._plan_files(plan, table_name, metas[alias], condition)
+            inputs[alias] = (table_name, needed[alias] or names[alias][:1], files, condition)
+
+        def scan(alias: str, key_filter: tuple[str, pa.Array] | None = None) -> pa.RecordBatchReader:
+            """Scan of one table with its columns named `<alias>.<column>`"""
+            table_name, columns, files, condition = inputs[alias]
+            row_filter = to_arrow_filter(condition, self._field_types(metas[alias]["schema"])) if condition is not None else None
+            if key_filter is not None:
+                # runtime filter: only the keys of the build side can match
+                key, values = key_filter
+                low, high = pc.min(values).as_py(), pc.max(values).as_py()
+                if files and not len(values):
+                    files = []
+                elif files and isinstance(low, (int, float, str)):
+                    files = prune_files(files, exp.Between(this=exp.column(key), low=exp.convert(low), high=exp.convert(high)))
+                if INSTRUMENTATION.enabled:
+                    INSTRUMENTATION.emit("join_filter", table=table_name, key=key, distinct_keys=len(values),
+                                         files_to_read=None if files is None else len(files))
+                key_condition = pc.field(key).isin(values)
+                row_filter = key_condition if row_filter is None else row_filter & key_condition
+            if files == []:
+                reader = self._empty_result(table_name, columns)
+            else:
+                # without LIMIT/OFFSET the row order is free: take batches as soon as they are decoded
+                reader = self.storage.scan(table_name=table_name, columns=columns, files=files, filter=row_filter,
+                                           ordered=plan.limit is not None or bool(plan.offset), deletes=self._deletes(files),
+                                           schema=self.catalog.arrow_schema(table_name))
+            schema = pa.schema([field.with_name(f"{alias}.{field.name}") for field in reader.schema])
+            return pa.RecordBatchReader.from_batches(schema, (batch.rename_columns(schema.names) for batch in reader))
+
+        def estimated_rows(alias: str) -> float:
+            files = inputs[alias][2]
+            return sum(f.live_count for f in files) if files is not None else float("inf")
+
+        # first join: build the smaller side, stream the other one through it
+        left, right = aliases[0], aliases[1]
+        left_keys = [scope.internal(l) for l, _ in join_keys[0]]
+        right_keys = [scope.internal(r) for _, r in join_keys[0]]
+        if estimated_rows(left) < estimated_rows(right):
+            build_alias, probe_alias, build_keys, probe_keys = left, right, left_keys, right_keys
+            how = "build_outer" if plan.joins[0].how == "left" else "inner"
+        else:
+            build_alias, probe_alias, build_keys, probe_keys = right, left, right_keys, left_keys
+            how = "probe_outer" if plan.joins[0].how == "left" else "inner"
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("join", strategy="hash", how=how, build=build_alias, probe=probe_alias,
+                                 estimated_build_rows=estimated_rows(build_alias))
+        hash_join = HashJoin(scan(build_alias).read_all(), build_keys, probe_keys, how)
+        runtime_filter = hash_join.runtime_filter()
+        # EXPLAIN builds from an unread side, its keys would prune the probe side entirely
+        if runtime_filter is not None and not INSTRUMENTATION.plan_only():
+            probe_reader = scan(probe_alias, (probe_keys[0].split(".", 1)[1], runtime_filter))
+        else:
+            probe_reader = scan(probe_alias)
+        build = hash_join.build
+        fields = {field.name: field for field in list(probe_reader.schema) + list(build.schema) if field.name != BUILD_ROW}
+        stages = [hash_join]
+        for i, join in enumerate(plan.joins[1:], start=1):
+            build = scan(join.alias).read_all()
+            fields.update({field.name: field for field in build.schema})
+            stages.append(HashJoin(build,
+                                   [scope.internal(r) for _, r in join_keys[i]],
+                                   [scope.internal(l) for l, _ in join_keys[i]],
+                                   "probe_outer" if join.how == "left" else "inner"))
+        row_filter = to_arrow_filter(exp.and_(*residual), {name: f.type for name, f in fields.items()}) if residual else None
+
+        def first_join() -> Iterator[pa.Table]:
+            for batch in probe_reader:
+                yield hash_join.join(batch)
+            # unmatched build rows are only known once the probe side is exhausted
+            unmatched = hash_join.finish(probe_reader.schema)
+            if unmatched is not None:
+                yield unmatched
+
+        def joined() -> Iterator[pa.Table]:
+            for chunk in first_join():
+                for stage in stages[1:]:
+                    chunk = stage.join(chunk)
+                yield chunk.filter(row_filter) if row_filter is not None else chunk
+
+        if plan.aggregates is not None:
+            schema = pa.schema([fields[name] for name in dict.fromkeys(referenced)])
+            aggregator = StreamingAggregator(group_by, aggregates, schema)
+            for chunk in joined():
+                aggregator.update(chunk)
+            return self._limit_result(aggregator.result(), plan)
+
+        schema = pa.schema([fields[internal].with_name(name) for internal, name in outputs])
+        batches = (pa.RecordBatch.from_arrays([chunk.column(internal).combine_chunks() for internal, _ in outputs],
+                                              schema=schema)
+                   for chunk in joined() if chunk.num_rows)
+        return pa.RecordBatchReader.from_batches(schema, self._slice_batches(batches, plan.offset, plan.limit))
+
+    @staticmethod
+    def _slice_batches(batches: Iterator[pa.RecordBatch], offset: int | None, limit: int | None) -> Iterator[pa.RecordBatch]:
+        """OFFSET / LIMIT over a stream of batches, stops pulling batches once the limit is reached"""
+        offset, remaining = offset or 0, limit
+        for batch in batches:
+            if offset >= batch.num_rows:
+                offset -= batch.num_rows
+                continue
+            batch, offset = batch.slice(offset), 0
+            if remaining is not None:
+                batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+            yield batch
+            if remaining == 0:
+                return
+
+    def _aggregate(self,
+                   plan: SelectPlan,
+                   table_name: str,
+                   columns: list[str],
+                   files: list[DataFile] | None,
+                   row_filter: pc.Expression | None) -> pa.RecordBatchReader:
+        """Stream the scanned batches through partial aggregation, only the groups are kept in memory"""
+        # COUNT(*) alone still needs a column to count the rows of
+        columns = columns or [self.catalog.get_table(table_name)["schema"][0]["name"]]
+        if files == []:
+            reader = self._empty_result(table_name, columns)
+        else:
+            # aggregates don't depend on the row order
+            reader = self.storage.scan(table_name=table_name, columns=columns, files=files, filter=row_filter, ordered=False,
+                                       deletes=self._deletes(files), schema=self.catalog.arrow_schema(table_name))
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("aggregate", table=table_name, strategy="streaming", group_by=plan.group_by)
+        aggregator = StreamingAggregator(plan.group_by, plan.aggregates, reader.schema)
+        for batch in reader:
+            aggregator.update(batch)
+        return self._limit_result(aggregator.result(), plan)
+
+    @staticmethod
+    def _limit_result(table: pa.Table, plan: SelectPlan) -> pa.RecordBatchReader:
+        table = table.slice(plan.offset or 0, plan.limit)
+        return pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
+
+    @staticmethod
+    def _as_of(plan: SelectPlan, table_name: str) -> tuple[int | None, datetime | None]:
+        """(version, timestamp) of a `FOR VERSION | SYSTEM_TIME AS OF` clause on the table"""
+        version_clause: exp.Version | None = (plan.as_of or {}).get(table_name)
+        if version_clause is None:
+            return None, None
+
+        value = literal_value(version_clause.expression)
+        if version_clause.name.upper() == "VERSION":
+            return int(value), None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        elif isinstance(value, date) and not isinstance(value, datetime):
+            value = datetime.combine(value, datetime.min.time())
+        return None, value
+
+    def _empty_result(self, table_name: str, columns: list[str] | None) -> pa.RecordBatchReader:
+        """Result of a scan pruned down to no files, with the projected schema"""
+        schema = self.catalog.arrow_schema(table_name)
+        if columns:
+            fields = {f.name.upper(): f for f in list(schema) + list(PARTITION_FIELDS)}
+            schema = pa.schema([fields[col.upper()].with_name(col) for col in columns])
+        return pa.RecordBatchReader.from_batches(schema, [])
+
+    @staticmethod
+    def _field_types(schema: list[dict[str, str]]) -> dict[str, pa.DataType]:
+        """Arrow type of every column a WHERE clause can reference, used to coerce literals"""
+        field_types = {c["name"]: SQL_TO_ARROW_TYPES.get(c["type"].upper()) for c in schema}
+        field_types.update({f.name: f.type for f in PARTITION_FIELDS})
+        return field_types
+
+    def append(self,
+               table_name: str,
+               source: AppendSource,
+               target_file_size: int = COMPACTION_TARGET_FILE_SIZE) -> int:
+        """
+        Bulk load a stream of Arrow batches (an iterator of RecordBatch, a RecordBatchReader, or
+        the path of a Parquet / CSV / Arrow file or directory) into a table, without SQL parsing.
+        The source schema is checked against the table once; batches are streamed into files
+        of about `target_file_size` bytes per partition and all of them are committed at the
+        end in one manifest commit, nothing is visible if the load fails.
+        Returns the number of rows appended, the files written are reported as a `commit` event.
+        """
+        self._table(table_name)
+        reader = source_reader(source, self.catalog.arrow_schema(table_name))
+        rows, files = self._load(table_name, reader, target_file_size)
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("commit", table=table_name, rows=rows, files=files)
+        return rows
+
+    def _load(self, table_name: str, reader: pa.RecordBatchReader, target_file_size: int) -> tuple[int, int]:
+        """
+        Stream the batches of `reader` into an existing table (see `_write_stream`) and commit the
+        files in one manifest commit, primary keys checked against the table's files.
+        Returns the number of rows and files written.
+        """
+        schema = self.catalog.arrow_schema(table_name)
+        conform = conform_to_schema(reader.schema, schema, table_name)
+
+        existing_files = []
+        manifest = self.catalog.get_manifest(table_name)
+        if manifest is None:
+            existing_files = self.storage.list_files(table_name)
+        primary_key = self.catalog.primary_key(table_name)
+
+        def commit(data_files: list[DataFile], keys: pa.Array | None) -> None:
+            if not data_files:
+                return
+            validate = None
+            if primary_key:
+                checked: set[str] = set()
+                key_ranges = self._stats_key_ranges(primary_key, data_files)
+                self._check_unique_keys(table_name, primary_key, keys, (manifest.files if manifest else []) + existing_files,
+                                        checked, key_ranges)
+                validate = lambda files: self._check_unique_keys(table_name, primary_key, keys, files, checked, key_ranges)
+            self.catalog.append_files(table_name, existing_files + data_files, validate)
+
+        return self._write_stream(table_name, map(conform, reader), schema, self.catalog.partitioning(table_name),
+                                  primary_key, target_file_size, commit)
+
+    def _write_stream(self,
+                      table_name: str,
+                      tables: Iterable[pa.Table],
+                      schema: pa.Schema,
+                      partitioning: list[PartitionField],
+                      primary_key: list[str] | None,
+                      target_file_size: int,
+                      commit: Callable[[list[DataFile], pa.Array | None], None]) -> tuple[int, int]:
+        """
+        Write a stream of tables in the table `schema` into files of about `target_file_size`
+        bytes per partition and hand them to `commit(data_files, primary keys)`. Only the open
+        row groups are held in memory. The files of a failed load or commit are deleted, so
+        nothing of it is ever visible. Returns the number of rows and files written.
+        """
+        writers = {}
+        rows = 0
+        try:
+            for table in tables:
+                rows += table.num_rows
+                for partition, partition_table in split_by_partition(table, partitioning) if partitioning else [(None, table)]:
+                    key = tuple(sorted(partition.items())) if partition else ()
+                    if key not in writers:
+                        writers[key] = self.storage.open_writer(table_name, schema, datetime.today(), partition, target_file_size)
+                    writers[key].write(partition_table)
+            data_files = [data_file for writer in writers.values() for data_file in writer.close()]
+
+            keys = None
+            if primary_key and data_files:
+                # keys are read back from the written files, only they are held in memory
+                keys = []
+                for data_file in data_files:
+                    file_keys = encode_keys(pa.Table.from_batches(self.storage.scan_files([data_file], columns=primary_key)), primary_key)
+                    data_file.key_index = self.catalog.write_key_index(table_name, file_keys)
+                    keys.append(file_keys)
+                keys = pa.concat_arrays(keys)
+                if len(pc.unique(keys)) != len(keys):
+                    raise ValueError(f"Duplicate primary key value(s) within the appended rows of table {table_name}.")
+            commit(data_files, keys)
+        except BaseException:
+            # the files of a failed load are never committed, don't leave them behind
+            for writer in writers.values():
+                writer.abort()
+            self.storage.delete_files([path for writer in writers.values() for path in writer.paths])
+            raise
+        return rows, len(data_files)
+
+    @staticmethod
+    def _renamed(reader: pa.RecordBatchReader, names: list[str]) -> pa.RecordBatchReader:
+        schema = pa.schema([field.with_name(name) for field, name in zip(reader.schema, names)])
+        return pa.RecordBatchReader.from_batches(schema, (batch.rename_columns(names) for batch in reader))
+
+    def _execute_insert_select(self, plan: InsertSelectPlan) -> int:
+        """
+        INSERT ... SELECT as a pipeline: the batches of the query (projection and filter pushed
+        down to its scans) stream straight into the table's file writers and are committed at
+        once, like `append`. Columns are matched by position.
+        """
+        table_name = plan.table_name
+        self._table(table_name)
+        names = plan.column_names or self.catalog.arrow_schema(table_name).names
+        reader = self._select(plan.query)
+        if len(reader.schema) != len(names):
+            raise ValueError(f"INSERT into column(s) {names} of table {table_name} "
+                             f"but the SELECT returns {len(reader.schema)} column(s).")
+        rows, files = self._load(table_name, self._renamed(reader, names), COMPACTION_TARGET_FILE_SIZE)
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("commit", table=table_name, rows=rows, files=files)
+        return rows
+
+    def _execute_ctas(self, plan: CTASPlan) -> int:
+        """
+        CREATE TABLE ... AS SELECT as a pipeline: the columns are those of the query result, its
+        batches stream into the new table's files and the table is created together with its
+        first manifest in one catalog commit.
+        """
+        table_name = plan.table_name
+        if self.catalog.table_exists(table_name):
+            raise ValueError(f"Table '{table_name}' already exists.")
+
+        reader = self._select(plan.query)
+        # `alias.column` of a join result
+        names = [re.sub(r"^\w+\.(\w+)$", r"\1", name) for name in reader.schema.names]
+        upper = [name.upper() for name in names]
+        duplicates = sorted({name for name in names if upper.count(name.upper()) > 1})
+        if duplicates:
+            raise ValueError(f"Column(s) {duplicates} appear more than once in the query of table {table_name}.")
+        reserved = [name for name in names if name.upper() in {n.upper() for n in PARTITION_FIELDS.names}]
+        if reserved:
+            raise ValueError(f"Column(s) {reserved} are reserved partition columns, can't create table {table_name}.")
+        reader = self._renamed(reader, names)
+
+        columns = sql_columns(reader.schema, table_name)
+        schema = pa.schema([(c["name"], SQL_TO_ARROW_TYPES[c["type"]]) for c in columns])
+        partitioning = parse_partitioning(plan.partitioning, names) if plan.partitioning else []
+        conform = conform_to_schema(reader.schema, schema, table_name)
+        rows, files = self._write_stream(table_name, map(conform, reader), schema, partitioning, None, COMPACTION_TARGET_FILE_SIZE,
+                                         lambda data_files, _: self.catalog.add_table(table_name, columns,
+                                                                                       partitioning=plan.partitioning,
+                                                                                       data_files=data_files))
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("commit", table=table_name, rows=rows, files=files)
+        return rows
+
+    def compact(self,
+                table_name: str,
+                target_file_size: int = COMPACTION_TARGET_FILE_SIZE,
+                sort_by: list[str] | None = None) -> dict:
+        """
+        Merge the small data files of every partition into files of up to `target_file_size` bytes,
+        optionally sorted by `sort_by`; files with deleted rows are rewritten without them. The merged files replace the originals in a single
+        manifest commit, so readers never see duplicates or gaps. Replaced files are left on
+        storage for readers of older snapshots until those are expired.
+        """
+        if not self.catalog.table_exists(table_name):
+            raise ValueError(f"Table '{table_name}' does not exist.")
+
+        manifest = self.catalog.get_manifest(table_name)
+        if manifest is None:
+            raise ValueError(f"Table '{table_name}' has no manifest to compact.")
 
-        print(list(zip(table_names, column_names)))
+        if sort_by:
+            schema_column_names = [c["name"].upper() for c in self.catalog.get_table(table_name)["schema"]]
+            invalid_cols = [col for col in sort_by if col.upper() not in schema_column_names]
+            if invalid_cols:
+                raise ValueError(f"Column(s) '{invalid_cols}' do not exist in table {table_name}.")
 
-        for table_name, columns in zip(table_names, column_names):
+        primary_key = self.catalog.primary_key(table_name)
+        arrow_schema = self.catalog.arrow_schema(table_name)
+        removed, added = [], []
+        for files in group_by_partition(manifest.files).values():
+            for group in plan_compaction(files, target_file_size):
+                # deleted rows are left out of the merged files, their deletion vectors fold in
+                table = pa.Table.from_batches(self.storage.scan_files(group, deletes=self._deletes(group), schema=arrow_schema))
+                if sort_by:
+                    table = table.sort_by([(col, "ascending") for col in sort_by])
 
-            if not self.catalog.table_exists(table_name):
-                raise ValueError(f"Table '{table_name}' does not exist.")
+                partition = group[0].partition
+                if DEFAULT_PARTITION_FIELD in partition:
+                    partition_date, partition = datetime.strptime(partition[DEFAULT_PARTITION_FIELD], "%Y-%m-%d"), None
+                else:
+                    partition_date = datetime.today()
+                data_file = self.storage.write(table_name, table, partition_date,
+                                               file_name=compacted_file_name(), partition=partition)
+                if primary_key:
+                    data_file.key_index = self.catalog.write_key_index(table_name, encode_keys(table, primary_key))
+                added.append(data_file)
+                removed.extend(group)
 
-            meta = self.catalog.get_table(table_name)
-            schema = meta.get("schema", None)
-            schema_column_names = [c["name"].upper() for c in schema]
+        if removed:
+            self.catalog.replace_files(table_name, removed, added)
 
-            if columns:
-                invalid_cols = [col for col in columns if col.upper() not in schema_column_names]
-                print("invalid_cols", invalid_cols)
-                if invalid_cols:
-                    raise ValueError(f"Column(s) '{invalid_cols}' do not exist in table {table_name}.")
+        return {"files_removed": len(removed), "files_added": len(added)}
 
-            # storage = self.catalog.dispatch_storage(table_name)
+    def expire_snapshots(self,
+                         table_name: str,
+                         older_than: datetime | None = None,
+                         retain_last: int = 1) -> dict:
+        """
+        Expire the snapshots committed before `older_than` (UTC, default now - SNAPSHOT_RETENTION),
+        keeping at least the last `retain_last`, and delete the data files only they referenced.
+        Orphan files under the table (e.g. written by failed inserts) that no retained snapshot
+        references and that were last modified before `older_than` are deleted too, as long as
+        they are older than ORPHAN_FILE_MIN_AGE: younger ones may belong to a commit in flight.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)  # snapshot and file times are naive UTC
+        older_than = utc_naive(older_than) if older_than else now - SNAPSHOT_RETENTION
+        if self.catalog.get_manifest(table_name) is None:
+            raise ValueError(f"Table '{table_name}' has no snapshot history.")
 
-            return self.storage.read(table_name=table_name,
-                                     columns=columns, 
-                                     limit=5)
+        expired, removed = self.catalog.expire_snapshots(table_name, older_than, retain_last)
+        self.storage.delete_files([f.path for f in removed])
 
+        live_paths = self.catalog.live_paths(table_name)
+        orphan_cutoff = min(older_than, now - ORPHAN_FILE_MIN_AGE)
+        orphans = [path for path, modified in self.storage.list_paths(table_name)
+                   if path not in live_paths and modified < orphan_cutoff]
+        self.storage.delete_files(orphans)
 
-    
\ No newline at end of file
+        return {"snapshots_expired": len(expired), "files_removed": len(removed), "orphans_removed": len(orphans)}
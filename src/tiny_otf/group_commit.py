@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable
+import pyarrow as pa
+
+from tiny_otf.config import GROUP_COMMIT_MAX_ROWS, GROUP_COMMIT_WINDOW
+from tiny_otf.instrumentation import INSTRUMENTATION
+
+# commits the rows of several INSERTs into a table at once, returns the error of each rejected INSERT
+GroupCommit = Callable[[str, list[pa.Table]], list[Exception | None]]
+
+
+class GroupCommitter:
+    """
+    Coalesce the INSERTs into a table: their rows are buffered for up to `window` seconds after
+    the first one (or until `max_rows` rows are buffered), then written as a single data file
+    per partition with a single manifest commit. Every INSERT gets a Future resolved once the
+    group holding its rows is committed, or failed with the INSERT's error.
+    """
+    def __init__(self,
+                 commit: GroupCommit,
+                 window: float = GROUP_COMMIT_WINDOW,
+                 max_rows: int = GROUP_COMMIT_MAX_ROWS):
+        self._commit = commit
+        self.window = window
+        self.max_rows = max_rows
+        self._buffers: dict[str, list[tuple[pa.Table, Future]]] = {}
+        self._rows: dict[str, int] = {}
+        self._timers: dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, table_name: str, table: pa.Table) -> Future:
+        future = Future()
+        with self._lock:
+            buffer = self._buffers.setdefault(table_name, [])
+            buffer.append((table, future))
+            self._rows[table_name] = self._rows.get(table_name, 0) + table.num_rows
+            full = self._rows[table_name] >= self.max_rows
+            if not full and len(buffer) == 1:  # first INSERT of the group opens the window
+                timer = threading.Timer(self.window, self.flush, args=(table_name,))
+                timer.daemon = True
+                timer.start()
+                self._timers[table_name] = timer
+        if full:
+            self.flush(table_name)
+        return future
+
+    def flush(self, table_name: str | None = None) -> None:
+        """Commit the buffered INSERTs of a table now, of all tables when None"""
+        with self._lock:
+            names = [table_name] if table_name else list(self._buffers)
+        for name in names:
+            with self._lock:
+                pending = self._buffers.pop(name, [])
+                self._rows.pop(name, None)
+                timer = self._timers.pop(name, None)
+            if timer is not None:
+                timer.cancel()
+            if not pending:
+                continue
+
+            if INSTRUMENTATION.enabled:
+                INSTRUMENTATION.emit("group_commit", table=name, inserts=len(pending),
+                                     rows=sum(t.num_rows for t, _ in pending))
+            try:
+                errors = self._commit(name, [table for table, _ in pending])
+            except Exception as error:  # the whole group failed, e.g. a commit conflict
+                errors = [error] * len(pending)
+            for (_, future), error in zip(pending, errors):
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
@@ -0,0 +1,93 @@
+import itertools
+from pathlib import Path
+from typing import Callable, Iterable
+import pyarrow as pa
+
+# file suffix -> pyarrow dataset format of an append source
+SOURCE_FORMATS = {".parquet": "parquet", ".csv": "csv", ".arrow": "ipc", ".ipc": "ipc", ".feather": "feather"}
+
+AppendSource = Iterable[pa.RecordBatch] | pa.RecordBatchReader | pa.Table | str | Path
+
+
+def source_reader(source: AppendSource, schema: pa.Schema) -> pa.RecordBatchReader:
+    """
+    Stream the batches of an append source: a RecordBatchReader, an Arrow table, an iterator of
+    record batches, or the path of a Parquet / CSV / Arrow IPC file or directory.
+    CSV columns are parsed straight into the types of the table `schema`.
+    """
+    if isinstance(source, pa.RecordBatchReader):
+        return source
+    if isinstance(source, pa.Table):
+        return source.to_reader()
+    if isinstance(source, (str, Path)):
+        import pyarrow.csv as csv
+        import pyarrow.dataset as ds
+        path = Path(source)
+        files = [path] if path.is_file() else sorted(p for p in path.rglob("*") if p.is_file())
+        suffix = files[0].suffix.lower() if files else ".parquet"
+        if suffix not in SOURCE_FORMATS:
+            raise ValueError(f"Unsupported source file type '{suffix}', expected one of {list(SOURCE_FORMATS)}.")
+        file_format = SOURCE_FORMATS[suffix]
+        if file_format == "csv":
+            file_format = ds.CsvFileFormat(convert_options=csv.ConvertOptions(column_types=schema))
+        return ds.dataset(str(path), format=file_format).scanner().to_reader()
+
+    # the first batch gives the schema of the stream
+    batches = iter(source)
+    first = next(batches, None)
+    if first is None:
+        return pa.RecordBatchReader.from_batches(schema, [])
+    return pa.RecordBatchReader.from_batches(first.schema, itertools.chain([first], batches))
+
+
+def sql_columns(schema: pa.Schema, table_name: str) -> list[dict[str, str]]:
+    """Catalog columns of a new table holding the data of `schema` (CREATE TABLE ... AS SELECT)"""
+    columns = []
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            column_type = "INT"
+        elif pa.types.is_floating(field.type) or pa.types.is_decimal(field.type):
+            column_type = "DOUBLE"
+        elif pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            column_type = "VARCHAR"
+        elif pa.types.is_date(field.type):
+            column_type = "DATE"
+        elif pa.types.is_timestamp(field.type):
+            column_type = "TIMESTAMP"
+        elif pa.types.is_boolean(field.type):
+            column_type = "BOOLEAN"
+        else:
+            raise ValueError(f"Column '{field.name}' of type {field.type} can't be stored in table {table_name}.")
+        columns.append({"name": field.name, "type": column_type})
+    return columns
+
+
+def conform_to_schema(source_schema: pa.Schema, schema: pa.Schema, table_name: str) -> Callable[[pa.RecordBatch], pa.Table]:
+    """
+    Check a source schema against the table schema once, and return the function
+    bringing every batch to the table schema: columns matched by name (case-insensitive)
+    and cast to the column types, columns missing from the source filled with NULLs.
+    """
+    names = {name.upper(): name for name in source_schema.names}
+    table_names = {name.upper() for name in schema.names}
+    invalid_cols = [name for name in source_schema.names if name.upper() not in table_names]
+    if invalid_cols:
+        raise ValueError(f"Column(s) '{invalid_cols}' do not exist in table {table_name}.")
+
+    for field in schema:
+        source_name = names.get(field.name.upper())
+        if source_name is None:
+            continue
+        source_type = source_schema.field(source_name).type
+        try:
+            pa.array([], type=source_type).cast(field.type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise ValueError(f"Column '{source_name}' of type {source_type} can't be stored "
+                             f"as {field.type} in table {table_name}.")
+
+    def conform(batch: pa.RecordBatch) -> pa.Table:
+        columns = [batch.column(names[field.name.upper()]).cast(field.type) if field.name.upper() in names
+                   else pa.nulls(batch.num_rows, type=field.type)
+                   for field in schema]
+        return pa.Table.from_arrays(columns, schema=schema)
+    return conform
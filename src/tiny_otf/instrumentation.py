@@ -0,0 +1,140 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+import pyarrow as pa
+
+Event = dict[str, Any]  # {"event": "scan", "table": "orders", "rows": 10, "duration_ms": 1.5, ...}
+Sink = Callable[[Event], None]
+
+
+class QueryProfile:
+    """Events of one query, in the order they were emitted, as collected for EXPLAIN [ANALYZE]"""
+    def __init__(self):
+        self.events: list[Event] = []
+        self._lock = threading.Lock()
+
+    def add(self, event: Event) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def lines(self) -> list[str]:
+        """One `event: key=value, ...` line per event"""
+        def fmt(value: Any) -> str:
+            return f"{value:.3f}" if isinstance(value, float) else " ".join(str(value).split())
+        return [f"{event['event']}: " + ", ".join(f"{key}={fmt(value)}" for key, value in event.items()
+                                                   if key != "event" and value is not None)
+                for event in self.events]
+
+
+_PROFILE: ContextVar[QueryProfile | None] = ContextVar("tiny_otf_profile", default=None)
+# EXPLAIN without ANALYZE: plan the query, but scans return no data
+_PLAN_ONLY: ContextVar[bool] = ContextVar("tiny_otf_plan_only", default=False)
+
+
+class Instrumentation:
+    """
+    Structured events of the engine: parse and planning time, files listed / pruned / read,
+    bytes and rows read, cache hits. Events go to the registered sinks (callbacks, e.g.
+    `logging_sink()`) and to the profile of the EXPLAIN ANALYZE running in the current context.
+    Call sites check `enabled` before building an event, so while nothing listens
+    instrumentation costs a single attribute lookup.
+    """
+    def __init__(self):
+        self.sinks: list[Sink] = []
+        self.enabled = False
+        self._profiles = 0
+        self._lock = threading.Lock()
+
+    def _update(self) -> None:
+        self.enabled = bool(self.sinks) or self._profiles > 0
+
+    def add_sink(self, sink: Sink) -> None:
+        with self._lock:
+            self.sinks = self.sinks + [sink]
+            self._update()
+
+    def remove_sink(self, sink: Sink) -> None:
+        with self._lock:
+            self.sinks = [s for s in self.sinks if s is not sink]
+            self._update()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        record = {"event": event, **fields}
+        profile = _PROFILE.get()
+        if profile is not None:
+            profile.add(record)
+        for sink in self.sinks:
+            sink(record)
+
+    @contextmanager
+    def stage(self, event: str, **fields: Any) -> Iterator[dict]:
+        """
+        Time the block as an `event` with its `duration_ms`; the block can add fields
+        to the yielded dict. A no-op while disabled.
+        """
+        if not self.enabled:
+            yield fields
+            return
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.emit(event, **fields, duration_ms=(time.perf_counter() - start) * 1000)
+
+    def counted(self, event: str, batches: Iterator[pa.RecordBatch], fields: dict) -> Iterator[pa.RecordBatch]:
+        """
+        Pass a stream of batches through, then emit `event` with `fields` (which the producer
+        may still be updating), the rows and batches produced and the time spent producing them.
+        """
+        rows = n_batches = 0
+        elapsed = 0.0
+        start = time.perf_counter()
+        for batch in batches:
+            elapsed += time.perf_counter() - start
+            rows += batch.num_rows
+            n_batches += 1
+            yield batch
+            start = time.perf_counter()
+        elapsed += time.perf_counter() - start
+        self.emit(event, **fields, rows=rows, batches=n_batches, duration_ms=elapsed * 1000)
+
+    @contextmanager
+    def profile(self, plan_only: bool = False, profile: QueryProfile | None = None) -> Iterator[QueryProfile]:
+        """
+        Collect the events of the queries run in the block (in this context) into a QueryProfile,
+        a new one or `profile` to continue.
+        """
+        profile = profile or QueryProfile()
+        profile_token, plan_only_token = _PROFILE.set(profile), _PLAN_ONLY.set(plan_only)
+        with self._lock:
+            self._profiles += 1
+            self._update()
+        try:
+            yield profile
+        finally:
+            _PROFILE.reset(profile_token)
+            _PLAN_ONLY.reset(plan_only_token)
+            with self._lock:
+                self._profiles -= 1
+                self._update()
+
+    @staticmethod
+    def plan_only() -> bool:
+        return _PLAN_ONLY.get()
+
+
+INSTRUMENTATION = Instrumentation()
+
+
+def logging_sink(logger: logging.Logger | None = None, level: int = logging.INFO) -> Sink:
+    """Sink writing every event as one JSON log record, the event dict is also in `record.tiny_otf`"""
+    logger = logger or logging.getLogger("tiny_otf")
+
+    def sink(event: Event) -> None:
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps(event, default=str), extra={"tiny_otf": event})
+    return sink
@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlglot import exp
+
+# build sides with at most this many distinct keys are pushed to the probe scan as an IN filter
+JOIN_RUNTIME_FILTER_MAX_KEYS = 10_000
+# hidden column numbering the build rows, to find the ones no probe row matched
+BUILD_ROW = "__build_row"
+
+
+@dataclass
+class JoinClause:
+    """
+    `[LEFT] JOIN <table_name> [<alias>] ON <on>` of a SELECT. Only equi-joins are supported,
+    `on` is a conjunction of `left.col = right.col` comparisons.
+    """
+    table_name: str
+    alias: str  # qualifier of the table's columns, the table name when not aliased
+    how: str  # inner, left
+    on: exp.Expression
+
+    @staticmethod
+    def from_expr(join: exp.Join) -> "JoinClause":
+        side, kind = join.side.upper(), join.kind.upper()
+        if side not in ("", "LEFT") or kind not in ("", "INNER", "OUTER"):
+            raise NotImplementedError(f"Only INNER and LEFT joins are supported: {join.sql()}")
+        on = join.args.get("on")
+        if on is None:
+            raise NotImplementedError(f"Only joins with an ON condition are supported: {join.sql()}")
+        return JoinClause(table_name=join.this.name,
+                          alias=join.this.alias_or_name,
+                          how="left" if side == "LEFT" else "inner",
+                          on=on)
+
+    def key_pairs(self) -> list[tuple[exp.Column, exp.Column]]:
+        """The `a.x = b.y` comparisons of the ON condition"""
+        pairs = []
+        for node in conjuncts(self.on):
+            if not (isinstance(node, exp.EQ) and isinstance(node.this, exp.Column)
+                    and isinstance(node.expression, exp.Column)):
+                raise NotImplementedError(f"Only equi-joins on columns are supported: {self.on.sql()}")
+            pairs.append((node.this, node.expression))
+        return pairs
+
+
+def conjuncts(condition: exp.Expression | None) -> list[exp.Expression]:
+    """The AND-ed terms of a condition, e.g. of a WHERE clause to push to the table scans"""
+    if condition is None:
+        return []
+    if isinstance(condition, exp.And):
+        return conjuncts(condition.this) + conjuncts(condition.expression)
+    if isinstance(condition, exp.Paren):
+        return conjuncts(condition.this)
+    return [condition]
+
+
+class HashJoin:
+    """
+    Equi-join of streamed probe batches against a build table held in memory, executed by
+    Arrow (Acero) batch by batch so the probe side is never materialized. `how` is
+    "inner", "probe_outer" (probe rows without a match are kept, null extended) or
+    "build_outer" (build rows no probe row matched are emitted by `finish`).
+    """
+    def __init__(self,
+                 build: pa.Table,
+                 build_keys: list[str],
+                 probe_keys: list[str],
+                 how: str):
+        self.build = build.append_column(BUILD_ROW, pa.array(np.arange(build.num_rows), type=pa.int64()))
+        self.build_keys = build_keys
+        self.probe_keys = probe_keys
+        self.how = how
+        self._matched = np.zeros(build.num_rows, dtype=bool)
+
+    def runtime_filter(self) -> pa.Array | None:
+        """
+        Distinct build keys of a single-key inner join, to filter the probe scan with:
+        probe rows outside them can't match. None when there are too many of them.
+        """
+        if self.how != "inner" or len(self.build_keys) != 1:
+            return None
+        keys = pc.unique(self.build.column(self.build_keys[0]).drop_null())
+        return keys if len(keys) <= JOIN_RUNTIME_FILTER_MAX_KEYS else None
+
+    def join(self, batch: pa.RecordBatch | pa.Table) -> pa.Table:
+        probe = pa.Table.from_batches([batch]) if isinstance(batch, pa.RecordBatch) else batch
+        joined = probe.join(self.build,
+                            keys=self.probe_keys,
+                            right_keys=self.build_keys,
+                            join_type="left outer" if self.how == "probe_outer" else "inner",
+                            coalesce_keys=False)
+        if self.how == "build_outer":
+            self._matched[joined.column(BUILD_ROW).to_numpy(zero_copy_only=False)] = True
+        return joined.drop_columns([BUILD_ROW])
+
+    def finish(self, probe_schema: pa.Schema) -> pa.Table | None:
+        """Build rows without any match, null extended on the probe columns, for a build_outer join"""
+        if self.how != "build_outer":
+            return None
+        unmatched = self.build.filter(pa.array(~self._matched)).drop_columns([BUILD_ROW])
+        columns = {field.name: pa.nulls(unmatched.num_rows, type=field.type) for field in probe_schema}
+        columns.update({name: unmatched.column(name) for name in unmatched.column_names})
+        return pa.table(columns)
+
+
+class JoinScope:
+    """
+    The tables of a join by alias, resolving column references (`c.name` or an unambiguous
+    `name`) to their table. Joined batches name columns `<alias>.<column>`, so equally
+    named columns of different tables don't collide.
+    """
+    def __init__(self, aliases: list[str], columns: dict[str, list[str]]):
+        self.aliases = aliases
+        self.columns = {alias: {name.upper(): name for name in names} for alias, names in columns.items()}
+
+    def resolve(self, column: exp.Column) -> tuple[str, str]:
+        """(alias, column name as stored) of a column reference"""
+        name = column.name.upper()
+        if column.table:
+            owners = [alias for alias in self.aliases if alias.upper() == column.table.upper()]
+            if not owners:
+                raise ValueError(f"Table '{column.table}' is not part of the query.")
+        else:
+            owners = [alias for alias in self.aliases if name in self.columns[alias]]
+            if len(owners) > 1:
+                raise ValueError(f"Column '{column.name}' is ambiguous, qualify it with one of {owners}.")
+        if not owners or name not in self.columns[owners[0]]:
+            raise ValueError(f"Column(s) '{[column.sql()]}' do not exist.")
+        return owners[0], self.columns[owners[0]][name]
+
+    def internal(self, column: exp.Column) -> str:
+        """Name of a column in the joined batches"""
+        return "{}.{}".format(*self.resolve(column))
+
+    def localize(self, condition: exp.Expression) -> exp.Expression:
+        """Condition on a single table with its columns unqualified, to push to the table's scan"""
+        return condition.transform(lambda node: exp.column(self.resolve(node)[1]) if isinstance(node, exp.Column) else node)
+
+    def internalize(self, condition: exp.Expression) -> exp.Expression:
+        """Condition with its columns named as in the joined batches"""
+        return condition.transform(lambda node: exp.column(self.internal(node)) if isinstance(node, exp.Column) else node)
@@ -0,0 +1,152 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterator
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from tiny_otf.table_catalog.manifest import DEFAULT_PARTITION_FIELD
+
+# year(col), month(col), day(col), hour(col), bucket(N, col), truncate(W, col) or a bare column name
+PARTITION_SPEC = re.compile(r"^\s*(?:(?P<transform>\w+)\s*\(\s*(?:(?P<param>\d+)\s*,\s*)?(?P<source>\w+)\s*\)|(?P<column>\w+))\s*$")
+TEMPORAL_FORMATS = {"year": "%Y", "month": "%Y-%m", "day": "%Y-%m-%d", "hour": "%Y-%m-%d-%H"}
+# Hidden partition columns, parsed from the partition directories and usable in WHERE
+PARTITION_FIELDS = pa.schema([(DEFAULT_PARTITION_FIELD, pa.date32())])
+# directory name of rows whose partition value is NULL
+NULL_PARTITION = "__NULL__"
+
+
+@dataclass
+class PartitionField:
+    """
+    A hidden partition derived from a table column, e.g. `day(event_ts)` or `bucket(16, user_id)`.
+    Partition values are strings: ISO prefixes for the temporal transforms, numbers otherwise.
+    """
+    transform: str  # identity, year, month, day, hour, bucket, truncate
+    source: str
+    param: int | None = None
+
+    @property
+    def name(self) -> str:
+        return self.source if self.transform == "identity" else f"{self.source}_{self.transform}"
+
+    @property
+    def is_monotonic(self) -> bool:
+        """Ordered source values give ordered partition values, so range predicates can prune"""
+        return self.transform != "bucket"
+
+    @staticmethod
+    def parse(spec: str) -> "PartitionField":
+        match = PARTITION_SPEC.match(spec)
+        if match is None:
+            raise ValueError(f"Invalid partition transform '{spec}'.")
+        if match.group("column"):
+            return PartitionField("identity", match.group("column"))
+
+        transform, param = match.group("transform").lower(), match.group("param")
+        if transform in TEMPORAL_FORMATS or transform == "identity":
+            if param is not None:
+                raise ValueError(f"Partition transform '{transform}' takes a single column: '{spec}'.")
+        elif transform in ("bucket", "truncate"):
+            if param is None or int(param) <= 0:
+                raise ValueError(f"Partition transform '{transform}' needs a positive width: '{spec}'.")
+        else:
+            raise ValueError(f"Unsupported partition transform '{transform}' in '{spec}'.")
+        return PartitionField(transform, match.group("source"), int(param) if param else None)
+
+    def apply(self, values: pa.Array | pa.ChunkedArray) -> pa.Array:
+        """Partition value (string, null for null input) of every row"""
+        if isinstance(values, pa.ChunkedArray):
+            values = values.combine_chunks()
+
+        match self.transform:
+            case "identity":
+                return pc.cast(values, pa.string())
+            case "year" | "month" | "day" | "hour":
+                if pa.types.is_date(values.type):
+                    values = pc.cast(values, pa.timestamp("s"))
+                return pc.strftime(values, TEMPORAL_FORMATS[self.transform])
+            case "bucket":
+                return self._buckets(values)
+            case "truncate" if pa.types.is_string(values.type):
+                return pc.utf8_slice_codeunits(values, 0, self.param)
+            case "truncate":
+                # floor to a multiple of the width, also for negative values
+                numbers = pc.fill_null(values, 0).to_numpy(zero_copy_only=False)
+                truncated = pa.array(numbers - np.mod(numbers, self.param),
+                                     mask=values.is_null().to_numpy(zero_copy_only=False))
+                return pc.cast(truncated, pa.string())
+
+    def _buckets(self, values: pa.Array) -> pa.Array:
+        from pandas.util import hash_array  # pandas is only needed (and imported) for bucket transforms
+        texts = pc.cast(values, pa.string())
+        hashes = hash_array(np.asarray(texts.to_numpy(zero_copy_only=False), dtype=object), categorize=False)
+        buckets = pa.array(hashes % np.uint64(self.param), mask=texts.is_null().to_numpy(zero_copy_only=False))
+        return pc.cast(buckets, pa.string())
+
+    def value_of(self, literal: Any, arrow_type: pa.DataType) -> str | None:
+        """Partition value of a literal from a WHERE clause, None when it can't be computed"""
+        if literal is None:
+            return None
+        if isinstance(literal, str) and (pa.types.is_temporal(arrow_type)):
+            try:
+                literal = datetime.fromisoformat(literal)
+            except ValueError:
+                return None
+        if isinstance(literal, datetime) and pa.types.is_date(arrow_type):
+            literal = literal.date()
+        try:
+            scalar = pa.scalar(literal).cast(arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            return None
+        return self.apply(pa.array([scalar.as_py()], type=arrow_type))[0].as_py()
+
+    def compare(self, partition_value: str, value: str, arrow_type: pa.DataType) -> int:
+        """Order of two partition values of this field, numeric for numeric identity/truncate partitions"""
+        left, right = partition_value, value
+        if self.transform in ("identity", "truncate") and (pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)):
+            left, right = float(partition_value), float(value)
+        return (left > right) - (left < right)
+
+
+def parse_partitioning(specs: list[str] | None, column_names: list[str]) -> list[PartitionField]:
+    """Partition fields of a table, checking their source columns exist"""
+    fields = [PartitionField.parse(spec) for spec in specs or []]
+    names = {name.upper() for name in column_names}
+    invalid_cols = [f.source for f in fields if f.source.upper() not in names]
+    if invalid_cols:
+        raise ValueError(f"Partition column(s) '{invalid_cols}' do not exist.")
+    return fields
+
+
+def partition_path(partition: dict[str, str | None]) -> str:
+    """Hive-style directory of a partition, e.g. `event_ts_day=2025-06-04/user_id_bucket=3`"""
+    return "/".join(f"{name}={NULL_PARTITION if value is None else value}" for name, value in partition.items())
+
+
+def split_by_partition(table: pa.Table,
+                       fields: list[PartitionField]) -> Iterator[tuple[dict[str, str | None], pa.Table]]:
+    """
+    Split a batch into one table per distinct partition, with a single sort of the rows
+    rather than a filter pass per partition.
+    """
+    names = {name.upper(): name for name in table.column_names}
+    values = [field.apply(table.column(names[field.source.upper()])) for field in fields]
+    keys = pc.binary_join_element_wise(*[pc.fill_null(v, NULL_PARTITION) for v in values], "/") \
+        if len(values) > 1 else pc.fill_null(values[0], NULL_PARTITION)
+
+    encoded = keys.dictionary_encode()
+    indices = encoded.indices.to_numpy(zero_copy_only=False)
+    order = np.argsort(indices, kind="stable")
+    counts = np.bincount(indices, minlength=len(encoded.dictionary))
+    table = table.take(pa.array(order))
+
+    start = 0
+    for count in counts:
+        if not count:
+            continue
+        first_row = int(order[start])
+        partition = {field.name: value[first_row].as_py() for field, value in zip(fields, values)}
+        yield partition, table.slice(start, int(count))
+        start += int(count)
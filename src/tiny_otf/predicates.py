@@ -0,0 +1,356 @@
+from datetime import date, datetime, time
+from typing import Any
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlglot import exp
+
+from tiny_otf.partitioning import PartitionField
+from tiny_otf.table_catalog.manifest import DataFile
+
+# comparison node -> (arrow operator, operator with sides swapped)
+COMPARISONS = {
+    exp.EQ: ("==", "=="),
+    exp.NEQ: ("!=", "!="),
+    exp.GT: (">", "<"),
+    exp.GTE: (">=", "<="),
+    exp.LT: ("<", ">"),
+    exp.LTE: ("<=", ">="),
+}
+
+
+def literal_value(expr: exp.Expression) -> Any:
+    """
+    Convert a sqlglot literal expression into a python value.
+    """
+    match type(expr):
+        case exp.Literal:
+            if expr.is_string:
+                return expr.this
+            number = expr.this
+            return int(number) if number.lstrip("-").isdigit() else float(number)
+        case exp.Boolean:
+            return expr.this
+        case exp.Null:
+            return None
+        case exp.Neg:
+            return -literal_value(expr.this)
+        case exp.Paren:
+            return literal_value(expr.this)
+        case exp.Placeholder:
+            raise ValueError(f"Unbound parameter '{expr.name}', bind the prepared statement first.")
+        case exp.Cast:
+            value = literal_value(expr.this)
+            if expr.to.is_type(exp.DataType.Type.DATE):
+                return date.fromisoformat(value)
+            if expr.to.is_type(*exp.DataType.TEMPORAL_TYPES):
+                return datetime.fromisoformat(value)
+            return value
+        case _:
+            raise NotImplementedError(f"Unsupported literal in WHERE clause: {expr.sql()}")
+
+
+def _column_and_literal(node: exp.Binary) -> tuple[str, Any, bool] | None:
+    """
+    Split a binary comparison into (column name, literal value, swapped).
+    `swapped` is True when the literal was on the left hand side.
+    """
+    left, right = node.this, node.expression
+    if isinstance(left, exp.Column) and not isinstance(right, exp.Column):
+        return left.name, literal_value(right), False
+    if isinstance(right, exp.Column) and not isinstance(left, exp.Column):
+        return right.name, literal_value(left), True
+    return None
+
+
+def referenced_columns(condition: exp.Expression) -> list[str]:
+    return list(dict.fromkeys(col.name for col in condition.find_all(exp.Column)))
+
+
+def resolve_columns(condition: exp.Expression, names: list[str]) -> exp.Expression:
+    """`condition` with its columns named as in `names`, which SQL matches case-insensitively"""
+    stored = {name.upper(): name for name in names}
+    return condition.transform(lambda node: exp.column(stored.get(node.name.upper(), node.name))
+                               if isinstance(node, exp.Column) else node)
+
+
+##### ARROW FILTERS #####
+def _arrow_literal(value: Any, arrow_type: pa.DataType | None) -> Any:
+    """Coerce a literal to the column type so e.g. `age = '34'` or `_dt = '2025-06-04'` compare correctly"""
+    if arrow_type is None or value is None:
+        return value
+    try:
+        return pa.scalar(value).cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        return value
+
+
+def to_arrow_filter(condition: exp.Expression,
+                    field_types: dict[str, pa.DataType] | None = None) -> pc.Expression:
+    """
+    Translate a WHERE condition into a pyarrow.dataset filter expression.
+    Supported: comparisons, IN, BETWEEN, IS [NOT] NULL, NOT, AND, OR.
+    """
+    field_types = field_types or {}
+    node_type = type(condition)
+
+    if node_type in COMPARISONS:
+        split = _column_and_literal(condition)
+        if split is None:
+            raise NotImplementedError(f"Unsupported comparison in WHERE clause: {condition.sql()}")
+        name, value, swapped = split
+        op = COMPARISONS[node_type][1 if swapped else 0]
+        field, literal = pc.field(name), _arrow_literal(value, field_types.get(name))
+        match op:
+            case "==": return field == literal
+            case "!=": return field != literal
+            case ">": return field > literal
+            case ">=": return field >= literal
+            case "<": return field < literal
+            case "<=": return field <= literal
+
+    match condition:
+        case exp.And():
+            return to_arrow_filter(condition.this, field_types) & to_arrow_filter(condition.expression, field_types)
+        case exp.Or():
+            return to_arrow_filter(condition.this, field_types) | to_arrow_filter(condition.expression, field_types)
+        case exp.Not():
+            return ~to_arrow_filter(condition.this, field_types)
+        case exp.Paren():
+            return to_arrow_filter(condition.this, field_types)
+        case exp.In() if isinstance(condition.this, exp.Column):
+            name = condition.this.name
+            values = [_arrow_literal(literal_value(v), field_types.get(name)) for v in condition.expressions]
+            return pc.field(name).isin([v.as_py() if isinstance(v, pa.Scalar) else v for v in values])
+        case exp.Between() if isinstance(condition.this, exp.Column):
+            name = condition.this.name
+            low = _arrow_literal(literal_value(condition.args["low"]), field_types.get(name))
+            high = _arrow_literal(literal_value(condition.args["high"]), field_types.get(name))
+            return (pc.field(name) >= low) & (pc.field(name) <= high)
+        case exp.Is() if isinstance(condition.this, exp.Column) and isinstance(condition.expression, exp.Null):
+            return pc.field(condition.this.name).is_null()
+        case exp.Column():  # boolean column used as a predicate
+            return pc.field(condition.name)
+
+    raise NotImplementedError(f"Unsupported expression in WHERE clause: {condition.sql()}")
+
+
+# arithmetic node -> arrow compute function
+ARITHMETIC = {
+    exp.Add: pc.add,
+    exp.Sub: pc.subtract,
+    exp.Mul: pc.multiply,
+    exp.Div: pc.divide,
+}
+
+
+def to_arrow_value(expr: exp.Expression,
+                   field_types: dict[str, pa.DataType] | None = None,
+                   arrow_type: pa.DataType | None = None) -> pc.Expression:
+    """
+    Translate the value of an UPDATE SET into a pyarrow expression evaluated on every row.
+    Supported: literals (coerced to `arrow_type`), NULL, columns, unary minus and + - * /.
+    """
+    field_types = field_types or {}
+    match expr:
+        case exp.Column():
+            return pc.field(expr.name)
+        case exp.Paren():
+            return to_arrow_value(expr.this, field_types, arrow_type)
+        case exp.Neg() if not isinstance(expr.this, exp.Literal):
+            return pc.negate(to_arrow_value(expr.this, field_types, arrow_type))
+        case _ if type(expr) in ARITHMETIC:
+            return ARITHMETIC[type(expr)](to_arrow_value(expr.this, field_types, arrow_type),
+                                          to_arrow_value(expr.expression, field_types, arrow_type))
+    value = _arrow_literal(literal_value(expr), arrow_type)
+    return pc.scalar(value.as_py() if isinstance(value, pa.Scalar) else value)
+
+
+##### FILE PRUNING #####
+def _comparable(stat: Any, value: Any) -> tuple[Any, Any] | None:
+    """
+    Bring a manifest statistic (json value, dates stored as ISO strings) and a literal
+    to the same type. Returns None when they can't be compared, meaning "can't prune".
+    """
+    if isinstance(value, (date, datetime)) or (isinstance(value, str) and isinstance(stat, str)):
+        try:
+            stat_dt = datetime.fromisoformat(stat) if isinstance(stat, str) else stat
+            value_dt = datetime.fromisoformat(value) if isinstance(value, str) else value
+            if not isinstance(stat_dt, datetime):
+                stat_dt = datetime.combine(stat_dt, time())
+            if not isinstance(value_dt, datetime):
+                value_dt = datetime.combine(value_dt, time())
+            return stat_dt.replace(tzinfo=None), value_dt.replace(tzinfo=None)
+        except (TypeError, ValueError):
+            if isinstance(value, str) and isinstance(stat, str):
+                return stat, value
+            return None
+    if isinstance(stat, str) != isinstance(value, str):
+        return None
+    return stat, value
+
+
+def _range_may_contain(low: Any, high: Any, op: str, value: Any) -> bool:
+    if low is None or high is None or value is None:
+        return True
+    low_pair, high_pair = _comparable(low, value), _comparable(high, value)
+    if low_pair is None or high_pair is None:
+        return True
+    (low, value_low), (high, value_high) = low_pair, high_pair
+    try:
+        match op:
+            case "==": return low <= value_low and value_high <= high
+            case "!=": return not (low == high == value_low)
+            case ">": return high > value_high
+            case ">=": return high >= value_high
+            case "<": return low < value_low
+            case "<=": return low <= value_low
+    except TypeError:
+        return True
+    return True
+
+
+def _file_stats(data_file: DataFile, name: str) -> dict[str, Any] | None:
+    """Column statistics of a data file; partition values act as exact single-value stats"""
+    if name in data_file.column_stats or name not in data_file.partition:
+        return data_file.column_stats.get(name)
+    value = data_file.partition[name]
+    if value is None:
+        return {"min": None, "max": None, "null_count": data_file.record_count}
+    return {"min": value, "max": value, "null_count": 0}
+
+
+# upper-cased source column -> partition transforms of that column with its arrow type
+Transforms = dict[str, list[tuple[PartitionField, pa.DataType]]]
+
+def _transforms_may_contain(data_file: DataFile, transforms: Transforms, name: str, op: str, value: Any) -> bool:
+    """
+    Whether the file's transform partition values, e.g. `event_ts_day=2025-06-04`, allow rows
+    with `name <op> value`: the literal goes through the same transform and is compared
+    with the partition value. Ranges only prune on order-preserving transforms.
+    """
+    for field, arrow_type in transforms.get(name.upper(), []):
+        if field.name not in data_file.partition:
+            continue
+        partition_value = data_file.partition[field.name]
+        if partition_value is None:
+            return False  # every row of the file has a NULL source value, no comparison holds
+        if op == "!=" or (op != "==" and not field.is_monotonic):
+            continue
+        target = field.value_of(value, arrow_type)
+        if target is None:
+            continue
+        order = field.compare(partition_value, target, arrow_type)
+        if (op == "==" and order != 0) or (op in (">", ">=") and order < 0) or (op in ("<", "<=") and order > 0):
+            return False
+    return True
+
+
+def _value_may_match(data_file: DataFile, name: str, op: str, value: Any, transforms: Transforms) -> bool:
+    if not _transforms_may_contain(data_file, transforms, name, op, value):
+        return False
+    stats = _file_stats(data_file, name)
+    if not stats:
+        return True
+    return _range_may_contain(stats["min"], stats["max"], op, value)
+
+
+def range_may_match(data_file: DataFile, name: str, low: Any, high: Any) -> bool:
+    """Whether the file's statistics of column `name` allow values in [`low`, `high`], e.g. the keys of an INSERT"""
+    stats = _file_stats(data_file, name)
+    if not stats:
+        return True
+    return (_range_may_contain(stats["min"], stats["max"], ">=", low)
+            and _range_may_contain(stats["min"], stats["max"], "<=", high))
+
+
+def may_match(condition: exp.Expression, data_file: DataFile, transforms: Transforms | None = None) -> bool:
+    """
+    Decide from partition values and min/max/null statistics whether a data file
+    can contain rows matching the condition. Only returns False when it certainly can't.
+    """
+    transforms = transforms or {}
+    node_type = type(condition)
+
+    if node_type in COMPARISONS:
+        split = _column_and_literal(condition)
+        if split is None:
+            return True
+        name, value, swapped = split
+        return _value_may_match(data_file, name, COMPARISONS[node_type][1 if swapped else 0], value, transforms)
+
+    match condition:
+        case exp.And():
+            return may_match(condition.this, data_file, transforms) and may_match(condition.expression, data_file, transforms)
+        case exp.Or():
+            return may_match(condition.this, data_file, transforms) or may_match(condition.expression, data_file, transforms)
+        case exp.Paren():
+            return may_match(condition.this, data_file, transforms)
+        case exp.In() if isinstance(condition.this, exp.Column):
+            return any(_value_may_match(data_file, condition.this.name, "==", literal_value(v), transforms)
+                       for v in condition.expressions)
+        case exp.Between() if isinstance(condition.this, exp.Column):
+            name = condition.this.name
+            return (_value_may_match(data_file, name, ">=", literal_value(condition.args["low"]), transforms)
+                    and _value_may_match(data_file, name, "<=", literal_value(condition.args["high"]), transforms))
+        case exp.Is() if isinstance(condition.this, exp.Column) and isinstance(condition.expression, exp.Null):
+            stats = _file_stats(data_file, condition.this.name)
+            if not stats or stats.get("null_count") is None:
+                return True
+            return stats["null_count"] > 0
+        case exp.Not() if isinstance(condition.this, exp.Is) and isinstance(condition.this.expression, exp.Null):
+            stats = _file_stats(data_file, condition.this.this.name)
+            if not stats or stats.get("null_count") is None:
+                return True
+            return stats["null_count"] < data_file.record_count
+
+    # anything else (NOT, functions, column-to-column comparisons) can't be pruned safely
+    return True
+
+
+def prune_files(files: list[DataFile],
+                condition: exp.Expression | None,
+                partitioning: list[PartitionField] | None = None,
+                field_types: dict[str, pa.DataType] | None = None) -> list[DataFile]:
+    """
+    Drop the data files (and so whole partitions) that cannot match the WHERE condition
+    before any of them is opened. With the table's `partitioning` and column `field_types`,
+    predicates on the source columns of partition transforms prune too.
+    """
+    if condition is None:
+        return files
+    types = {name.upper(): arrow_type for name, arrow_type in (field_types or {}).items()}
+    transforms: Transforms = {}
+    for field in partitioning or []:
+        if types.get(field.source.upper()) is not None:
+            transforms.setdefault(field.source.upper(), []).append((field, types[field.source.upper()]))
+    return [f for f in files if may_match(condition, f, transforms)]
+
+
+def exact_partition_files(files: list[DataFile],
+                          condition: exp.Expression | None,
+                          partition_types: dict[str, pa.DataType]) -> list[DataFile] | None:
+    """
+    The files whose rows all match a condition on partition columns only (`partition_types`
+    maps their names to arrow types), deciding file by file from the partition values.
+    None when the condition references other columns, so rows would have to be read.
+    """
+    if condition is None:
+        return files
+    names = {name.upper(): name for name in partition_types}
+    referenced = referenced_columns(condition)
+    if any(col.upper() not in names for col in referenced):
+        return None
+    values = {}
+    for col in referenced:
+        name = names[col.upper()]
+        if any(name not in f.partition for f in files):
+            return None
+        try:
+            values[col] = pa.array([f.partition[name] for f in files], type=pa.string()).cast(partition_types[name])
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            return None
+    # one row of partition values per file, filtered like the data itself
+    values["__file"] = pa.array(range(len(files)), type=pa.int64())
+    matching = pa.table(values).filter(to_arrow_filter(condition, {col: partition_types[names[col.upper()]]
+                                                                   for col in referenced}))
+    return [files[i] for i in matching.column("__file").to_pylist()]
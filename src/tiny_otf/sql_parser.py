@@ -1,45 +1,300 @@
+import re
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Optional, Tuple
-import pandas as pd
-from sqlglot import parse_one, exp, errors
+from datetime import date, datetime
+from functools import cached_property
+from typing import Any, Optional, Sequence
+import pyarrow as pa
+from sqlglot import parse_one, exp
+from tiny_otf.aggregation import Aggregate
+from tiny_otf.join import JoinClause
+from tiny_otf.config import PLAN_CACHE_MAX_SQL_LENGTH, PLAN_CACHE_SIZE
+from tiny_otf.instrumentation import INSTRUMENTATION
+
+# INSERT INTO <table> [(<columns>)] VALUES ..., the head is left to sqlglot
+INSERT_VALUES_HEAD = re.compile(r"^\s*INSERT\s+INTO\s+[\w.\"]+\s*(\([^'()]*\))?\s*VALUES\s*", re.IGNORECASE)
+VALUES_TOKEN = re.compile(r"""\s*(?:
+    (?P<open>\()|(?P<close>\))|(?P<comma>,)|
+    (?P<string>'(?:[^']|'')*')|
+    (?P<typed>(?:DATE|TIMESTAMP)\s*'[^']*')|
+    (?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|
+    (?P<keyword>TRUE|FALSE|NULL)\b
+    )""", re.IGNORECASE | re.VERBOSE)
+
+def _values_literal(kind: str, text: str) -> exp.Expression:
+    """Build the same sqlglot node parse_one would for a VALUES literal"""
+    match kind:
+        case "string":
+            return exp.Literal.string(text[1:-1].replace("''", "'"))
+        case "number" if text.startswith("-"):
+            return exp.Neg(this=exp.Literal.number(text[1:]))
+        case "number":
+            return exp.Literal.number(text)
+        case "typed":
+            type_name, value = text.split("'", 1)
+            return exp.Cast(this=exp.Literal.string(value[:-1]),
+                            to=exp.DataType(this=exp.DataType.Type[type_name.strip().upper()], nested=False))
+        case "keyword" if text.upper() == "NULL":
+            return exp.Null()
+        case "keyword":
+            return exp.Boolean(this=text.upper() == "TRUE")
+
+def _scan_values(body: str) -> list[exp.Tuple] | None:
+    """
+    Scan the rows of a VALUES list made of plain literals without running the full sqlglot
+    tokenizer and parser over every value. Returns None on anything else (expressions,
+    nested parentheses, ...) so the statement falls back to parse_one.
+    """
+    rows, row, pos, end = [], None, 0, len(body.rstrip().rstrip(";").rstrip())
+    expect_value = expect_comma = False
+
+    while pos < end:
+        match = VALUES_TOKEN.match(body, pos)
+        if match is None:
+            return None
+        kind, text, pos = match.lastgroup, match.group(match.lastgroup), match.end()
+
+        if row is None:  # between rows
+            if kind == "open" and not expect_comma:
+                row, expect_value = [], True
+            elif kind == "comma" and expect_comma:
+                expect_comma = False
+            else:
+                return None
+        elif kind == "close" and row and not expect_value:
+            rows.append(exp.Tuple(expressions=row))
+            row, expect_comma = None, True
+        elif kind == "comma" and not expect_value:
+            expect_value = True
+        elif kind not in ("open", "close", "comma") and expect_value:
+            row.append(_values_literal(kind, text))
+            expect_value = False
+        else:
+            return None
+
+    return rows if rows and row is None and expect_comma else None
+
+# whitespace / positional `?` parameters outside of string literals
+SQL_WHITESPACE = re.compile(r"('(?:[^']|'')*')|\s+")
+SQL_POSITIONAL_PARAMETER = re.compile(r"('(?:[^']|'')*')|\?")
+# `?` are parsed as named placeholders :__param0, :__param1, ... in SQL text order,
+# the parsed tree doesn't keep the text order (a Select holds LIMIT before WHERE)
+POSITIONAL_PARAMETER = "__param"
+
+def _name_positional_parameters(sql: str) -> str:
+    position = -1
+    def name(match: re.Match) -> str:
+        nonlocal position
+        if match.group(1):
+            return match.group(1)
+        position += 1
+        return f":{POSITIONAL_PARAMETER}{position}"
+    return SQL_POSITIONAL_PARAMETER.sub(name, sql)
+
+# EXPLAIN [ANALYZE] <statement>, the statement is planned on its own
+EXPLAIN_PREFIX = re.compile(r"^\s*EXPLAIN(\s+ANALYZE)?\s+", re.IGNORECASE)
+# SQL:2011 `FOR SYSTEM_TIME AS OF` is parsed as Trino's equivalent `FOR TIMESTAMP AS OF`
+SQL_SYSTEM_TIME = re.compile(r"('(?:[^']|'')*')|\bFOR\s+SYSTEM_TIME\s+AS\s+OF\b", re.IGNORECASE)
+
+def _rewrite_system_time(sql: str) -> str:
+    return SQL_SYSTEM_TIME.sub(lambda match: match.group(1) or "FOR TIMESTAMP AS OF", sql)
+
+def normalize_sql(sql: str) -> str:
+    """Plan cache key: collapse whitespace outside string literals and drop the trailing `;`"""
+    return SQL_WHITESPACE.sub(lambda m: m.group(1) or " ", sql).strip().rstrip(";").rstrip()
+
+class PlanCache:
+    """
+    Bounded, thread-safe LRU cache of PreparedStatements keyed by (normalized SQL, dialect).
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], "PreparedStatement"] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str]) -> Optional["PreparedStatement"]:
+        with self._lock:
+            statement = self._entries.get(key)
+            if statement is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return statement
+
+    def put(self, key: tuple[str, str], statement: "PreparedStatement") -> None:
+        with self._lock:
+            self._entries[key] = statement
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+PLAN_CACHE = PlanCache(PLAN_CACHE_SIZE)
 
 class SqlParser:
     """
-    Dispatches SqlPlans based on sqlglot query type (Create, Select, Insert)
+    Dispatches SqlPlans based on sqlglot query type (Create, Select, Insert, Delete, Update),
+    CREATE TABLE ... AS SELECT and INSERT ... SELECT included
     """
     def __init__(self, dialect:str, sql_statement:str):
         self.dialect = dialect 
         self.sql_statement = sql_statement
+        explain = EXPLAIN_PREFIX.match(sql_statement)
+        # None, or whether the statement is under EXPLAIN ANALYZE (True) or EXPLAIN (False)
+        self.explain: bool | None = bool(explain.group(1)) if explain else None
+        self.statement_sql = sql_statement[explain.end():] if explain else sql_statement
 
-    @property
+    @cached_property
     def parsed_sql(self) -> exp:
-        try:
-            parsed_sql = parse_one(sql=self.sql_statement, dialect=self.dialect)
-        except errors.ParseError as e:
-            print(e.errors)
-        return parsed_sql
-    
-    # Dispatch related class based on parsed_sql type: Create, Insert, Select
-    def to_plan(self):
-        expr = self.parsed_sql
+        # Batch loads: only the INSERT head goes through sqlglot, the literal rows are scanned directly
+        head = INSERT_VALUES_HEAD.match(self.statement_sql)
+        rows = _scan_values(self.statement_sql[head.end():]) if head else None
+        if rows:
+            parsed_sql = parse_one(sql=f"{head.group(0)} (NULL)", dialect=self.dialect)
+            parsed_sql.set("expression", exp.Values(expressions=rows))
+            return parsed_sql
+
+        sql = _name_positional_parameters(self.statement_sql) if "?" in self.statement_sql else self.statement_sql
+        sql = _rewrite_system_time(sql) if "SYSTEM_TIME" in sql.upper() else sql
+        return parse_one(sql=sql, dialect=self.dialect)
+
+    def to_plan(self) -> "BasePlan":
+        return self.prepare().plan
+
+    def prepare(self) -> "PreparedStatement":
+        """
+        Parse and plan the statement once per normalized SQL and dialect, repeated calls are
+        served from the LRU plan cache. Large one-off statements (batch INSERTs) are not cached.
+        """
+        with INSTRUMENTATION.stage("parse", sql_length=len(self.sql_statement)) as stage:
+            if len(self.sql_statement) > PLAN_CACHE_MAX_SQL_LENGTH:
+                stage["cached"] = False
+                return PreparedStatement(self.parsed_sql, self.explain)
+
+            key = (normalize_sql(self.sql_statement), self.dialect)
+            statement = PLAN_CACHE.get(key)
+            stage["cached"] = statement is not None
+            if statement is None:
+                statement = PreparedStatement(self.parsed_sql, self.explain)
+                PLAN_CACHE.put(key, statement)
+            return statement
+
+    @staticmethod
+    def cache_info() -> dict:
+        """Hit/miss counters and size of the plan cache"""
+        return PLAN_CACHE.info()
+
+    # Dispatch related class based on parsed_sql type: Create, Insert, Select, Delete, Update
+    @staticmethod
+    def plan_from_expr(expr: exp.Expression) -> "BasePlan":
         # here we are dispatching related plans 
         # using the static method from_expr
         # use `match` for object type matching
         match type(expr):
             case exp.Create:
-                # if expr.args.get("expression"):  # CTAS
-                #     return CTASPlan.from_expr(expr)
+                if isinstance(expr.expression, exp.Select):  # CTAS
+                    return CTASPlan.from_expr(expr)
                 return CreateTablePlan.from_expr(expr)
 
             case exp.Insert:
+                if isinstance(expr.expression, exp.Select):
+                    return InsertSelectPlan.from_expr(expr)
                 return InsertPlan.from_expr(expr)
 
             case exp.Select:
                 return SelectPlan.from_expr(expr)
 
+            case exp.Delete:
+                return DeletePlan.from_expr(expr)
+
+            case exp.Update:
+                return UpdatePlan.from_expr(expr)
+
             case _:
                 raise NotImplementedError(f"Unsupported SQL type: {type(expr)}")
+
+def _to_literal(value: Any) -> exp.Expression:
+    """Python parameter value -> the sqlglot literal the parser would produce for it"""
+    match value:
+        case None:
+            return exp.Null()
+        case bool():
+            return exp.Boolean(this=value)
+        case int() | float() if value < 0:
+            return exp.Neg(this=exp.Literal.number(-value))
+        case int() | float():
+            return exp.Literal.number(value)
+        case str():
+            return exp.Literal.string(value)
+        case datetime():
+            return exp.Cast(this=exp.Literal.string(value.isoformat(sep=" ")),
+                            to=exp.DataType(this=exp.DataType.Type.TIMESTAMP, nested=False))
+        case date():
+            return exp.Cast(this=exp.Literal.string(value.isoformat()),
+                            to=exp.DataType(this=exp.DataType.Type.DATE, nested=False))
+        case _:
+            raise ValueError(f"Unsupported parameter type: {type(value).__name__}")
+
+class PreparedStatement:
+    """
+    A parsed and planned statement. Statements with `?` or `:name` placeholders are bound
+    to new values with `bind`, which puts literals into a copy of the parsed tree and
+    re-plans it, without parsing the SQL again.
+    """
+    def __init__(self, expr: exp.Expression, explain: bool | None = None):
+        self.expr = expr
+        self.explain = explain  # None, or ANALYZE of an EXPLAIN statement
+        self.placeholders = list(expr.find_all(exp.Placeholder))
+        self.plan = self._plan(expr)
+
+    def _plan(self, expr: exp.Expression) -> "BasePlan":
+        plan = SqlParser.plan_from_expr(expr)
+        return plan if self.explain is None else ExplainPlan(plan, analyze=self.explain)
+
+    def _values(self, params: Sequence[Any] | dict[str, Any]) -> dict[str, Any]:
+        """Parameter values by placeholder name, positional `?` are named by their position"""
+        names = {p.name for p in self.placeholders}
+        positional = [name for name in names if name.startswith(POSITIONAL_PARAMETER)]
+
+        if isinstance(params, dict):
+            missing = sorted(name for name in names if name not in params)
+            if missing:
+                raise ValueError(f"Missing value(s) for parameter(s) {missing}.")
+            return params
+
+        if len(positional) != len(names):
+            raise ValueError("Named parameters must be bound with a dict.")
+        if len(params) != len(positional):
+            raise ValueError(f"Statement has {len(positional)} parameter(s), {len(params)} given.")
+        return {f"{POSITIONAL_PARAMETER}{i}": value for i, value in enumerate(params)}
+
+    def bind(self, params: Sequence[Any] | dict[str, Any] | None = None) -> "BasePlan":
+        """
+        Plan of the statement with positional (`?`) or named (`:name`) parameters bound.
+        """
+        if not self.placeholders:
+            if params:
+                raise ValueError("Statement has no parameters to bind.")
+            return self.plan
+
+        values = self._values(params or [])
+        expr = self.expr.copy()
+        for placeholder in list(expr.find_all(exp.Placeholder)):
+            placeholder.replace(_to_literal(values[placeholder.name]))
+        return self._plan(expr)
         
 ##### PLANS #####
 class BasePlan(ABC):
@@ -54,10 +309,10 @@ class BasePlan(ABC):
 class DataCarryingPlan(BasePlan):
     """
     Abstract class DataCarryingPlan is used to enforce certain functions in downstream classes that interact with data.
-    Currently enforced functions a.k.a abstract methods: to_dataframe()
+    Currently enforced functions a.k.a abstract methods: to_arrow()
     """
     @abstractmethod
-    def to_dataframe(self) -> pd.DataFrame:
+    def to_arrow(self, schema: pa.Schema) -> pa.Table:
         ...
 
 @dataclass
@@ -65,6 +320,8 @@ class CreateTablePlan(BasePlan):
     table_name: str
     columns: list[dict[str, str]]  # [{"name": "id", "type": "INT"}, {}]
     raw_expr: exp.Create
+    primary_key: list[str] | None = None
+    partitioning: list[str] | None = None  # ["day(event_ts)", "bucket(16, user_id)"]
 
 
     @staticmethod
@@ -74,113 +331,167 @@ class CreateTablePlan(BasePlan):
         table_name = table_expr.name
 
         columns = []
+        primary_key = []
         for coldef in schema_expr.expressions:
             if isinstance(coldef, exp.ColumnDef):
                 column_name = coldef.this.name
                 column_type = coldef.args["kind"].this.value
                 columns.append({"name": column_name, "type": column_type})
+                # id INT PRIMARY KEY
+                if any(isinstance(c.kind, exp.PrimaryKeyColumnConstraint) for c in coldef.constraints):
+                    primary_key.append(column_name)
+            else:
+                # PRIMARY KEY (a, b) / CONSTRAINT pk PRIMARY KEY (a, b)
+                for pk in coldef.find_all(exp.PrimaryKey):
+                    primary_key.extend(col.name for col in pk.find_all(exp.Column))
 
         return CreateTablePlan(
             table_name=table_name,
             columns=columns,
-            raw_expr=expr
+            raw_expr=expr,
+            primary_key=primary_key or None,
+            partitioning=_partitioning(expr)
         )
 
+def _partitioning(expr: exp.Create) -> list[str] | None:
+    """WITH (partitioning = ARRAY['day(event_ts)', 'bucket(16, user_id)'])"""
+    partitioning = None
+    for prop in (expr.args.get("properties") or exp.Properties()).expressions:
+        if isinstance(prop, exp.Property) and prop.name.lower() == "partitioning":
+            values = prop.args["value"].expressions if isinstance(prop.args["value"], exp.Array) else [prop.args["value"]]
+            partitioning = [value.name for value in values]
+    return partitioning
+
+@dataclass
+class CTASPlan(BasePlan):
+    """
+    `CREATE TABLE <table> [WITH (partitioning = ...)] AS SELECT ...`: the columns and their types
+    come from the query result, which is streamed into the new table's files.
+    """
+    table_name: str
+    raw_expr: exp.Create
+    query: "SelectPlan"
+    partitioning: list[str] | None = None
+
+    @staticmethod
+    def from_expr(expr: exp.Create) -> "CTASPlan":
+        return CTASPlan(table_name=expr.this.name,
+                        raw_expr=expr,
+                        query=SelectPlan.from_expr(expr.expression),
+                        partitioning=_partitioning(expr))
+
+@dataclass
+class ExplainPlan(BasePlan):
+    """
+    `EXPLAIN [ANALYZE] <statement>`: the plan of the statement (tables, files left after pruning,
+    aggregation and join strategies), with ANALYZE executed and profiled stage by stage.
+    """
+    statement: BasePlan
+    analyze: bool = False
+
+    @staticmethod
+    def from_expr(expr: exp.Expression, analyze: bool = False) -> "ExplainPlan":
+        return ExplainPlan(SqlParser.plan_from_expr(expr), analyze)
+
+def _literal_text(val: exp.Expression) -> str | None:
+    """
+    Raw text of a VALUES literal; typing is left to a single Arrow cast per column.
+    """
+    match type(val):
+        case exp.Literal:
+            return val.this
+        case exp.Boolean:
+            return "true" if val.this else "false"
+        case exp.Null:
+            return None
+        case exp.Cast:  # DATE '2022-01-15'
+            return _literal_text(val.this)
+        case exp.Neg:
+            return f"-{_literal_text(val.this)}"
+        case exp.Placeholder:
+            raise ValueError(f"Unbound parameter '{val.name}', bind the prepared statement first.")
+        case _:
+            raise NotImplementedError(f"Unsupported value in INSERT: {val.sql()}")
+
 @dataclass
 class InsertPlan(DataCarryingPlan):
     table_name: str
     column_names: Optional[list[str]]
-    column_values: list[list[Any]]  # row-wise values
-    inferred_types: list[str]  # e.g., ['int', 'str', 'float']
     raw_expr: exp.Insert
 
-    @staticmethod
-    def _get_column_values_and_types(expr_values: exp.Values) -> Tuple[list[list[Any]], list[str]]:
-        expr_list = expr_values.expressions
-        # nested list of row values where row value is also a list
-        values = []
-        dtypes = []
-
-        # rows
-        for i, row in enumerate(expr_list):
-            row_value = [] # values for a single row
-
-            # columns
-            for val in row.expressions:
-                match type(val):
-                    case exp.Cast:
-                        row_value.append(val.this.this)
-                        if i==0:
-                            dtypes.append('DATE')
-                    case exp.Literal:
-                        row_value.append(val.this)
-                        if i==0 and val.is_string:
-                            dtypes.append('VARCHAR')
-                        elif i==0:
-                            dtypes.append('INT')
-                    case exp.Boolean:
-                        row_value.append(val.this)
-                        if i==0:
-                            dtypes.append('BOOLEAN')
-
-                # if isinstance(val, exp.Literal):
-                #     # Row values &  Infer dtypes from the first row only
-                #     if val.is_string:
-                #         row_value.append(val.this)
-                #         if i==0:
-                #             dtypes.append('VARCHAR')
-                #     else:
-                #         try:
-                #             row_value.append(float(val.this))
-                #             if i==0:
-                #                 dtypes.append('FLOAT')
-                #         except ValueError:
-                #             row_value.append(int(val.this))
-                #             if i==0:
-                #                 dtypes.append('INT')
-                # else:
-                #     row_value.append(val.this)  # fallback for expressions
-
-            values.append(row_value)
-        print("dtypes: ", dtypes)
-        print("values: ", values)
-        return values, dtypes
-
     @staticmethod
     def from_expr(expr: exp.Insert) -> "InsertPlan":
         table_name = expr.this.this.name
         column_names = [col.name for col in (expr.this.expressions or [])]
 
-        column_values, inferred_types = InsertPlan._get_column_values_and_types(expr.expression) # Each row is a list of values
-
         return InsertPlan(
             table_name=table_name,
             column_names=column_names,
-            column_values=column_values,
-            inferred_types=inferred_types,
             raw_expr=expr
         )
-    
-    def to_dataframe(self, type_mapping: dict) -> pd.DataFrame:
+
+    def to_arrow(self, schema: pa.Schema) -> pa.Table:
         """
-        Create a dataframe from Insert values, mapping the data types as well.
+        Build an Arrow table from the Insert values column by column, typed by the table schema
+        rather than inferred from the first row. Columns missing from the INSERT are filled with nulls.
         """
-        if self.column_names != []:
-            df = pd.DataFrame(self.column_values, columns=self.column_names)
+        rows = [row.expressions for row in self.raw_expr.expression.expressions]
+        names = self.column_names or schema.names
 
-            for col, col_type in zip(self.column_names, self.inferred_types):
-                df[col] = df[col].astype(type_mapping[col_type])
-            print(df)
-        else:
-            df = pd.DataFrame(self.column_values)
+        if any(len(row) != len(names) for row in rows):
+            raise ValueError(f"Every row must have {len(names)} values for columns {names}.")
+
+        columns = {name.upper(): values for name, values in zip(names, zip(*rows))}
+        arrays = []
+        for field in schema:
+            values = columns.get(field.name.upper())
+            if values is None:
+                arrays.append(pa.nulls(len(rows), field.type))
+                continue
 
-        return df
+            texts = pa.array([_literal_text(val) for val in values], type=pa.string())
+            try:
+                arrays.append(texts if field.type == pa.string() else texts.cast(field.type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"Values of column '{field.name}' can't be converted to {field.type}: {e}")
+
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+@dataclass
+class InsertSelectPlan(BasePlan):
+    """
+    `INSERT INTO <table> [(columns)] SELECT ...`: the query result is streamed into the table,
+    its columns matched to `column_names` (all table columns by default) by position.
+    """
+    table_name: str
+    column_names: list[str] | None
+    raw_expr: exp.Insert
+    query: "SelectPlan"
+
+    @staticmethod
+    def from_expr(expr: exp.Insert) -> "InsertSelectPlan":
+        # INSERT INTO t (a, b) SELECT ... / INSERT INTO t SELECT ...
+        target = expr.this
+        column_names = [col.name for col in target.expressions] if isinstance(target, exp.Schema) else []
+        table = target.this if isinstance(target, exp.Schema) else target
+        return InsertSelectPlan(table_name=table.name,
+                                column_names=column_names or None,
+                                raw_expr=expr,
+                                query=SelectPlan.from_expr(expr.expression))
 
 @dataclass
 class SelectPlan(BasePlan):
     table_names: list[str]
     select_expr: exp.Select
     column_names: list[list[Any]] | None = None # List of column names for each table
+    where: exp.Expression | None = None # WHERE condition, pushed down to storage
+    limit: int | None = None
+    offset: int | None = None
+    as_of: dict[str, exp.Version] | None = None # FOR VERSION / TIMESTAMP AS OF per table, for time travel
+    group_by: list[str] | None = None # GROUP BY columns of an aggregate query
+    aggregates: list[Aggregate] | None = None # SELECT list of an aggregate query, in order
+    joins: list[JoinClause] | None = None # JOINs to the first table, in order
+    aliases: list[str] | None = None # column qualifier of each of `table_names`
 
     @property
     def is_select_star(self) -> bool:     
@@ -189,22 +500,110 @@ class SelectPlan(BasePlan):
     @staticmethod
     def from_expr(expr: exp.Select) -> "SelectPlan":
         tables = [t.name for t in expr.find_all(exp.Table)]
+        joins = [JoinClause.from_expr(join) for join in expr.args.get("joins") or []] or None
+        aliases = None
+        if joins:
+            from_table = expr.args["from"].this
+            tables = [from_table.name] + [join.table_name for join in joins]
+            aliases = [from_table.alias_or_name] + [join.alias for join in joins]
+        as_of = {t.name: t.args["version"] for t in expr.find_all(exp.Table) if t.args.get("version")} or None
         is_select_star = any(isinstance(expr, exp.Star) for expr in expr.expressions)
+        where = expr.args.get("where")
+        limit = expr.args.get("limit")
+        offset = expr.args.get("offset")
+        # a `?` LIMIT of a prepared statement is only known once bound
+        limit = int(limit.expression.name) if limit and isinstance(limit.expression, exp.Literal) else None
+        offset = int(offset.expression.name) if offset and isinstance(offset.expression, exp.Literal) else None
+
+        group = expr.args.get("group")
+        if group or any(e.find(exp.AggFunc) for e in expr.expressions):
+            if is_select_star:
+                raise ValueError("SELECT * can't be combined with aggregates or GROUP BY.")
+            if expr.args.get("having"):
+                raise NotImplementedError("HAVING is not supported yet.")
+            if group and not all(isinstance(g, exp.Column) for g in group.expressions):
+                raise NotImplementedError(f"Only GROUP BY on columns is supported: {group.sql()}")
+            group_by = [g.name for g in group.expressions] if group else []
+            aggregates = [Aggregate.from_expr(e) for e in expr.expressions]
+            grouped = {col.upper() for col in group_by}
+            ungrouped = [a.column for a in aggregates if a.function is None and a.column.upper() not in grouped]
+            if ungrouped:
+                raise ValueError(f"Column(s) '{ungrouped}' must appear in the GROUP BY clause or be used in an aggregate.")
+            return SelectPlan(
+                table_names=tables,
+                select_expr=expr,
+                # columns to scan: group keys and aggregated columns
+                column_names=[list(dict.fromkeys(group_by + [a.column for a in aggregates if a.column]))],
+                where=where.this if where else None,
+                limit=limit,
+                offset=offset,
+                as_of=as_of,
+                group_by=group_by,
+                aggregates=aggregates,
+                joins=joins,
+                aliases=aliases
+            )
 
         if is_select_star:
             return SelectPlan(
                 table_names=tables,
-                select_expr=expr
+                select_expr=expr,
+                where=where.this if where else None,
+                limit=limit,
+                offset=offset,
+                as_of=as_of,
+                joins=joins,
+                aliases=aliases
             )
         else:
             column_names = [[col.name for col in expr.expressions ]]
-            print("column_names", column_names)
             # column_names = expr.expressions.column.this.this
             return SelectPlan(
                 table_names=tables,
                 select_expr=expr,
-                column_names = column_names
+                column_names = column_names,
+                where=where.this if where else None,
+                limit=limit,
+                offset=offset,
+                as_of=as_of,
+                joins=joins,
+                aliases=aliases
             )
 
+@dataclass
+class DeletePlan(BasePlan):
+    """`DELETE FROM <table> [WHERE ...]`, executed as deletion vectors of the matching rows"""
+    table_name: str
+    raw_expr: exp.Delete
+    where: exp.Expression | None = None
+
+    @staticmethod
+    def from_expr(expr: exp.Delete) -> "DeletePlan":
+        where = expr.args.get("where")
+        return DeletePlan(table_name=expr.this.name,
+                          raw_expr=expr,
+                          where=where.this if where else None)
 
+@dataclass
+class UpdatePlan(BasePlan):
+    """
+    `UPDATE <table> SET col = expr, ... [WHERE ...]`, executed as deletion vectors of the
+    matching rows plus their updated versions appended as new data files.
+    """
+    table_name: str
+    raw_expr: exp.Update
+    assignments: dict[str, exp.Expression]  # column -> new value, a literal or arithmetic on columns
+    where: exp.Expression | None = None
 
+    @staticmethod
+    def from_expr(expr: exp.Update) -> "UpdatePlan":
+        assignments = {}
+        for assignment in expr.expressions:
+            if not isinstance(assignment, exp.EQ) or not isinstance(assignment.this, exp.Column):
+                raise NotImplementedError(f"Unsupported assignment in UPDATE: {assignment.sql()}")
+            assignments[assignment.this.name] = assignment.expression
+        where = expr.args.get("where")
+        return UpdatePlan(table_name=expr.this.name,
+                          raw_expr=expr,
+                          assignments=assignments,
+                          where=where.this if where else None)
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.fs as fs
+
+DISK_CACHE_MAX_BYTES = 10 * 1024 * 1024 * 1024  # local copies of remote objects
+
+
+class DiskCache:
+    """
+    Read-through cache of remote objects on local disk with a size cap and LRU eviction.
+    Data files are immutable, so a cached copy is validated once per process against the
+    remote ETag (a HEAD request, no download). Cached copies are read through memory maps.
+    """
+    def __init__(self, directory: str | Path, max_bytes: int = DISK_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0  # bytes served locally instead of downloaded
+        self.bytes_downloaded = 0
+        self.bytes = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()  # key -> size, least recently used first
+        self._validated: set[str] = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Pick up copies left by earlier processes, oldest access first"""
+        files = [f for f in self.directory.iterdir() if f.suffix == ".bin"]
+        for f in sorted(files, key=lambda f: f.stat().st_atime):
+            self._entries[f.stem] = f.stat().st_size
+            self.bytes += f.stat().st_size
+        self._evict()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return hashlib.sha256(path.encode()).hexdigest()
+
+    def _data_path(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def _etag_path(self, key: str) -> Path:
+        return self.directory / f"{key}.etag"
+
+    def _evict(self) -> None:
+        while self.bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.bytes -= size
+            # open memory maps of an evicted copy stay readable until they are closed
+            self._data_path(key).unlink(missing_ok=True)
+            self._etag_path(key).unlink(missing_ok=True)
+            self._validated.discard(key)
+
+    def _is_valid(self, remote: fs.FileSystem, path: str, key: str) -> bool:
+        if key in self._validated:
+            return True
+        etag_path = self._etag_path(key)
+        cached_etag = etag_path.read_text() if etag_path.exists() else ""
+        with remote.open_input_file(path) as f:
+            valid = f.metadata().get("ETag", b"").decode() == cached_etag
+        if valid:
+            self._validated.add(key)
+        return valid
+
+    def _download(self, remote: fs.FileSystem, path: str, key: str) -> int:
+        """Stream the object to a temp file and move it in place, so readers never see partial copies"""
+        tmp_path = self.directory / f".tmp-{uuid.uuid4().hex}"
+        with remote.open_input_stream(path) as source, open(tmp_path, "wb") as sink:
+            etag = source.metadata().get("ETag", b"").decode()
+            while chunk := source.read(8 * 1024 * 1024):
+                sink.write(chunk)
+        self._etag_path(key).write_text(etag)
+        os.replace(tmp_path, self._data_path(key))
+        return self._data_path(key).stat().st_size
+
+    def open(self, remote: fs.FileSystem, path: str) -> pa.MemoryMappedFile:
+        """Memory-mapped local copy of the remote object `path`, downloaded on a miss"""
+        key = self._key(path)
+        with self._lock:
+            cached = key in self._entries
+        if cached and self._is_valid(remote, path, key):
+            try:
+                source = pa.memory_map(str(self._data_path(key)))
+            except FileNotFoundError:  # evicted in the meantime
+                source = None
+            if source is not None:
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.bytes_saved += source.size()
+                return source
+
+        size = self._download(remote, path, key)
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += size
+            self.bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._validated.add(key)
+            source = pa.memory_map(str(self._data_path(key)))
+            self._evict()
+        return source
+
+    def clear(self) -> None:
+        with self._lock:
+            max_bytes, self.max_bytes = self.max_bytes, 0
+            self._evict()
+            self.max_bytes = max_bytes
+            self.hits = self.misses = self.bytes_saved = self.bytes_downloaded = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "hit_ratio": self.hits / lookups if lookups else 0.0,
+                    "bytes_saved": self.bytes_saved,
+                    "bytes_downloaded": self.bytes_downloaded,
+                    "entries": len(self._entries),
+                    "bytes": self.bytes,
+                    "max_bytes": self.max_bytes}
+
+    @staticmethod
+    def since(before: dict, after: dict) -> dict:
+        """Cache activity between two `info()` snapshots, e.g. of a single query"""
+        hits, misses = after["hits"] - before["hits"], after["misses"] - before["misses"]
+        return {"hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+                "bytes_saved": after["bytes_saved"] - before["bytes_saved"],
+                "bytes_downloaded": after["bytes_downloaded"] - before["bytes_downloaded"]}
+
+
+_CACHES: dict[Path, DiskCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+def shared_disk_cache(directory: str | Path, max_bytes: int = DISK_CACHE_MAX_BYTES) -> DiskCache:
+    """One DiskCache per directory in the process, so storages share its index and budget"""
+    directory = Path(directory).absolute()
+    with _CACHES_LOCK:
+        if directory not in _CACHES:
+            _CACHES[directory] = DiskCache(directory, max_bytes)
+        return _CACHES[directory]
+
+
+class CachedFileSystemHandler(fs.FileSystemHandler):
+    """
+    pyarrow filesystem reading through a DiskCache; listings, writes and deletes go
+    straight to the remote filesystem. Wrap it with `pyarrow.fs.PyFileSystem`.
+    """
+    def __init__(self, remote: fs.FileSystem, cache: DiskCache):
+        self.remote = remote
+        self.cache = cache
+
+    def __eq__(self, other):
+        return isinstance(other, CachedFileSystemHandler) and self.remote.equals(other.remote) and self.cache is other.cache
+
+    def __ne__(self, other):
+        return not self == other
+
+    def get_type_name(self):
+        return f"cached+{self.remote.type_name}"
+
+    def normalize_path(self, path):
+        return self.remote.normalize_path(path)
+
+    def get_file_info(self, paths):
+        return self.remote.get_file_info(paths)
+
+    def get_file_info_selector(self, selector):
+        return self.remote.get_file_info(selector)
+
+    def open_input_file(self, path):
+        return self.cache.open(self.remote, path)
+
+    def open_input_stream(self, path):
+        return self.cache.open(self.remote, path)
+
+    def open_output_stream(self, path, metadata):
+        return self.remote.open_output_stream(path, metadata=metadata)
+
+    def open_append_stream(self, path, metadata):
+        return self.remote.open_append_stream(path, metadata=metadata)
+
+    def create_dir(self, path, recursive):
+        self.remote.create_dir(path, recursive=recursive)
+
+    def delete_dir(self, path):
+        self.remote.delete_dir(path)
+
+    def delete_dir_contents(self, path, missing_dir_ok=False):
+        self.remote.delete_dir_contents(path, missing_dir_ok=missing_dir_ok)
+
+    def delete_root_dir_contents(self):
+        self.remote.delete_dir_contents("/", accept_root_dir=True)
+
+    def delete_file(self, path):
+        self.remote.delete_file(path)
+
+    def move(self, src, dest):
+        self.remote.move(src, dest)
+
+    def copy_file(self, src, dest):
+        self.remote.copy_file(src, dest)
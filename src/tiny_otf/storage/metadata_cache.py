@@ -0,0 +1,102 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Hashable
+
+if TYPE_CHECKING:  # fragments come from the storage, the engine imports the cache without pyarrow.dataset
+    import pyarrow.dataset as ds
+
+FOOTER_CACHE_BUDGET_BYTES = 64 * 1024 * 1024  # serialized footer bytes kept in memory
+FOOTER_LOAD_CONCURRENCY = 8  # footers fetched in parallel on cache misses
+
+
+class FooterCache:
+    """
+    Process-wide, thread-safe LRU cache of Parquet fragments with their footer
+    (schema, row groups, statistics) already parsed. A cached fragment is scanned
+    without re-reading its footer. Entries are keyed by (store, path, size, version),
+    where version is the mtime or ETag when known; data files are immutable, so a changed
+    file shows up under a new key. Memory is bounded by the serialized footer sizes.
+    """
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[ds.ParquetFileFragment, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> ds.ParquetFileFragment | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _store(self, key: Hashable, fragment: ds.ParquetFileFragment) -> None:
+        size = fragment.metadata.serialized_size
+        with self._lock:
+            if size > self.budget_bytes or key in self._entries:
+                return
+            self._entries[key] = (fragment, size)
+            self.bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.bytes > self.budget_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def fragments(self,
+                  keys: list[Hashable],
+                  make_fragment: Callable[[int], ds.ParquetFileFragment]) -> list[ds.ParquetFileFragment]:
+        """
+        Fragments for `keys`, in order. Misses are built with `make_fragment(index)`,
+        their footers fetched concurrently and added to the cache.
+        """
+        fragments = [self._lookup(key) for key in keys]
+        missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+
+        def load(i: int) -> ds.ParquetFileFragment:
+            fragment = make_fragment(i)
+            fragment.ensure_complete_metadata()
+            self._store(keys[i], fragment)
+            return fragment
+
+        if len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=min(FOOTER_LOAD_CONCURRENCY, len(missing))) as pool:
+                loaded = list(pool.map(load, missing))
+        else:
+            loaded = [load(i) for i in missing]
+
+        for i, fragment in zip(missing, loaded):
+            fragments[i] = fragment
+        return fragments
+
+    def resize(self, budget_bytes: int) -> None:
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "entries": len(self._entries),
+                    "bytes": self.bytes,
+                    "budget_bytes": self.budget_bytes}
+
+
+FOOTER_CACHE = FooterCache(FOOTER_CACHE_BUDGET_BYTES)
@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterator
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from tiny_otf.table_catalog.deletion_vector import DeletionVector
+
+SCAN_MAX_WORKERS = os.cpu_count() or 4  # row groups decoded in parallel
+SCAN_PREFETCH_BYTES = 256 * 1024 * 1024  # decoded data buffered ahead of the consumer
+SCAN_QUEUED_TASKS_PER_WORKER = 2  # row groups queued per worker, so workers never wait for the consumer to plan
+
+
+def _compressed_bytes(metadata: pq.FileMetaData, row_groups: list, columns: list[str]) -> int:
+    """Compressed size of the chunks of `columns` in the given row groups, as read from storage"""
+    columns = set(columns)
+    total = 0
+    for rg in row_groups:
+        row_group = metadata.row_group(rg.id)
+        for i in range(row_group.num_columns):
+            chunk = row_group.column(i)
+            if chunk.path_in_schema.split(".")[0] in columns:
+                total += chunk.total_compressed_size
+    return total
+
+
+def read_live_rows(fragment: ds.Fragment,
+                   schema: pa.Schema,
+                   columns: list[str],
+                   filter: pc.Expression | None,
+                   keep: np.ndarray) -> pa.Table:
+    """
+    Rows of a fragment holding deleted rows: the deletion mask `keep` only lines up with
+    the rows as stored, so the fragment is decoded without the filter, masked, then filtered.
+    """
+    table = fragment.to_table(schema=schema, use_threads=False).filter(pa.array(keep))
+    if filter is not None:
+        table = table.filter(filter)
+    return table.select(columns)
+
+
+def row_group_tasks(dataset: ds.Dataset,
+                    columns: list[str],
+                    filter: pc.Expression | None,
+                    stats: dict | None = None,
+                    deletes: dict[str, DeletionVector] | None = None) -> Iterator[tuple[ds.Fragment, int, np.ndarray | None]]:
+    """
+    Row group fragments of the scan with the estimated size of their projected columns, and
+    the mask of their rows to keep when the file's deletion vector (`deletes`, by fragment path)
+    hits the row group. `stats` counts the files, row groups and compressed bytes of the
+    projected column chunks read.
+    """
+    for fragment in dataset.get_fragments(filter=filter):
+        if stats is not None:
+            stats["files_read"] += 1
+        if not isinstance(fragment, ds.ParquetFileFragment):
+            yield fragment, 0, None
+            continue
+        projected = len(columns) / max(1, len(fragment.physical_schema))
+        deletion_vector = (deletes or {}).get(fragment.path)
+        if deletion_vector is not None:
+            metadata = fragment.metadata
+            offsets = np.cumsum([0] + [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)])
+        for row_group in fragment.split_by_row_group(filter, schema=dataset.schema):
+            if stats is not None:
+                stats["row_groups"] += len(row_group.row_groups)
+                stats["bytes_read"] += _compressed_bytes(fragment.metadata, row_group.row_groups, columns)
+            keep = None
+            if deletion_vector is not None:  # split_by_row_group gives single row group fragments
+                rg = row_group.row_groups[0]
+                keep = deletion_vector.keep_mask(int(offsets[rg.id]), rg.num_rows)
+            yield row_group, int(sum(rg.total_byte_size for rg in row_group.row_groups) * projected), keep
+
+
+class ScanScheduler:
+    """
+    Parallel scan of a dataset, split into one task per row group (row groups whose
+    statistics can't match the filter are dropped while splitting). Tasks run on a bounded
+    thread pool ahead of the consumer; the data they buffer is capped at about `prefetch_bytes`,
+    estimated from the row group sizes in the footers. Batches come in file and row group order
+    when `ordered`, otherwise as soon as their row group is decoded. Row groups holding rows of a
+    deletion vector are masked, the others are decoded as usual.
+    """
+    def __init__(self, max_workers: int = SCAN_MAX_WORKERS, prefetch_bytes: int = SCAN_PREFETCH_BYTES):
+        self.max_workers = max_workers
+        self.prefetch_bytes = prefetch_bytes
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool created on the first scan and shared by all scans of the storage"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tiny-otf-scan")
+            return self._executor
+
+    def scan(self,
+             dataset: ds.Dataset,
+             columns: list[str],
+             filter: pc.Expression | None = None,
+             ordered: bool = True,
+             stats: dict | None = None,
+             deletes: dict[str, DeletionVector] | None = None) -> Iterator[pa.RecordBatch]:
+        def decode(fragment: ds.Fragment, keep: np.ndarray | None) -> list[pa.RecordBatch]:
+            if keep is not None:
+                return read_live_rows(fragment, dataset.schema, columns, filter, keep).to_batches()
+            return fragment.to_table(schema=dataset.schema, columns=columns, filter=filter, use_threads=False).to_batches()
+
+        tasks = row_group_tasks(dataset, columns, filter, stats, deletes)
+        pending: deque[tuple[Future, int]] = deque()
+        buffered = 0
+        try:
+            while True:
+                # keep the workers busy within the memory budget, at least one task is always running
+                while len(pending) < self.max_workers * SCAN_QUEUED_TASKS_PER_WORKER and (
+                        not pending or buffered < self.prefetch_bytes):
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    fragment, size, keep = task
+                    pending.append((self.executor.submit(decode, fragment, keep), size))
+                    buffered += size
+                if not pending:
+                    return
+
+                if ordered:
+                    future, size = pending.popleft()
+                else:
+                    done, _ = wait([future for future, _ in pending], return_when=FIRST_COMPLETED)
+                    future, size = next(entry for entry in pending if entry[0] in done)
+                    pending.remove((future, size))
+                batches = future.result()
+                buffered -= size
+                yield from (batch for batch in batches if batch.num_rows)
+        finally:
+            # the consumer stopped early (LIMIT, error): drop the prefetched work
+            for future, _ in pending:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
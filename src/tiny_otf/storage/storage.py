@@ -1,20 +1,49 @@
-from typing import Any, Protocol
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Protocol
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 import pyarrow.fs as fs
-import pandas as pd
-from datetime import datetime
-from minio import Minio
+from datetime import datetime, timezone
 import os
-import io
+import tempfile
+import uuid
+from tiny_otf.instrumentation import INSTRUMENTATION
+from tiny_otf.partitioning import PARTITION_FIELDS, partition_path
+from tiny_otf.table_catalog.deletion_vector import DeletionVector
+from tiny_otf.table_catalog.manifest import DEFAULT_PARTITION_FIELD, DataFile
+from tiny_otf.storage.metadata_cache import FOOTER_CACHE
+from tiny_otf.storage.scan_scheduler import (SCAN_MAX_WORKERS, SCAN_PREFETCH_BYTES, ScanScheduler, read_live_rows,
+                                             row_group_tasks)
+from tiny_otf.storage.disk_cache import DISK_CACHE_MAX_BYTES, CachedFileSystemHandler, DiskCache, shared_disk_cache
 # from tiny_otf.config import STORAGE_PATH
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from minio import Minio
+
 class BaseStorage(Protocol):
     """Base protocol for read/write operations"""
-    def write(self, df: pd.DataFrame, partition_date: datetime): pass
+    def write(self, table_name: str, df: pd.DataFrame, partition_date: datetime,
+              file_name: str | None = None, partition: dict[str, str | None] | None = None) -> DataFile: pass
+
+    def scan(self, table_name: str, columns: list[str] | None, limit: int | None = None,
+             files: list[DataFile] | None = None, filter: pc.Expression | None = None,
+             offset: int | None = None, ordered: bool = True,
+             deletes: dict[str, DeletionVector] | None = None,
+             schema: pa.Schema | None = None) -> pa.RecordBatchReader: pass
 
-    def read(self, columns: list[str] | None, limit: int | None = None) -> pd.DataFrame: pass
+    def read(self, table_name: str, columns: list[str] | None, limit: int | None = None,
+             files: list[DataFile] | None = None, filter: pc.Expression | None = None,
+             offset: int | None = None) -> pd.DataFrame: pass
+
+    def open_writer(self, table_name: str, schema: pa.Schema, partition_date: datetime,
+                    partition: dict[str, str | None] | None = None,
+                    target_file_size: int | None = None) -> "RollingParquetWriter": pass
 
 class ClientAware(Protocol):
     """Protocol for classes with client property"""
@@ -26,14 +55,267 @@ class ThirdPartyStorage(BaseStorage, ClientAware, Protocol):
     """Combined protocol using multiple inheritance"""
     pass 
 
+# Rows of a streamed write are buffered up to this many (in-memory) bytes per row group
+WRITE_ROW_GROUP_BYTES = 64 * 1024 * 1024
+
+# Object store defaults, tunable per MinioDataStorage instance
+S3_MAX_POOL_CONNECTIONS = 32  # pooled HTTP connections of the client
+S3_IO_CONCURRENCY = 16  # concurrent GETs / range reads / multipart part uploads
+# Coalesce column chunk range reads closer than 8KB, at most 64MB per request
+S3_CACHE_OPTIONS = pa.CacheOptions(hole_size_limit=8 * 1024, range_size_limit=64 * 1024 * 1024)
+# Local disk copies of the objects read from MinIO
+DISK_CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "tiny_otf_cache"))
+
+def _raw_file_name() -> str:
+    """Unique name for a new data file, any number of files can be written within the same second"""
+    return f"raw_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}.parquet"
+
+def _partition_dir(partition_date: datetime,
+                   partition: dict[str, str | None] | None) -> tuple[str, dict[str, str | None]]:
+    """Directory of a new data file under the table and the partition values of its DataFile"""
+    if partition:
+        return partition_path(partition), partition
+    partition_day = partition_date.strftime('%Y-%m-%d')
+    return partition_day, {DEFAULT_PARTITION_FIELD: partition_day}
+
+def _partition_expression(partition: dict[str, str]) -> pc.Expression | None:
+    expression = None
+    for name, value in partition.items():
+        if name not in PARTITION_FIELDS.names:  # transform partitions are pruned from the manifest
+            continue
+        condition = pc.field(name) == pa.scalar(value).cast(PARTITION_FIELDS.field(name).type)
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def _manifest_dataset(files: list[DataFile],
+                      filesystem: fs.FileSystem,
+                      resolve_path,
+                      file_format: ds.ParquetFileFormat | None = None,
+                      file_version=None,
+                      namespace: str | None = None,
+                      schema: pa.Schema | None = None) -> ds.FileSystemDataset:
+    """
+    Build a dataset straight from manifest entries. File sizes are known from the
+    manifest, so neither a directory listing nor a per-file HEAD/stat is issued.
+    Each fragment carries its partition values, so filters on them skip whole files.
+    Fragments come from the process-wide footer cache, so footers are parsed once per file;
+    `file_version(path)` (e.g. the mtime) is part of the cache key when given, so is `namespace`
+    (the filesystem type by default): it tells apart equal paths of different stores.
+    Files are read as the table `schema` (the first file's when not given), so files written
+    with fewer columns or other physical types than the table still line up.
+    """
+    file_format = file_format or ds.ParquetFileFormat()
+    paths = [resolve_path(f.path) for f in files]
+    keys = [(namespace or filesystem.type_name, path, f.file_size_bytes, file_version(path) if file_version else None)
+            for path, f in zip(paths, files)]
+    fragments = FOOTER_CACHE.fragments(
+        keys,
+        lambda i: file_format.make_fragment(paths[i],
+                                            filesystem=filesystem,
+                                            partition_expression=_partition_expression(files[i].partition),
+                                            file_size=files[i].file_size_bytes))
+    schema = _with_partition_fields(schema or fragments[0].physical_schema)
+    return ds.FileSystemDataset(fragments,
+                                schema=schema,
+                                format=file_format,
+                                filesystem=filesystem)
+
+def _with_partition_fields(schema: pa.Schema) -> pa.Schema:
+    for partition_field in PARTITION_FIELDS:
+        schema = schema.append(partition_field)
+    return schema
+
+def _mtime(path: str) -> int:
+    return os.stat(path).st_mtime_ns
+
+def _skip_files(files: list[DataFile], offset: int | None) -> tuple[list[DataFile], int | None]:
+    """
+    Without a filter, an OFFSET covering whole files can be served from manifest
+    row counts: drop those files and return the offset left for the remaining ones.
+    The last file is always kept so the scan still has a schema.
+    """
+    while offset and len(files) > 1 and files[0].live_count <= offset:
+        offset -= files[0].live_count
+        files = files[1:]
+    return files, offset
+
+def _fragment_deletes(deletes: dict[str, DeletionVector] | None, resolve_path) -> dict[str, DeletionVector] | None:
+    """Deletion vectors by manifest path -> by the path of the dataset fragments"""
+    return {resolve_path(path): vector for path, vector in deletes.items()} if deletes else None
+
+def _scan_batches(dataset: ds.Dataset,
+                  columns: list[str],
+                  filter: pc.Expression | None,
+                  limit: int | None,
+                  offset: int | None,
+                  scheduler: ScanScheduler,
+                  ordered: bool = True,
+                  stats: dict | None = None,
+                  deletes: dict[str, DeletionVector] | None = None) -> Iterator[pa.RecordBatch]:
+    """
+    Stream record batches with projection and filter pushed down; parquet row groups
+    whose statistics can't match the filter are skipped. Without a LIMIT, row groups are
+    decoded in parallel by the storage's scan scheduler, in order unless `ordered` is False.
+    With a LIMIT, row groups are scanned one after the other and reading stops as soon
+    as enough rows were produced. `stats` collects the files, row groups and bytes read.
+    Rows in the deletion vectors of `deletes` (by fragment path) are left out.
+    """
+    if limit is None and not offset:
+        yield from scheduler.scan(dataset, columns, filter, ordered, stats, deletes)
+        return
+
+    to_skip = offset or 0
+    remaining = limit
+    # one row group at a time, counted in `stats` as it is opened
+    for fragment, _, keep in row_group_tasks(dataset, columns, filter, stats, deletes):
+        if keep is not None:
+            batches = read_live_rows(fragment, dataset.schema, columns, filter, keep).to_batches()
+        else:
+            # small readahead, so we don't decode batches we'll never return
+            batches = fragment.to_batches(schema=dataset.schema,
+                                          columns=columns,
+                                          filter=filter,
+                                          batch_readahead=1)
+        for batch in batches:
+            if to_skip >= batch.num_rows:
+                to_skip -= batch.num_rows
+                continue
+            batch = batch.slice(to_skip)
+            to_skip = 0
+
+            if remaining is not None:
+                batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+            if batch.num_rows:
+                yield batch
+            if remaining == 0:
+                return
+
+def _with_cache_stats(batches: Iterator[pa.RecordBatch],
+                      cache_activity: Callable[[], dict],
+                      stats: dict) -> Iterator[pa.RecordBatch]:
+    """Pass the batches through, then add the disk cache activity of the scan to `stats`"""
+    yield from batches
+    stats.update({f"cache_{key}": value for key, value in cache_activity().items()})
+
+def _dataset_reader(dataset: ds.Dataset,
+                    columns: list[str] | None,
+                    filter: pc.Expression | None,
+                    limit: int | None,
+                    offset: int | None,
+                    scheduler: ScanScheduler,
+                    ordered: bool = True,
+                    table_name: str | None = None,
+                    deletes: dict[str, DeletionVector] | None = None,
+                    cache_activity: Callable[[], dict] | None = None) -> pa.RecordBatchReader:
+    """
+    Expose the streamed batches of a scan as a RecordBatchReader; nothing is read
+    until the consumer pulls batches. With instrumentation on, a `scan` event reports
+    the files, row groups, bytes and rows read once the scan is consumed, and the disk
+    cache hits, misses and bytes since the scan started, as given by `cache_activity()`.
+    """
+    # partition columns are there to filter on, keep them out of SELECT *
+    columns = columns or [name for name in dataset.schema.names if name not in PARTITION_FIELDS.names]
+    schema = dataset.scanner(columns=columns).projected_schema
+    if INSTRUMENTATION.plan_only():  # EXPLAIN: the scan is planned, not read
+        INSTRUMENTATION.emit("scan", table=table_name, columns=columns, filter=filter, files=len(dataset.files))
+        return pa.RecordBatchReader.from_batches(schema, [])
+    if not INSTRUMENTATION.enabled:
+        return pa.RecordBatchReader.from_batches(
+            schema, _scan_batches(dataset, columns, filter, limit, offset, scheduler, ordered, None, deletes))
+
+    stats = {"table": table_name, "columns": columns, "filter": filter, "files": len(dataset.files),
+             "files_read": 0, "row_groups": 0, "bytes_read": 0}
+    batches = _scan_batches(dataset, columns, filter, limit, offset, scheduler, ordered, stats, deletes)
+    if cache_activity is not None:
+        batches = _with_cache_stats(batches, cache_activity, stats)
+    return pa.RecordBatchReader.from_batches(schema, INSTRUMENTATION.counted("scan", batches, stats))
+
+class RollingParquetWriter:
+    """
+    Parquet files of one partition written from a stream of Arrow tables. Rows are buffered
+    up to a row group of about WRITE_ROW_GROUP_BYTES, each row group is encoded straight into
+    the output stream, and a new file is started once the current one reaches `target_file_size`
+    bytes, so memory stays bounded by one row group whatever the size of the stream.
+    `open_output(path)` opens the output stream of a manifest-relative path.
+    """
+    def __init__(self,
+                 open_output: Callable[[str], pa.NativeFile],
+                 directory: str,
+                 partition: dict[str, str | None],
+                 schema: pa.Schema,
+                 target_file_size: int | None = None):
+        self.open_output = open_output
+        self.directory = directory  # <table>/<partition dir>
+        self.partition = partition
+        self.schema = schema
+        self.target_file_size = target_file_size
+        self.paths: list[str] = []  # every file started, e.g. to delete them when the load fails
+        self.data_files: list[DataFile] = []
+        self._buffer: list[pa.Table] = []
+        self._buffered_bytes = 0
+        self._sink: pa.NativeFile | None = None
+        self._writer: pq.ParquetWriter | None = None
+        self._metadata: list = []
+
+    def write(self, table: pa.Table) -> None:
+        self._buffer.append(table)
+        self._buffered_bytes += table.nbytes
+        # row groups of small target files are smaller too, so files don't overshoot by much
+        if self._buffered_bytes >= min(WRITE_ROW_GROUP_BYTES, self.target_file_size or WRITE_ROW_GROUP_BYTES):
+            self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        if not self._buffer:
+            return
+        if self._writer is None:
+            path = f"{self.directory}/{_raw_file_name()}"
+            self.paths.append(path)
+            self._sink = self.open_output(path)
+            self._writer = pq.ParquetWriter(self._sink, self.schema, metadata_collector=self._metadata)
+        table = pa.concat_tables(self._buffer)
+        self._writer.write_table(table, row_group_size=table.num_rows)
+        self._buffer, self._buffered_bytes = [], 0
+        if self.target_file_size and self._sink.tell() >= self.target_file_size:
+            self._finish_file()
+
+    def _finish_file(self) -> None:
+        self._writer.close()
+        file_size = self._sink.tell()
+        self._sink.close()
+        self.data_files.append(DataFile.from_parquet_metadata(path=self.paths[-1],
+                                                              partition=self.partition,
+                                                              file_size_bytes=file_size,
+                                                              metadata=self._metadata.pop()))
+        self._writer, self._sink = None, None
+
+    def close(self) -> list[DataFile]:
+        """Write the buffered rows and return the DataFile entries of all written files"""
+        self._write_row_group()
+        if self._writer is not None:
+            self._finish_file()
+        return self.data_files
+
+    def abort(self) -> None:
+        if self._sink is not None:
+            self._sink.close()
+        self._writer, self._sink, self._buffer = None, None, []
+
 class LocalFSDataStorage(BaseStorage):
     def __init__(self, 
                  base_path: str, 
                  engine:str = "pyarrow", 
-                 file_type:str = "parquet"):
+                 file_type:str = "parquet",
+                 max_workers: int = SCAN_MAX_WORKERS,
+                 scan_prefetch_bytes: int = SCAN_PREFETCH_BYTES):
+        """
+        Scans decode up to `max_workers` row groups in parallel, buffering at most about
+        `scan_prefetch_bytes` of data ahead of the consumer.
+        """
         self.base_path = Path(base_path)
         self.engine = engine
         self.file_type = file_type
+        self.scan_scheduler = ScanScheduler(max_workers, scan_prefetch_bytes)
     
     def _get_files_in_dir(self, table_name: str) -> list:
         table_path = self.base_path / table_name
@@ -42,122 +324,360 @@ class LocalFSDataStorage(BaseStorage):
     def _n_files_in_dir(self, table_name: str) -> int:
         return len(self._get_files_in_dir(table_name))
     
+    def _file_path(self, path: str) -> str:
+        """Absolute path of a manifest file path"""
+        return str((self.base_path / path).absolute())
+
     def write(self, 
               table_name: str,
-              df: pd.DataFrame, 
-              partition_date: datetime):
-        
-        path = self.base_path / table_name / partition_date.strftime('%Y-%m-%d')
+              df: pd.DataFrame | pa.Table, 
+              partition_date: datetime,
+              file_name: str | None = None,
+              partition: dict[str, str | None] | None = None) -> DataFile:
+        """
+        Write the DataFrame (or Arrow table) as a new parquet file under its date partition,
+        or under the `partition` values of a table with partition transforms,
+        and return the DataFile entry to commit to the table manifest.
+        """
+        partition_dir, partition = _partition_dir(partition_date, partition)
+        path = self.base_path / table_name / partition_dir
         path.mkdir(parents=True, exist_ok=True)
-        file_name = f"raw_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.parquet"
-        df.to_parquet(path / file_name, 
-                      index=False, 
-                      engine = self.engine)
-        print(f"{len(df)} rows are inserted into {path} successfully.")
+        file_name = file_name or _raw_file_name()
+        metadata_collector = []
+        if isinstance(df, pa.Table):
+            pq.write_table(df, path / file_name, metadata_collector=metadata_collector)
+        else:
+            df.to_parquet(path / file_name, 
+                          index=False, 
+                          engine = self.engine,
+                          metadata_collector=metadata_collector)
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("write", table=table_name, path=f"{partition_dir}/{file_name}", rows=len(df),
+                                 bytes_written=(path / file_name).stat().st_size)
+
+        return DataFile.from_parquet_metadata(path=f"{table_name}/{partition_dir}/{file_name}",
+                                              partition=partition,
+                                              file_size_bytes=(path / file_name).stat().st_size,
+                                              metadata=metadata_collector[0])
+
+    def open_writer(self,
+                    table_name: str,
+                    schema: pa.Schema,
+                    partition_date: datetime,
+                    partition: dict[str, str | None] | None = None,
+                    target_file_size: int | None = None) -> RollingParquetWriter:
+        """
+        Stream rows into new parquet files of a partition (see `write`), rolled over at
+        `target_file_size` bytes. The files are returned by `close()`, to commit them at once.
+        """
+        partition_dir, partition = _partition_dir(partition_date, partition)
+        (self.base_path / table_name / partition_dir).mkdir(parents=True, exist_ok=True)
+        return RollingParquetWriter(lambda path: fs.LocalFileSystem().open_output_stream(self._file_path(path)),
+                                    f"{table_name}/{partition_dir}", partition, schema, target_file_size)
 
     def read(self, 
              table_name: str,
              columns: list[str] | None, 
-             limit: int | None = None) -> pd.DataFrame:
+             limit: int | None = None,
+             files: list[DataFile] | None = None,
+             filter: pc.Expression | None = None,
+             offset: int | None = None) -> pd.DataFrame:
         """
-        Read all the .parquet files in the table data directory
-        and return pandas DataFrame (optionally limit the data and select columns)
+        Read the table's .parquet files and return pandas DataFrame, see `scan`.
+        """
+        return self.scan(table_name, columns, limit, files, filter, offset).read_all().to_pandas()
+
+    def scan(self, 
+             table_name: str,
+             columns: list[str] | None, 
+             limit: int | None = None,
+             files: list[DataFile] | None = None,
+             filter: pc.Expression | None = None,
+             offset: int | None = None,
+             ordered: bool = True,
+             deletes: dict[str, DeletionVector] | None = None,
+             schema: pa.Schema | None = None) -> pa.RecordBatchReader:
+        """
+        Stream the table's .parquet files as Arrow record batches (optionally filter, limit/offset the data and select columns).
+        If the manifest `files` are given they are read directly, otherwise the table data directory is listed.
+        Batches keep the file order unless `ordered` is False, e.g. for aggregates.
+        `deletes` are the deletion vectors of the files by manifest path, their rows are left out.
+        `schema` is the table's Arrow schema (from the catalog) every file is read as.
         """
         table_path = self.base_path / table_name
-        nb_files = self._n_files_in_dir(table_name)
 
-        if not nb_files>0:
-            raise FileNotFoundError(f"No parquet files found for table {table_path}")
-        
-        print(f"Number of files under `{table_path}`: {nb_files}")
+        if files is not None:
+            if not files:
+                raise FileNotFoundError(f"No parquet files found for table {table_path}")
+            if filter is None:
+                files, offset = _skip_files(files, offset)
+            dataset = _manifest_dataset(files, fs.LocalFileSystem(), self._file_path, file_version=_mtime, schema=schema)
+        else:
+            nb_files = self._n_files_in_dir(table_name)
 
-        dataset = ds.dataset(table_path, format="parquet")
+            if not nb_files>0:
+                raise FileNotFoundError(f"No parquet files found for table {table_path}")
+            
+            if INSTRUMENTATION.enabled:
+                INSTRUMENTATION.emit("list_files", table=table_name, files=nb_files)
 
-        if columns:
-            print("Selected columns: ", columns)
-            table = dataset.to_table(columns=columns)
-        else:
-            table = dataset.to_table()
+            dataset = ds.dataset(table_path, 
+                                 schema=_with_partition_fields(schema) if schema else None,
+                                 format="parquet",
+                                 partitioning=ds.partitioning(PARTITION_FIELDS))
 
-        if limit is not None:
-            table = table.slice(0, limit)
+        return _dataset_reader(dataset, columns, filter, limit, offset, self.scan_scheduler, ordered, table_name,
+                               _fragment_deletes(deletes, self._file_path))
 
-        return table.to_pandas()
+    def list_files(self, table_name: str) -> list[DataFile]:
+        """
+        One-time listing of a table written before manifests existed, as DataFile entries
+        (reads every footer for the statistics).
+        """
+        files = []
+        for file_path in sorted(self._get_files_in_dir(table_name)):
+            path = file_path.relative_to(self.base_path).as_posix()  # <table>/<YYYY-MM-DD>/<file>
+            files.append(DataFile.from_parquet_metadata(path=path,
+                                                        partition={DEFAULT_PARTITION_FIELD: path.split("/")[1]},
+                                                        file_size_bytes=file_path.stat().st_size,
+                                                        metadata=pq.read_metadata(file_path)))
+        return files
+
+    def list_paths(self, table_name: str) -> list[tuple[str, datetime]]:
+        """Manifest-relative paths and modification times of all data files under the table directory"""
+        return [(file_path.relative_to(self.base_path).as_posix(),
+                 datetime.fromtimestamp(file_path.stat().st_mtime, timezone.utc).replace(tzinfo=None))
+                for file_path in sorted(self._get_files_in_dir(table_name))]
+
+    def delete_files(self, paths: list[str]) -> None:
+        for path in paths:
+            Path(self._file_path(path)).unlink(missing_ok=True)
+
+    def scan_files(self, 
+                   files: list[DataFile], 
+                   columns: list[str] | None = None,
+                   deletes: dict[str, DeletionVector] | None = None,
+                   schema: pa.Schema | None = None) -> Iterator[pa.RecordBatch]:
+        """
+        Stream the record batches of the given manifest files in file order, e.g. for compaction,
+        without the rows of their deletion vectors `deletes`, read as the table `schema` (see `scan`).
+        """
+        dataset = _manifest_dataset(files, fs.LocalFileSystem(), self._file_path, file_version=_mtime, schema=schema)
+        columns = columns or [name for name in dataset.schema.names if name not in PARTITION_FIELDS.names]
+        return _scan_batches(dataset, columns, None, None, None, self.scan_scheduler,
+                             deletes=_fragment_deletes(deletes, self._file_path))
 
 class MinioDataStorage(ThirdPartyStorage):
     def __init__(self,
                  base_path: str, 
                  is_secure=False,
-                 file_type:str = "parquet"):
+                 file_type:str = "parquet",
+                 max_pool_connections: int = S3_MAX_POOL_CONNECTIONS,
+                 io_concurrency: int = S3_IO_CONCURRENCY,
+                 max_workers: int = SCAN_MAX_WORKERS,
+                 scan_prefetch_bytes: int = SCAN_PREFETCH_BYTES,
+                 filesystem: fs.FileSystem | None = None,
+                 bucket_name: str | None = None,
+                 cache_dir: str | None = DISK_CACHE_DIR,
+                 cache_max_bytes: int = DISK_CACHE_MAX_BYTES):
+        """
+        `filesystem` replaces the S3 filesystem, e.g. a `SubTreeFileSystem` over a local
+        directory standing in for the object store (the bucket is its first directory).
+        Reads go through a local disk cache under `cache_dir`, None disables it.
+        Scans run up to `max(max_workers, io_concurrency)` row group reads in parallel (they
+        mostly wait on the network), buffering at most about `scan_prefetch_bytes` ahead.
+        """
         self.url = os.getenv("MINIO_URL")
         self.access_key = os.getenv('ACCESS_KEY')
         self.secret_key = os.getenv('SECRET_KEY')
-        self.bucket_name = os.getenv("BUCKET_NAME")
+        self.bucket_name = bucket_name or os.getenv("BUCKET_NAME")
         self.base_path = Path(base_path)
         self.secure = is_secure
         self.file_type = file_type
+        self.max_pool_connections = max_pool_connections
+        self.io_concurrency = io_concurrency
+        self.scan_scheduler = ScanScheduler(max(max_workers, io_concurrency), scan_prefetch_bytes)
+        self._filesystem = filesystem
+        self.disk_cache: DiskCache | None = shared_disk_cache(cache_dir, cache_max_bytes) if cache_dir else None
 
-        print("***********Minio parameters***********",
-              "\nURL:", self.url, 
-              "\nSecure:", self.secure,
-              "\nBucket name:", self.bucket_name,
-              "\nFile type:", self.file_type)
+        # Arrow issues S3 requests (GETs, range reads, multipart parts) from its IO thread pool
+        if filesystem is None and pa.io_thread_count() < io_concurrency:
+            pa.set_io_thread_count(io_concurrency)
 
-    @property
-    def client(self) -> Minio:
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("minio", url=self.url, secure=self.secure, bucket=self.bucket_name,
+                                 file_type=self.file_type)
+
+    @cached_property
+    def client(self) -> "Minio":
+        """Minio client created once, its connections are pooled and reused"""
+        # the Minio SDK is only needed for bucket administration, not for reads and writes
+        import urllib3
+        from minio import Minio
+        http_client = urllib3.PoolManager(
+            maxsize=self.max_pool_connections,
+            timeout=urllib3.Timeout(connect=10, read=300),
+            retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+        )
         return Minio(self.url, 
                      access_key=self.access_key, 
                      secret_key=self.secret_key,
-                     secure=self.secure)
+                     secure=self.secure,
+                     http_client=http_client)
     
-    @property
-    def filesystem(self) -> fs.S3FileSystem:
+    @cached_property
+    def filesystem(self) -> fs.FileSystem:
+        """S3 filesystem created once per storage instance, or the injected stand-in"""
+        if self._filesystem is not None:
+            return self._filesystem
         return fs.S3FileSystem(
                 endpoint_override=self.url,
                 access_key=self.access_key,
                 secret_key=self.secret_key,
-                scheme='http'
+                scheme='https' if self.secure else 'http',
+                background_writes=True,  # multipart parts are uploaded in parallel while writing
                 )
+
+    @cached_property
+    def read_filesystem(self) -> fs.FileSystem:
+        """Filesystem for data reads: the remote one seen through the local disk cache"""
+        if self.disk_cache is None:
+            return self.filesystem
+        return fs.PyFileSystem(CachedFileSystemHandler(self.filesystem, self.disk_cache))
+
+    @cached_property
+    def _executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.io_concurrency, thread_name_prefix="tiny-otf-s3")
+
+    @cached_property
+    def _cache_namespace(self) -> str:
+        """Footer cache namespace: object paths (`bucket/key`) are only unique per endpoint"""
+        if self._filesystem is None:
+            return f"s3://{self.url}"
+        # a stand-in filesystem, a SubTreeFileSystem is told apart by its root directory
+        return f"{self._filesystem.type_name}://{getattr(self._filesystem, 'base_path', id(self._filesystem))}"
+
+    @cached_property
+    def _file_format(self) -> ds.ParquetFileFormat:
+        """Parquet reads coalesce nearby column chunks and fetch the byte ranges concurrently"""
+        return ds.ParquetFileFormat(default_fragment_scan_options=ds.ParquetFragmentScanOptions(
+            pre_buffer=True, cache_options=S3_CACHE_OPTIONS))
+
+    def _map_concurrently(self, fn: Callable, items: Iterable) -> list:
+        """Run `fn` over `items` on the pooled IO threads, results in input order"""
+        return list(self._executor.map(fn, items))
     
     def create_bucket(self) -> None:
         # Make the bucket if it doesn't exist.
         found = self.client.bucket_exists(self.bucket_name)
         if not found:
             self.client.make_bucket(self.bucket_name)
-            print("Created bucket", self.bucket_name, "in Minio")
-        else:
-            print("Bucket", self.bucket_name, "already exists")
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("bucket", bucket=self.bucket_name, created=not found)
     
+    def _object_path(self, path: str) -> str:
+        """Full `bucket/key` path of a manifest file path, as expected by S3FileSystem"""
+        return f"{self.bucket_name}/{self.base_path}/{path}"
+
     def write(self,               
               table_name: str,
-              df: pd.DataFrame, 
+              df: pd.DataFrame | pa.Table, 
               partition_date: datetime, 
-              ):
+              file_name: str | None = None,
+              partition: dict[str, str | None] | None = None,
+              ) -> DataFile:
+        """
+        Stream the DataFrame (or Arrow table) as a parquet object under its date partition
+        (or its `partition` values, see LocalFSDataStorage.write).
+        Row groups are encoded straight into the object's output stream, which uploads
+        them as multipart parts in parallel, so the file is never fully buffered in memory.
+        """
         # TODO implement other file types 
-
-        # create source buffer
-        if self.file_type == "parquet":
-            bytes = df.to_parquet()
-        else:
+        if self.file_type != "parquet":
             raise NotImplementedError(f"File type {self.file_type} is not supported yet.")
-        
-        buffer = io.BytesIO(bytes)
-        path = self.base_path / table_name / partition_date.strftime('%Y-%m-%d')
-        file_name = f"raw_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.parquet"
-        print(f"{path}/{file_name}")
+
+        table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+        partition_dir, partition = _partition_dir(partition_date, partition)
+        file_name = file_name or _raw_file_name()
 
         # load to Minio
-        self.client.put_object(
-            self.bucket_name, f"{path}/{file_name}", buffer, length=len(bytes)
-        )
-        
-        print("File successfully uploaded as object", path/file_name, "to bucket", self.bucket_name)
+        metadata_collector = []
+        object_path = self._object_path(f"{table_name}/{partition_dir}/{file_name}")
+        if not isinstance(self.filesystem, fs.S3FileSystem):  # object stores have no directories to create
+            self.filesystem.create_dir(object_path.rsplit("/", 1)[0], recursive=True)
+        with self.filesystem.open_output_stream(object_path) as sink:
+            pq.write_table(table, sink, metadata_collector=metadata_collector)
+            file_size = sink.tell()
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.emit("write", table=table_name, path=f"{partition_dir}/{file_name}", rows=table.num_rows,
+                                 bytes_written=file_size)
+
+        return DataFile.from_parquet_metadata(path=f"{table_name}/{partition_dir}/{file_name}",
+                                              partition=partition,
+                                              file_size_bytes=file_size,
+                                              metadata=metadata_collector[0])
+
+    def open_writer(self,
+                    table_name: str,
+                    schema: pa.Schema,
+                    partition_date: datetime,
+                    partition: dict[str, str | None] | None = None,
+                    target_file_size: int | None = None) -> RollingParquetWriter:
+        """
+        Stream rows into new objects of a partition, rolled over at `target_file_size` bytes;
+        row groups are uploaded as multipart parts while the next ones are encoded (see `write`).
+        """
+        partition_dir, partition = _partition_dir(partition_date, partition)
+
+        def open_output(path: str) -> pa.NativeFile:
+            object_path = self._object_path(path)
+            if not isinstance(self.filesystem, fs.S3FileSystem):  # object stores have no directories to create
+                self.filesystem.create_dir(object_path.rsplit("/", 1)[0], recursive=True)
+            return self.filesystem.open_output_stream(object_path)
+        return RollingParquetWriter(open_output, f"{table_name}/{partition_dir}", partition, schema, target_file_size)
+
+    def read_ranges(self, path: str, ranges: list[tuple[int, int]]) -> list[bytes]:
+        """
+        Fetch byte ranges `(offset, length)` of an object concurrently, one ranged GET each,
+        over the pooled connections.
+        """
+        with self.read_filesystem.open_input_file(self._object_path(path)) as f:
+            return self._map_concurrently(lambda r: f.read_at(r[1], r[0]), ranges)
+
+    def read_objects(self, paths: list[str]) -> list[bytes]:
+        """Fetch whole objects concurrently, in the order of `paths`"""
+        def fetch(path: str) -> bytes:
+            with self.read_filesystem.open_input_stream(self._object_path(path)) as f:
+                return f.read()
+        return self._map_concurrently(fetch, paths)
 
     def read(self, 
              table_name: str,
              columns: list[str] | None = None, 
-             limit: int | None = None) -> pd.DataFrame:
-        
+             limit: int | None = None,
+             files: list[DataFile] | None = None,
+             filter: pc.Expression | None = None,
+             offset: int | None = None) -> pd.DataFrame:
+        """
+        Read the table's objects and return pandas DataFrame, see `scan`.
+        """
+        return self.scan(table_name, columns, limit, files, filter, offset).read_all().to_pandas()
+
+    def scan(self, 
+             table_name: str,
+             columns: list[str] | None = None, 
+             limit: int | None = None,
+             files: list[DataFile] | None = None,
+             filter: pc.Expression | None = None,
+             offset: int | None = None,
+             ordered: bool = True,
+             deletes: dict[str, DeletionVector] | None = None,
+             schema: pa.Schema | None = None) -> pa.RecordBatchReader:
+        """
+        Stream the table's objects as Arrow record batches; objects are only fetched
+        while the consumer pulls batches (and prefetched ahead of it, see ScanScheduler).
+        Every object is read as the table `schema`, see LocalFSDataStorage.scan.
+        """
        # Read from Minio
         # response = self.client.get_object(self.bucket_name, f"{self.base_path}/{table_name}")
         # bytes = response.read()
@@ -165,24 +685,87 @@ class MinioDataStorage(ThirdPartyStorage):
         # Create DataFrame from bytes
         # buffer = io.BytesIO(bytes)
 
-        s3_fs = self.filesystem
-        if self.file_type == "parquet":
+        s3_fs = self.read_filesystem
+        cache_activity = None
+        if self.disk_cache is not None and INSTRUMENTATION.enabled:
+            # the footers are fetched while planning, so the scan starts here
+            # (the cache is shared: concurrent scans each count each other's activity too)
+            cache_before = self.disk_cache.info()
+
+            def cache_activity() -> dict:
+                return DiskCache.since(cache_before, self.disk_cache.info())
+        if self.file_type == "parquet" and files is not None:
+            if not files:
+                raise FileNotFoundError(f"No parquet files found for table {self.base_path / table_name}")
+            if filter is None:
+                files, offset = _skip_files(files, offset)
+            # plan from the manifest, no recursive listing against S3
+            dataset = _manifest_dataset(files, s3_fs, self._object_path, self._file_format,
+                                        namespace=self._cache_namespace, schema=schema)
+        elif self.file_type == "parquet":
             # df = pd.read_parquet(buffer, columns=columns)
-            dataset = pq.ParquetDataset(f"{self.base_path}/{table_name}", filesystem=s3_fs)
+            dataset = ds.dataset(self._object_path(table_name),
+                                 schema=_with_partition_fields(schema) if schema else None,
+                                 filesystem=s3_fs,
+                                 format=self._file_format,
+                                 partitioning=ds.partitioning(PARTITION_FIELDS))
         else:
             raise NotImplementedError(f"File type {self.file_type} is not supported yet.")
 
-        if columns:
-            print("Selected columns: ", columns)
-            table = dataset.to_table(columns=columns)
-        else:
-            table = dataset.to_table()
+        return _dataset_reader(dataset, columns, filter, limit, offset, self.scan_scheduler, ordered, table_name,
+                               _fragment_deletes(deletes, self._object_path), cache_activity)
 
-        if limit is not None:
-            table = table.slice(0, limit)
+    def list_files(self, table_name: str) -> list[DataFile]:
+        """
+        One-time listing of a table written before manifests existed, as DataFile entries
+        (reads every footer for the statistics).
+        """
+        s3_fs = self.filesystem
+        prefix = self._object_path("")
+        selector = fs.FileSelector(self._object_path(table_name), recursive=True, allow_not_found=True)
 
-        print(
-            "File successfully downloaded as object",
-            self.base_path / table_name, "from bucket", self.bucket_name,
-        )
-        return table.to_pandas()
\ No newline at end of file
+        infos = [info for info in sorted(s3_fs.get_file_info(selector), key=lambda info: info.path)
+                 if info.type == fs.FileType.File and info.path.endswith(".parquet")]
+
+        def footer(info: fs.FileInfo) -> DataFile:
+            path = info.path[len(prefix):]  # <table>/<YYYY-MM-DD>/<file>
+            with s3_fs.open_input_file(info.path) as f:
+                metadata = pq.read_metadata(f)
+            return DataFile.from_parquet_metadata(path=path,
+                                                  partition={DEFAULT_PARTITION_FIELD: path.split("/")[1]},
+                                                  file_size_bytes=info.size,
+                                                  metadata=metadata)
+        # footers are fetched concurrently
+        return self._map_concurrently(footer, infos)
+
+    def list_paths(self, table_name: str) -> list[tuple[str, datetime]]:
+        """Manifest-relative paths and modification times of all objects under the table prefix"""
+        prefix = self._object_path("")
+        selector = fs.FileSelector(self._object_path(table_name), recursive=True, allow_not_found=True)
+        return [(info.path[len(prefix):], info.mtime.astimezone(timezone.utc).replace(tzinfo=None))
+                for info in sorted(self.filesystem.get_file_info(selector), key=lambda info: info.path)
+                if info.type == fs.FileType.File and info.path.endswith(".parquet")]
+
+    def delete_files(self, paths: list[str]) -> None:
+        """Delete objects concurrently, already deleted ones are skipped"""
+        def delete(path: str) -> None:
+            try:
+                self.filesystem.delete_file(self._object_path(path))
+            except FileNotFoundError:
+                pass
+        self._map_concurrently(delete, paths)
+
+    def scan_files(self, 
+                   files: list[DataFile], 
+                   columns: list[str] | None = None,
+                   deletes: dict[str, DeletionVector] | None = None,
+                   schema: pa.Schema | None = None) -> Iterator[pa.RecordBatch]:
+        """
+        Stream the record batches of the given manifest files in file order, e.g. for compaction,
+        without the rows of their deletion vectors `deletes`, read as the table `schema` (see `scan`).
+        """
+        dataset = _manifest_dataset(files, self.read_filesystem, self._object_path, self._file_format,
+                                    namespace=self._cache_namespace, schema=schema)
+        columns = columns or [name for name in dataset.schema.names if name not in PARTITION_FIELDS.names]
+        return _scan_batches(dataset, columns, None, None, None, self.scan_scheduler,
+                             deletes=_fragment_deletes(deletes, self._object_path))
\ No newline at end of file
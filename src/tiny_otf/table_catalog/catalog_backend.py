@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Protocol
+
+JSON_LOG_RETAINED_VERSIONS = 100  # versions of a table entry kept in the json log
+
+class CommitConflictError(ValueError):
+    """Raised when a table was changed by another writer since its metadata was read"""
+
+
+class CatalogBackend(Protocol):
+    """
+    Transactional store of table metadata entries. Every entry carries a version,
+    commits are a compare-and-swap on it so concurrent writers never lose updates.
+    A table that does not exist (or was dropped) reads as (None, version).
+    """
+    def get(self, name: str) -> tuple[dict | None, int]:
+        ...
+
+    def list_names(self) -> list[str]:
+        ...
+
+    def commit(self, name: str, metadata: dict | None, expected_version: int) -> int:
+        """
+        Store `metadata` (None drops the table) if the table is still at `expected_version`,
+        return the new version or raise CommitConflictError.
+        """
+        ...
+
+
+def _read_legacy_catalog(legacy_path: Path | None) -> dict:
+    """Tables of the single-file table_metadata.json, imported once into an empty backend"""
+    if legacy_path is None or not legacy_path.exists():
+        return {}
+    with open(legacy_path, "r") as f:
+        return json.load(f)
+
+
+def _report_import(backend: str, path: Path, catalog: dict) -> None:
+    # instrumentation imports pyarrow, which reading the catalog doesn't need otherwise
+    from tiny_otf.instrumentation import INSTRUMENTATION
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.emit("catalog_import", backend=backend, path=str(path), tables=len(catalog))
+
+
+class SqliteCatalogBackend:
+    """
+    Catalog in a SQLite database in WAL mode: readers don't block the writer and
+    a commit is a single-row conditional UPDATE, whatever the number of tables.
+    """
+    def __init__(self, path: str | Path, legacy_path: str | Path | None = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tables ("
+                           "name TEXT PRIMARY KEY, version INTEGER NOT NULL, metadata TEXT)")
+        self._import_legacy(_read_legacy_catalog(Path(legacy_path) if legacy_path else None))
+
+    def _import_legacy(self, catalog: dict) -> None:
+        if not catalog:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT COUNT(*) FROM tables").fetchone()[0] == 0:
+                    _report_import("sqlite", self.path, catalog)
+                    self._conn.executemany("INSERT INTO tables (name, version, metadata) VALUES (?, 1, ?)",
+                                           [(name, json.dumps(meta)) for name, meta in catalog.items()])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, name: str) -> tuple[dict | None, int]:
+        with self._lock:
+            row = self._conn.execute("SELECT metadata, version FROM tables WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None, 0
+        metadata, version = row
+        return (json.loads(metadata) if metadata is not None else None), version
+
+    def list_names(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM tables WHERE metadata IS NOT NULL ORDER BY rowid").fetchall()
+        return [name for (name,) in rows]
+
+    def commit(self, name: str, metadata: dict | None, expected_version: int) -> int:
+        payload = json.dumps(metadata) if metadata is not None else None
+        with self._lock:
+            if expected_version == 0:
+                # never existed: the primary key makes concurrent creates conflict
+                cursor = self._conn.execute("INSERT OR IGNORE INTO tables (name, version, metadata) VALUES (?, 1, ?)",
+                                            (name, payload))
+            else:
+                cursor = self._conn.execute("UPDATE tables SET metadata = ?, version = version + 1 "
+                                            "WHERE name = ? AND version = ?",
+                                            (payload, name, expected_version))
+        if cursor.rowcount != 1:
+            raise CommitConflictError(f"Table '{name}' was modified concurrently (expected version {expected_version}).")
+        return expected_version + 1
+
+
+class JsonLogCatalogBackend:
+    """
+    Catalog as a versioned log of json files, `<root>/<table>/<version>.json`.
+    A commit hard-links a fully written temp file to the next version number, which fails
+    atomically if another writer got there first. Only the table's own directory is touched.
+    """
+    def __init__(self, path: str | Path, legacy_path: str | Path | None = None):
+        self.root = Path(path)
+        self.root.mkdir(parents=True, exist_ok=True)
+        if not any(self.root.iterdir()):
+            catalog = _read_legacy_catalog(Path(legacy_path) if legacy_path else None)
+            if catalog:
+                _report_import("json_log", self.root, catalog)
+            for name, meta in catalog.items():
+                try:
+                    self.commit(name, meta, 0)
+                except CommitConflictError:
+                    pass  # imported concurrently by another process
+
+    @staticmethod
+    def _version_file(table_dir: Path, version: int) -> Path:
+        return table_dir / f"{version:08d}.json"
+
+    def _current_version(self, table_dir: Path) -> int:
+        if not table_dir.exists():
+            return 0
+        versions = [int(entry.name[:-5]) for entry in os.scandir(table_dir)
+                    if entry.name.endswith(".json") and entry.name[:-5].isdigit()]
+        return max(versions, default=0)
+
+    def get(self, name: str) -> tuple[dict | None, int]:
+        table_dir = self.root / name
+        version = self._current_version(table_dir)
+        if version == 0:
+            return None, 0
+        with open(self._version_file(table_dir, version), "r") as f:
+            return json.load(f)["metadata"], version
+
+    def list_names(self) -> list[str]:
+        return sorted(entry.name for entry in os.scandir(self.root)
+                      if entry.is_dir() and self.get(entry.name)[0] is not None)
+
+    def commit(self, name: str, metadata: dict | None, expected_version: int) -> int:
+        table_dir = self.root / name
+        table_dir.mkdir(parents=True, exist_ok=True)
+        if self._current_version(table_dir) != expected_version:
+            raise CommitConflictError(f"Table '{name}' was modified concurrently (expected version {expected_version}).")
+
+        tmp_path = table_dir / f".tmp-{uuid.uuid4().hex}"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": expected_version + 1, "metadata": metadata}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp_path, self._version_file(table_dir, expected_version + 1))
+        except FileExistsError:
+            raise CommitConflictError(f"Table '{name}' was modified concurrently (expected version {expected_version}).")
+        finally:
+            tmp_path.unlink()
+        if self._current_version(table_dir) - (expected_version + 1) >= JSON_LOG_RETAINED_VERSIONS:
+            # linked into a slot already pruned from the log by writers far ahead (newer versions
+            # within the retained window are commits made on top of this one)
+            self._version_file(table_dir, expected_version + 1).unlink(missing_ok=True)
+            raise CommitConflictError(f"Table '{name}' was modified concurrently (expected version {expected_version}).")
+        # keep the log bounded, readers only ever open the latest version
+        self._version_file(table_dir, expected_version + 1 - JSON_LOG_RETAINED_VERSIONS).unlink(missing_ok=True)
+        return expected_version + 1
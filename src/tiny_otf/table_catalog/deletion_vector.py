@@ -0,0 +1,58 @@
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+import numpy as np
+import pyarrow as pa
+
+
+@dataclass
+class DeletionVector:
+    """
+    Deleted rows of one data file (merge-on-read DELETE / UPDATE), as the sorted positions of
+    the rows in the file: the sparse form of a row-position bitmap, 4 bytes per deleted row.
+    Scans expand it into a boolean mask only for the row groups holding deleted rows.
+    """
+    positions: np.ndarray  # sorted, unique uint32 row positions
+
+    @staticmethod
+    def build(positions: Iterable[int] | np.ndarray) -> "DeletionVector":
+        return DeletionVector(np.unique(np.asarray(positions, dtype=np.uint32)))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def nbytes(self) -> int:
+        return self.positions.nbytes
+
+    def union(self, other: "DeletionVector") -> "DeletionVector":
+        return DeletionVector(np.union1d(self.positions, other.positions).astype(np.uint32))
+
+    def overlaps(self, other: "DeletionVector") -> bool:
+        return np.intersect1d(self.positions, other.positions, assume_unique=True).size > 0
+
+    def keep_mask(self, offset: int, length: int) -> np.ndarray | None:
+        """
+        Rows to keep among the `length` rows starting at row `offset` of the file,
+        None when none of them is deleted.
+        """
+        start, stop = np.searchsorted(self.positions, [offset, offset + length])
+        if start == stop:
+            return None
+        mask = np.ones(length, dtype=bool)
+        mask[self.positions[start:stop].astype(np.int64) - offset] = False
+        return mask
+
+    def write(self, vector_dir: Path) -> Path:
+        vector_dir.mkdir(parents=True, exist_ok=True)
+        path = vector_dir / f"{uuid.uuid4().hex}.deletes.arrow"
+        schema = pa.schema([("position", pa.uint32())])
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            writer.write(pa.record_batch([pa.array(self.positions, type=pa.uint32())], schema=schema))
+        return path
+
+    @staticmethod
+    def read(path: str | Path) -> "DeletionVector":
+        table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        return DeletionVector(table.column("position").combine_chunks().to_numpy())
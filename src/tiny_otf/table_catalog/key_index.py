@@ -0,0 +1,161 @@
+import math
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlglot import exp
+
+from tiny_otf.predicates import literal_value
+
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+# separates the values of a composite primary key in its encoded form
+KEY_SEPARATOR = "\x1f"
+
+
+def encode_keys(table: pa.Table, key_columns: list[str]) -> pa.Array:
+    """
+    Primary key of every row as a single string, so keys of any type and arity
+    are hashed, sorted and compared the same way.
+    """
+    names = {name.upper(): name for name in table.column_names}
+    columns = [pc.cast(table.column(names[col.upper()]), pa.string()) for col in key_columns]
+    if any(column.null_count for column in columns):
+        raise ValueError(f"Primary key column(s) {key_columns} can't be NULL.")
+    keys = columns[0] if len(columns) == 1 else pc.binary_join_element_wise(*columns, KEY_SEPARATOR)
+    return keys.combine_chunks() if isinstance(keys, pa.ChunkedArray) else keys
+
+
+def encode_literals(values: list[Any], types: list[pa.DataType]) -> str:
+    """Encoded key of literal values, e.g. from `WHERE id = 5`, cast like the column values"""
+    texts = [pa.scalar(value).cast(arrow_type).cast(pa.string()).as_py() for value, arrow_type in zip(values, types)]
+    return KEY_SEPARATOR.join(texts)
+
+
+def key_hashes(keys: pa.Array) -> tuple[np.ndarray, np.ndarray]:
+    """Two 32-bit hashes per key for double hashing, stable across processes"""
+    from pandas.util import hash_array  # imported on the first primary key check, not with the engine
+    hashes = hash_array(np.asarray(keys.to_numpy(zero_copy_only=False), dtype=object), categorize=False)
+    return hashes & np.uint64(0xFFFFFFFF), (hashes >> np.uint64(32)) | np.uint64(1)
+
+
+@dataclass
+class KeyIndex:
+    """
+    Primary key index of one data file: a Bloom filter answering "certainly not here"
+    in O(1) per key, backed by the file's sorted keys for an exact binary search.
+    """
+    keys: pa.Array  # sorted, unique
+    bloom: np.ndarray  # packed bits
+    num_bits: int
+    num_hashes: int
+
+    @staticmethod
+    def build(keys: pa.Array) -> "KeyIndex":
+        keys = keys.take(pc.sort_indices(keys))
+        n = max(len(keys), 1)
+        num_bits = max(64, math.ceil(-n * math.log(BLOOM_FALSE_POSITIVE_RATE) / math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / n * math.log(2)))
+
+        bits = np.zeros(num_bits, dtype=bool)
+        h1, h2 = key_hashes(keys)
+        for i in range(num_hashes):
+            bits[((h1 + np.uint64(i) * h2) % np.uint64(num_bits)).astype(np.int64)] = True
+        return KeyIndex(keys=keys, bloom=np.packbits(bits), num_bits=num_bits, num_hashes=num_hashes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.bloom.nbytes
+
+    def might_contain(self, keys: pa.Array, hashes: tuple[np.ndarray, np.ndarray] | None = None) -> np.ndarray:
+        """Bloom filter probe, False means the key is certainly not in the file"""
+        h1, h2 = hashes or key_hashes(keys)
+        result = np.ones(len(keys), dtype=bool)
+        for i in range(self.num_hashes):
+            # probe the packed bits directly (np.packbits order: most significant bit first)
+            positions = ((h1 + np.uint64(i) * h2) % np.uint64(self.num_bits)).astype(np.int64)
+            result &= (self.bloom[positions >> 3] >> (7 - (positions & 7)).astype(np.uint8)) & 1 == 1
+        return result
+
+    def _search(self, key: str) -> bool:
+        low, high = 0, len(self.keys)
+        while low < high:
+            mid = (low + high) // 2
+            if self.keys[mid].as_py() < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low < len(self.keys) and self.keys[low].as_py() == key
+
+    def contains(self, keys: pa.Array, hashes: tuple[np.ndarray, np.ndarray] | None = None) -> np.ndarray:
+        """Exact membership: Bloom filter first, binary search only for its positives"""
+        result = self.might_contain(keys, hashes)
+        for i in np.flatnonzero(result):
+            result[i] = self._search(keys[int(i)].as_py())
+        return result
+
+    def write(self, index_dir: Path) -> Path:
+        index_dir.mkdir(parents=True, exist_ok=True)
+        path = index_dir / f"{uuid.uuid4().hex}.keys.arrow"
+        schema = pa.schema([("key", pa.string())], metadata={"bloom": self.bloom.tobytes(),
+                                                             "num_bits": str(self.num_bits),
+                                                             "num_hashes": str(self.num_hashes)})
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            writer.write(pa.record_batch([self.keys], schema=schema))
+        return path
+
+    @staticmethod
+    def read(path: str | Path) -> "KeyIndex":
+        """Keys are memory-mapped, only the probed ones are read from disk"""
+        table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        metadata = table.schema.metadata
+        return KeyIndex(keys=table.column("key").combine_chunks(),
+                        bloom=np.frombuffer(metadata[b"bloom"], dtype=np.uint8),
+                        num_bits=int(metadata[b"num_bits"]),
+                        num_hashes=int(metadata[b"num_hashes"]))
+
+
+def lookup_keys(condition: exp.Expression | None,
+                key_columns: list[str],
+                field_types: dict[str, pa.DataType]) -> list[str] | None:
+    """
+    Encoded primary keys a WHERE condition pins, e.g. `id = 5 AND ...` or `id IN (1, 2)`,
+    None when it doesn't restrict every key column to literals.
+    """
+    if condition is None:
+        return None
+
+    conjuncts, stack = [], [condition]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, exp.And):
+            stack.extend([node.this, node.expression])
+        elif isinstance(node, exp.Paren):
+            stack.append(node.this)
+        else:
+            conjuncts.append(node)
+
+    values: dict[str, list[Any]] = {}
+    for node in conjuncts:
+        if isinstance(node, exp.EQ):
+            column, literal = node.this, node.expression
+            if isinstance(literal, exp.Column):
+                column, literal = literal, column
+            if isinstance(column, exp.Column) and not isinstance(literal, exp.Column):
+                values[column.name.upper()] = [literal_value(literal)]
+        elif isinstance(node, exp.In) and isinstance(node.this, exp.Column) and node.expressions:
+            values[node.this.name.upper()] = [literal_value(v) for v in node.expressions]
+
+    if any(col.upper() not in values for col in key_columns):
+        return None
+    types = {name.upper(): arrow_type for name, arrow_type in field_types.items()}
+    key_types = [types[col.upper()] for col in key_columns]
+    combinations = [[]]
+    for col in key_columns:
+        combinations = [c + [v] for c in combinations for v in values[col.upper()]]
+    try:
+        return [encode_literals(c, key_types) for c in combinations if None not in c]
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        return None
@@ -0,0 +1,136 @@
+import json
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any
+
+# Name of the hidden column exposing the insert-date directory of a data file
+DEFAULT_PARTITION_FIELD = "_dt"
+
+
+def _json_safe(value: Any) -> Any:
+    """
+    Convert parquet statistics values into something json can store.
+    Dates and timestamps are kept as ISO strings, bytes are dropped.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return None
+    if hasattr(value, "isoformat"):  # pandas.Timestamp and friends
+        return value.isoformat()
+    return value
+
+
+@dataclass
+class DataFile:
+    """
+    A single committed data file of a table, as tracked by a manifest.
+    `path` is relative to the storage base path, e.g. `employee/2025-06-04/raw_x.parquet`.
+    """
+    path: str
+    partition: dict[str, str]
+    record_count: int
+    file_size_bytes: int
+    column_stats: dict[str, dict[str, Any]] = field(default_factory=dict)  # {"age": {"min": 1, "max": 9, "null_count": 0}}
+    key_index: str | None = None  # primary key index file of tables with a PRIMARY KEY
+    deletion_vector: str | None = None  # rows removed by DELETE / UPDATE, applied by scans until compaction
+    deleted_count: int = 0
+
+    @property
+    def live_count(self) -> int:
+        """Rows of the file not deleted"""
+        return self.record_count - self.deleted_count
+
+    @staticmethod
+    def from_parquet_metadata(path: str,
+                              partition: dict[str, str],
+                              file_size_bytes: int,
+                              metadata) -> "DataFile":
+        """
+        Build a DataFile from a pyarrow.parquet.FileMetaData, merging row group statistics
+        into per-column min/max/null counts.
+        """
+        column_stats: dict[str, dict[str, Any]] = {}
+
+        for rg_index in range(metadata.num_row_groups):
+            row_group = metadata.row_group(rg_index)
+
+            for col_index in range(row_group.num_columns):
+                column = row_group.column(col_index)
+                name = column.path_in_schema
+                stats = column.statistics
+                current = column_stats.setdefault(name, {"min": None, "max": None, "null_count": 0})
+
+                if stats is None:
+                    current["null_count"] = None
+                    continue
+
+                if current["null_count"] is not None:
+                    current["null_count"] += stats.null_count if stats.has_null_count else 0
+
+                if stats.has_min_max:
+                    col_min, col_max = _json_safe(stats.min), _json_safe(stats.max)
+                    if col_min is not None and (current["min"] is None or col_min < current["min"]):
+                        current["min"] = col_min
+                    if col_max is not None and (current["max"] is None or col_max > current["max"]):
+                        current["max"] = col_max
+
+        return DataFile(path=path,
+                        partition=partition,
+                        record_count=metadata.num_rows,
+                        file_size_bytes=file_size_bytes,
+                        column_stats=column_stats)
+
+    @staticmethod
+    def from_dict(data: dict) -> "DataFile":
+        return DataFile(**data)
+
+
+@dataclass
+class Manifest:
+    """
+    Immutable list of the data files making up a table at a given sequence number.
+    Every commit writes a new manifest, so readers never need to list the table directory.
+    Each manifest links to the one it was committed on (`parent`), so the manifests
+    chain up into the table's snapshot history.
+    """
+    table_name: str
+    sequence_number: int
+    files: list[DataFile]
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).replace(tzinfo=None).isoformat())
+    operation: str = "append"  # the commit that wrote it: create, append, replace, delete or update
+    parent: str | None = None  # path of the previous manifest of the table
+
+    @property
+    def record_count(self) -> int:
+        return sum(f.live_count for f in self.files)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict) -> "Manifest":
+        return Manifest(table_name=data["table_name"],
+                        sequence_number=data["sequence_number"],
+                        files=[DataFile.from_dict(f) for f in data["files"]],
+                        created_at=data["created_at"],
+                        operation=data.get("operation", "append"),
+                        parent=data.get("parent"))
+
+    def write(self, manifest_dir: Path) -> Path:
+        """
+        Write the manifest as a new json file and return its path.
+        The file name is unique, an existing manifest is never overwritten.
+        """
+        manifest_dir.mkdir(parents=True, exist_ok=True)
+        path = manifest_dir / f"{self.sequence_number:05d}-{uuid.uuid4().hex}.json"
+        with open(path, "x") as f:
+            json.dump(self.to_dict(), f)
+        return path
+
+    @staticmethod
+    def read(path: str | Path) -> "Manifest":
+        with open(path, "r") as f:
+            return Manifest.from_dict(json.load(f))
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+V = TypeVar("V")
+
+
+class ObjectCache(Generic[V]):
+    """
+    Bounded, thread-safe LRU cache of immutable catalog files (manifests, key indexes,
+    deletion vectors) keyed by path. Every entry weighs `weigh(value)`, 1 by default so
+    `budget` is a number of entries; the least recently used entries are evicted past it.
+    """
+    def __init__(self, budget: int, weigh: Callable[[V], int] = lambda value: 1):
+        self.budget = budget
+        self.weigh = weigh
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.weight = 0
+        self._entries: OrderedDict[str, tuple[V, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, load: Callable[[], V]) -> V:
+        """The cached value of `key`, `load()`-ed and added on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = load()
+        self.put(key, value)
+        return value
+
+    def put(self, key: str, value: V) -> None:
+        weight = self.weigh(value)
+        with self._lock:
+            if key in self._entries:
+                self.weight -= self._entries.pop(key)[1]
+            if weight > self.budget:
+                return
+            self._entries[key] = (value, weight)
+            self.weight += weight
+            while self.weight > self.budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.weight -= evicted
+                self.evictions += 1
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.weight -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.weight = self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "entries": len(self._entries),
+                    "weight": self.weight,
+                    "budget": self.budget}
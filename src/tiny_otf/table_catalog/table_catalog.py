@@ -1,66 +1,433 @@
-import json
+import random
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator
+import pyarrow as pa
 
-from tiny_otf.storage.storage import BaseStorage, LocalFSDataStorage
-from tiny_otf.config import METADATA_PATH
+from tiny_otf.partitioning import PartitionField, parse_partitioning
+from tiny_otf.table_catalog.catalog_backend import CatalogBackend, CommitConflictError
+from tiny_otf.table_catalog.deletion_vector import DeletionVector
+from tiny_otf.table_catalog.key_index import KeyIndex
+from tiny_otf.table_catalog.manifest import DataFile, Manifest
+from tiny_otf.table_catalog.object_cache import ObjectCache
+from tiny_otf.config import (CATALOG_BACKEND, CATALOG_COMMIT_RETRIES, DELETION_VECTOR_CACHE_BYTES, DELETION_VECTOR_PATH,
+                             KEY_INDEX_CACHE_BYTES, KEY_INDEX_PATH, MANIFEST_CACHE_SIZE, MANIFEST_PATH,
+                             SQL_TO_ARROW_TYPES, initialize_catalog_backend)
+
+if TYPE_CHECKING:
+    from tiny_otf.storage.storage import BaseStorage
+
+def utc_naive(timestamp: datetime) -> datetime:
+    """Snapshot timestamps are naive UTC, bring a tz-aware timestamp to the same form"""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
 
 class TableMetadata:
-    def __init__(self):
-        self.catalog_path = Path(METADATA_PATH)
-        self._catalog = {}
-        self._load()
-
-    # Helper functions to read from and write to json files 
-    def _load(self):
-
-        if self.catalog_path.exists():
-            print("Metadata source exists, nice!")
-            with open(self.catalog_path, "r") as f:
-                self._catalog = json.load(f)
-        # Initialise the json file as empty
-        else:
-            print("Metadata does not exist, initialising an empty one...")
-            self._catalog = {}
-
-    def _save(self):
-        with open(self.catalog_path, "w") as f:
-            json.dump(self._catalog, f, indent=2)
+    def __init__(self, backend: CatalogBackend | None = None):
+        # Table entries live in a transactional backend and are read on every access,
+        # so commits of other engine processes are always visible
+        self.backend = backend or initialize_catalog_backend(CATALOG_BACKEND)
+        self.manifest_path = Path(MANIFEST_PATH)
+        self.key_index_path = Path(KEY_INDEX_PATH)
+        self.deletion_vector_path = Path(DELETION_VECTOR_PATH)
+        self._manifests: ObjectCache[Manifest] = ObjectCache(MANIFEST_CACHE_SIZE)  # immutable, cached by path
+        # so are key indexes and deletion vectors, bounded by their size in bytes
+        self._key_indexes: ObjectCache[KeyIndex] = ObjectCache(KEY_INDEX_CACHE_BYTES, lambda index: index.nbytes)
+        self._deletion_vectors: ObjectCache[DeletionVector] = ObjectCache(DELETION_VECTOR_CACHE_BYTES,
+                                                                          lambda vector: vector.nbytes)
+
+    def _commit(self, name: str, change: Callable[[dict | None], dict | None]) -> dict | None:
+        """
+        Optimistic commit of a table entry: read it with its version, apply `change`
+        and compare-and-swap the result. When another writer committed in between,
+        re-read and re-apply with a randomized backoff.
+        """
+        for attempt in range(CATALOG_COMMIT_RETRIES):
+            metadata, version = self.backend.get(name)
+            new_metadata = change(metadata)
+            try:
+                self.backend.commit(name, new_metadata, version)
+                return new_metadata
+            except CommitConflictError:
+                time.sleep(random.uniform(0, 0.005 * 2 ** min(attempt, 6)))
+        raise CommitConflictError(f"Could not commit to table '{name}' after {CATALOG_COMMIT_RETRIES} attempts.")
 
     def get_table(self, name: str) -> dict:
-        return self._catalog.get(name)
+        return self.backend.get(name)[0]
 
     def list_tables(self) -> list:
-        return list(self._catalog.keys())
+        return self.backend.list_names()
 
-    def add_table(self, name: str, columns:list[dict[str, str]]) -> None:
-        if name in self._catalog:
-            raise ValueError(f"Table '{name}' already exists.")
-        
-        metadata = {
-            "schema": columns,
-            "storage": {
-                "format": "parquet",
-                "path": f"data/{name}"
+    def arrow_schema(self, name: str) -> pa.Schema:
+        """Arrow schema of a table, mapped from the SQL column types"""
+        meta = self.get_table(name)
+        if not meta:
+            raise ValueError(f"Table '{name}' does not exist.")
+
+        fields = []
+        for column in meta["schema"]:
+            arrow_type = SQL_TO_ARROW_TYPES.get(column["type"].upper())
+            if arrow_type is None:
+                raise ValueError(f"Unsupported column type '{column['type']}' for column '{column['name']}'.")
+            fields.append(pa.field(column["name"], arrow_type))
+        return pa.schema(fields)
+
+    def add_table(self,
+                  name: str,
+                  columns:list[dict[str, str]],
+                  primary_key: list[str] | None = None,
+                  partitioning: list[str] | None = None,
+                  data_files: list[DataFile] | None = None) -> None:
+        """
+        Create a table entry with a first, empty manifest. With `data_files` (CREATE TABLE ... AS SELECT)
+        the manifest holds them, in the same commit: the table never exists without its rows.
+        Only tables created before manifests have none, their files get taken over by their first commit.
+        """
+        column_names = [c["name"].upper() for c in columns]
+        invalid_cols = [col for col in primary_key or [] if col.upper() not in column_names]
+        if invalid_cols:
+            raise ValueError(f"Primary key column(s) '{invalid_cols}' do not exist in table {name}.")
+        parse_partitioning(partitioning, column_names)
+
+        manifest = Manifest(table_name=name, sequence_number=1, files=data_files or [], operation="create")
+        path = manifest.write(self.manifest_path / name)
+
+        def create(current: dict | None) -> dict:
+            if current is not None:
+                raise ValueError(f"Table '{name}' already exists.")
+            metadata = {
+                "schema": columns,
+                "storage": {
+                    "format": "parquet",
+                    "path": f"data/{name}"
+                }
             }
-        }
-        self._catalog[name] = metadata
-        self._save()
+            if primary_key:
+                metadata["primary_key"] = primary_key
+            if partitioning:
+                metadata["partitioning"] = partitioning
+            metadata["manifest"] = str(path)
+            return metadata
+
+        try:
+            self._commit(name, create)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        self._manifests.put(str(path), manifest)
 
     def update_table(self, name: str, metadata: dict) -> None:
-        if name not in self._catalog:
-            raise ValueError(f"Table '{name}' does not exist.")
-        self._catalog[name] = metadata
-        self._save()
+        def replace(current: dict | None) -> dict:
+            if current is None:
+                raise ValueError(f"Table '{name}' does not exist.")
+            return metadata
+        self._commit(name, replace)
 
     def delete_table(self, name: str) -> None:
-        if name in self._catalog:
-            del self._catalog[name]
-            self._save()
+        if self.table_exists(name):
+            self._commit(name, lambda current: None)
 
     def table_exists(self, name: str) -> bool:
-        return name in self._catalog
+        return self.get_table(name) is not None
+
+    def primary_key(self, name: str) -> list[str] | None:
+        meta = self.get_table(name)
+        return meta.get("primary_key") if meta else None
+
+    def partitioning(self, name: str) -> list[PartitionField]:
+        """Partition transforms of the table, empty for tables partitioned by write date"""
+        meta = self.get_table(name)
+        return parse_partitioning(meta.get("partitioning"), [c["name"] for c in meta["schema"]]) if meta else []
+
+    def write_key_index(self, name: str, keys: pa.Array) -> str:
+        """Persist the primary key index of a new data file, returns the path to store in its DataFile"""
+        index = KeyIndex.build(keys)
+        path = str(index.write(self.key_index_path / name))
+        self._key_indexes.put(path, index)
+        return path
+
+    def key_index(self, path: str) -> KeyIndex:
+        return self._key_indexes.get(path, lambda: KeyIndex.read(path))
+
+    def deletion_vector(self, path: str) -> DeletionVector:
+        return self._deletion_vectors.get(path, lambda: DeletionVector.read(path))
+
+    def _load_manifest(self, path: str) -> Manifest:
+        return self._manifests.get(path, lambda: Manifest.read(path))
+
+    def _read_manifest(self, meta: dict | None) -> Manifest | None:
+        if not meta or not meta.get("manifest"):
+            return None
+        return self._load_manifest(meta["manifest"])
+
+    def get_manifest(self,
+                     name: str,
+                     version: int | None = None,
+                     timestamp: datetime | None = None) -> Manifest | None:
+        """
+        Return the current manifest of a table, or None for tables that
+        were never written through a manifest commit.
+        With `version` or `timestamp` (UTC) the manifest pinned by that snapshot is returned,
+        so a historical read plans from exactly the files of that commit.
+        """
+        meta = self.get_table(name)
+        if version is None and timestamp is None:
+            return self._read_manifest(meta)
+        return self._load_manifest(self.find_snapshot(name, version, timestamp)["manifest"])
+
+    @staticmethod
+    def _snapshot(manifest: Manifest, path: str) -> dict:
+        """Compact snapshot history entry: the manifest pins the exact file set"""
+        return {"snapshot_id": manifest.sequence_number,
+                "timestamp": manifest.created_at,
+                "operation": manifest.operation,
+                "manifest": path,
+                "record_count": manifest.record_count}
+
+    def _walk_history(self, meta: dict) -> Iterator[dict]:
+        """
+        Snapshots of a table entry, newest first: its current manifest and the manifests it
+        chains up to, down to the entry's `first_snapshot` (older ones were expired).
+        """
+        first = meta.get("first_snapshot", 0)
+        # entries committed before manifests were chained kept their older history in the entry
+        legacy = {s["snapshot_id"]: s for s in meta.get("snapshots", []) if s["snapshot_id"] >= first}
+        path = meta.get("manifest")
+        while path:
+            manifest = self._load_manifest(path)
+            if manifest.parent is None and manifest.sequence_number in legacy:
+                yield from (legacy[i] for i in sorted(legacy, reverse=True) if i <= manifest.sequence_number)
+                return
+            yield self._snapshot(manifest, path)
+            if manifest.sequence_number <= first:
+                return  # the manifests before it were expired and deleted
+            path = manifest.parent
+
+    def _history(self, meta: dict) -> list[dict]:
+        """Snapshot history of a table entry, oldest first"""
+        return list(self._walk_history(meta))[::-1]
+
+    def live_paths(self, name: str) -> set[str]:
+        """Paths of the data files referenced by any snapshot of the table, in one walk of its history"""
+        meta = self.get_table(name)
+        if not meta:
+            raise ValueError(f"Table '{name}' does not exist.")
+        return {f.path for snapshot in self._walk_history(meta) for f in self._load_manifest(snapshot["manifest"]).files}
+
+    def snapshots(self, name: str) -> list[dict]:
+        meta = self.get_table(name)
+        if not meta:
+            raise ValueError(f"Table '{name}' does not exist.")
+        return self._history(meta)
+
+    def find_snapshot(self, name: str, version: int | None = None, timestamp: datetime | None = None) -> dict:
+        """
+        Snapshot with id `version`, or the last one committed at or before `timestamp`.
+        The history is walked from the current snapshot back, only as far as needed.
+        """
+        meta = self.get_table(name)
+        if not meta:
+            raise ValueError(f"Table '{name}' does not exist.")
+        if version is not None:
+            for snapshot in self._walk_history(meta):
+                if snapshot["snapshot_id"] == version:
+                    return snapshot
+            raise ValueError(f"Table '{name}' has no snapshot version {version}, "
+                             f"available: {[s['snapshot_id'] for s in self._history(meta)]}.")
+
+        timestamp = utc_naive(timestamp)
+        for snapshot in self._walk_history(meta):
+            if datetime.fromisoformat(snapshot["timestamp"]) <= timestamp:
+                return snapshot
+        raise ValueError(f"Table '{name}' has no snapshot at or before {timestamp.isoformat()}.")
+
+    def _commit_manifest(self,
+                         name: str,
+                         next_files: Callable[[Manifest | None], list[DataFile]],
+                         operation: str) -> Manifest:
+        """
+        Write a manifest holding `next_files(current manifest)`, chained to the current one,
+        and point the table entry at it: the new snapshot.
+        On a concurrent commit the file list is rebuilt from the winner's manifest, so no
+        writer's files get lost; manifests of failed attempts are removed.
+        """
+        attempts: list[tuple[Path, Manifest]] = []
+
+        def change(meta: dict | None) -> dict:
+            if not meta:
+                raise ValueError(f"Table '{name}' does not exist.")
+            current = self._read_manifest(meta)
+            manifest = Manifest(table_name=name,
+                                sequence_number=current.sequence_number + 1 if current else 1,
+                                files=next_files(current),
+                                operation=operation,
+                                parent=meta.get("manifest"))
+            path = manifest.write(self.manifest_path / name)
+            attempts.append((path, manifest))
+            return {**meta, "manifest": str(path)}
+
+        committed = False
+        try:
+            self._commit(name, change)
+            committed = True
+        finally:
+            for path, _ in attempts[:-1] if committed else attempts:
+                path.unlink(missing_ok=True)
+
+        path, manifest = attempts[-1]
+        self._manifests.put(str(path), manifest)
+        return manifest
+
+    def append_files(self,
+                     name: str,
+                     data_files: list[DataFile],
+                     validate: Callable[[list[DataFile]], None] | None = None) -> Manifest:
+        """
+        Commit new data files to a table: write a new manifest holding the current
+        files plus `data_files` and point the table entry at it.
+        Files already part of the table are not added twice. `validate(current files)`
+        runs on every commit attempt, e.g. a primary key check that must also see the
+        files of a concurrent commit that won the race.
+        """
+        def next_files(current: Manifest | None) -> list[DataFile]:
+            files = current.files if current else []
+            if validate:
+                validate(files)
+            current_paths = {f.path for f in files}
+            return files + [f for f in data_files if f.path not in current_paths]
+        return self._commit_manifest(name, next_files, "append")
+
+    def replace_files(self, name: str, removed: list[DataFile], added: list[DataFile]) -> Manifest:
+        """
+        Atomically swap data files of a table, e.g. after compaction: one new manifest
+        drops `removed` and adds `added`. Readers see either the old or the new file set.
+        """
+        removed_paths = {f.path for f in removed}
+
+        def next_files(current: Manifest | None) -> list[DataFile]:
+            if current is None:
+                raise ValueError(f"Table '{name}' has no manifest.")
+            missing = removed_paths - {f.path for f in current.files}
+            if missing:
+                raise ValueError(f"Files {sorted(missing)} are no longer part of table '{name}'.")
+            # rows deleted since the caller read the files would come back with the rewritten ones
+            current_vectors = {f.path: f.deletion_vector for f in current.files}
+            changed = sorted(f.path for f in removed if current_vectors[f.path] != f.deletion_vector)
+            if changed:
+                raise ValueError(f"Rows of files {changed} of table '{name}' were deleted concurrently.")
+            return [f for f in current.files if f.path not in removed_paths] + added
+        return self._commit_manifest(name, next_files, "replace")
+
+    def delete_rows(self,
+                    name: str,
+                    deletes: dict[str, DeletionVector],
+                    added: list[DataFile] | None = None,
+                    exclusive: bool = False,
+                    operation: str = "delete") -> Manifest:
+        """
+        Commit a merge-on-read DELETE / UPDATE: mark the rows `deletes` (by data file path) as
+        deleted, merging them into the files' current deletion vectors, and add the files
+        holding the `added` (e.g. updated) rows, all in one new manifest.
+        Files whose rows are all deleted are dropped from the manifest. When a concurrent commit
+        rewrote one of the files, or deleted one of the rows again while `exclusive` (an UPDATE
+        must not write a row twice), the commit fails with a CommitConflictError.
+        """
+        added = added or []
+        written: dict[tuple[str, str | None], DataFile] = {}  # (file, its vector) -> file with the merged vector
+
+        def next_files(current: Manifest | None) -> list[DataFile]:
+            files = current.files if current else []
+            by_path = {f.path: f for f in files}
+            missing = sorted(set(deletes) - set(by_path))
+            if missing:
+                raise CommitConflictError(f"Files {missing} of table '{name}' were rewritten concurrently.")
+            updated: dict[str, DataFile | None] = {}
+            for path, vector in deletes.items():
+                data_file = by_path[path]
+                if data_file.deletion_vector:
+                    previous = self.deletion_vector(data_file.deletion_vector)
+                    if exclusive and previous.overlaps(vector):
+                        raise CommitConflictError(f"Rows of '{path}' in table '{name}' were deleted concurrently.")
+                    vector = previous.union(vector)
+                if len(vector) >= data_file.record_count:
+                    updated[path] = None
+                    continue
+                key = (path, data_file.deletion_vector)
+                if key not in written:
+                    vector_path = str(vector.write(self.deletion_vector_path / name))
+                    self._deletion_vectors.put(vector_path, vector)
+                    written[key] = replace(data_file, deletion_vector=vector_path, deleted_count=len(vector))
+                updated[path] = written[key]
+            kept = [updated.get(f.path, f) for f in files]
+            return [f for f in kept if f is not None] + added
+
+        manifest = None
+        try:
+            manifest = self._commit_manifest(name, next_files, operation)
+            return manifest
+        finally:
+            committed = {f.deletion_vector for f in manifest.files} if manifest else set()
+            for data_file in written.values():
+                if data_file.deletion_vector not in committed:
+                    Path(data_file.deletion_vector).unlink(missing_ok=True)
+                    self._deletion_vectors.pop(data_file.deletion_vector)
+
+    def expire_snapshots(self, name: str, older_than: datetime, retain_last: int = 1) -> tuple[list[dict], list[DataFile]]:
+        """
+        Drop the snapshots committed before `older_than` (UTC), always keeping the last
+        `retain_last` ones, and delete their manifests. Returns the expired snapshots and the
+        data files no retained snapshot references any more, for the caller to delete.
+        """
+        if retain_last < 1:
+            raise ValueError("At least the current snapshot must be retained.")
+        older_than = utc_naive(older_than)
+        expired: list[dict] = []
+        retained: list[dict] = []
+
+        def change(meta: dict | None) -> dict:
+            if not meta:
+                raise ValueError(f"Table '{name}' does not exist.")
+            history = self._history(meta)
+            keep_from = len(history) - retain_last
+            # commits are ordered by time, so the retained snapshots are a suffix of the history
+            first = next((i for i, s in enumerate(history)
+                          if i >= keep_from or datetime.fromisoformat(s["timestamp"]) >= older_than), len(history))
+            expired[:], retained[:] = history[:first], history[first:]
+            if not expired:
+                return meta
+            metadata = {**meta, "first_snapshot": retained[0]["snapshot_id"]}
+            legacy = [s for s in metadata.pop("snapshots", []) if s["snapshot_id"] >= metadata["first_snapshot"]]
+            if legacy:
+                metadata["snapshots"] = legacy
+            return metadata
+
+        self._commit(name, change)
+
+        live_manifests = {s["manifest"] for s in retained}
+        live_files = [f for s in retained for f in self._load_manifest(s["manifest"]).files]
+        live_paths = {f.path for f in live_files}
+        live_vectors = {f.deletion_vector for f in live_files}
+        removed_files: dict[str, DataFile] = {}
+        for snapshot in expired:
+            if snapshot["manifest"] in live_manifests:
+                continue
+            for data_file in self._load_manifest(snapshot["manifest"]).files:
+                if data_file.deletion_vector and data_file.deletion_vector not in live_vectors:
+                    Path(data_file.deletion_vector).unlink(missing_ok=True)
+                    self._deletion_vectors.pop(data_file.deletion_vector)
+                if data_file.path not in live_paths:
+                    removed_files[data_file.path] = data_file
+                    if data_file.key_index:
+                        Path(data_file.key_index).unlink(missing_ok=True)
+                        self._key_indexes.pop(data_file.key_index)
+            Path(snapshot["manifest"]).unlink(missing_ok=True)
+            self._manifests.pop(snapshot["manifest"])
+        return expired, list(removed_files.values())
 
-    def dispatch_storage(self, name) -> BaseStorage:
+    def dispatch_storage(self, name) -> "BaseStorage":
         """
         Factory method to dispatch correct storagelayer based on 
         TableMetadata storage format
@@ -76,6 +443,7 @@ class TableMetadata:
 
         match fmt:
             case "parquet":
+                from tiny_otf.storage.storage import LocalFSDataStorage
                 return LocalFSDataStorage(path)
             case _:
                 return ValueError(f"Unsupported storage format: {fmt}")        
\ No newline at end of file
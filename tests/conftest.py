@@ -0,0 +1,27 @@
+import pytest
+
+from tiny_otf.engine import TinyEngine
+from tiny_otf.instrumentation import INSTRUMENTATION
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A scratch working directory: the catalog and the local data live under relative paths"""
+    (tmp_path / "src/tiny_otf/table_catalog").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def engine(workdir):
+    return TinyEngine("local_fs")
+
+
+@pytest.fixture
+def events():
+    """Instrumentation events emitted while the test runs"""
+    captured = []
+    sink = captured.append
+    INSTRUMENTATION.add_sink(sink)
+    yield captured
+    INSTRUMENTATION.remove_sink(sink)
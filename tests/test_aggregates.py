@@ -0,0 +1,64 @@
+import pytest
+
+
+@pytest.fixture
+def sales(engine):
+    engine.query("CREATE TABLE sales (id INT, region VARCHAR, amount DOUBLE, qty INT) "
+                 "WITH (partitioning = ARRAY['region'])")
+    engine.query("INSERT INTO sales VALUES (1, 'eu', 10.0, 1), (2, 'eu', 20.0, NULL), (3, 'us', 5.0, 3), "
+                 "(4, 'us', NULL, 4), (5, 'ap', 1.5, 5)")
+    engine.query("INSERT INTO sales VALUES (6, 'eu', 30.0, 6)")
+    return engine
+
+
+def rows(engine, sql):
+    """Result rows as tuples, sorted: SELECT has no ORDER BY"""
+    return sorted(tuple(row.values()) for row in engine.query(sql, result_format="arrow").to_pylist())
+
+
+def strategies(events):
+    return [e["strategy"] for e in events if e["event"] == "aggregate"]
+
+
+def test_global_aggregates(sales):
+    assert rows(sales, "SELECT COUNT(*) AS n, COUNT(amount) AS c, SUM(amount) AS s, MIN(qty) AS lo, "
+                       "MAX(qty) AS hi, AVG(qty) AS a FROM sales") == [(6, 5, 66.5, 1, 6, 3.8)]
+
+
+def test_group_by(sales):
+    assert rows(sales, "SELECT region, COUNT(*) AS n, SUM(amount) AS s, MAX(qty) AS hi FROM sales GROUP BY region") == [
+        ("ap", 1, 1.5, 5), ("eu", 3, 60.0, 6), ("us", 2, 5.0, 4)]
+    assert rows(sales, "SELECT region, AVG(amount) AS a FROM sales WHERE qty > 1 GROUP BY region") == [
+        ("ap", 1.5), ("eu", 30.0), ("us", 5.0)]
+
+
+def test_aggregates_of_no_rows(sales):
+    assert rows(sales, "SELECT COUNT(*) AS n, SUM(amount) AS s, MIN(qty) AS lo FROM sales WHERE id > 100") == [
+        (0, None, None)]
+    assert rows(sales, "SELECT region, COUNT(*) AS n FROM sales WHERE id > 100 GROUP BY region") == []
+
+
+def test_count_min_max_are_answered_from_the_manifest(sales, events):
+    assert rows(sales, "SELECT COUNT(*) AS n, MIN(id) AS lo, MAX(amount) AS hi FROM sales") == [(6, 1, 30.0)]
+    assert rows(sales, "SELECT COUNT(qty) AS c FROM sales WHERE region = 'eu'") == [(2,)]
+    assert [e for e in events if e["event"] == "scan"] == []
+    assert strategies(events) == ["statistics", "statistics"]
+
+
+def test_aggregates_that_need_the_rows_are_streamed(sales, events):
+    sales.query("SELECT SUM(amount) AS s FROM sales")
+    sales.query("SELECT COUNT(*) AS n FROM sales WHERE id > 2")
+    sales.query("SELECT region, COUNT(*) AS n FROM sales GROUP BY region")
+    assert strategies(events) == ["streaming"] * 3
+
+    # deleted rows are still in the statistics
+    events.clear()
+    sales.query("DELETE FROM sales WHERE id = 1")
+    assert rows(sales, "SELECT COUNT(*) AS n FROM sales") == [(5,)]
+    assert rows(sales, "SELECT MIN(amount) AS lo FROM sales WHERE region = 'eu'") == [(20.0,)]
+    assert strategies(events) == ["statistics", "streaming"]
+
+
+def test_limit_and_offset_apply_to_the_groups(sales):
+    assert len(sales.query("SELECT region, COUNT(*) AS n FROM sales GROUP BY region LIMIT 2")) == 2
+    assert len(sales.query("SELECT region, COUNT(*) AS n FROM sales GROUP BY region LIMIT 2 OFFSET 2")) == 1
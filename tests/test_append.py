@@ -0,0 +1,79 @@
+import csv
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+
+@pytest.fixture
+def table(engine):
+    engine.query("CREATE TABLE t (id INT, name VARCHAR, score DOUBLE)")
+    return engine
+
+
+def batches(count, rows=1000):
+    for i in range(count):
+        yield pa.record_batch({"id": pa.array(range(i * rows, (i + 1) * rows), pa.int32()),
+                               "name": [f"name-{n}" for n in range(rows)],
+                               "score": pa.array([float(n) for n in range(rows)])})
+
+
+def test_batches_are_rolled_into_files_of_the_target_size(table, events):
+    target = 64 * 1024
+
+    assert table.append("t", batches(20), target_file_size=target) == 20_000
+
+    files = table.catalog.get_manifest("t").files
+    assert len(files) > 1
+    assert all(f.file_size_bytes < 2 * target for f in files)
+    assert sum(f.record_count for f in files) == 20_000
+    assert [s["operation"] for s in table.catalog.snapshots("t")] == ["create", "append"]
+    assert [(e["rows"], e["files"]) for e in events if e["event"] == "commit"] == [(20_000, len(files))]
+    # source columns are cast to the table types
+    assert table.query("SELECT id FROM t", result_format="arrow").schema.field("id").type == pa.int64()
+    assert sorted(table.query("SELECT id FROM t")["id"]) == list(range(20_000))
+
+
+def test_sources(table, tmp_path):
+    pq.write_table(pa.table({"id": [1], "name": ["parquet"]}), tmp_path / "rows.parquet")
+    with open(tmp_path / "rows.csv", "w", newline="") as f:
+        csv.writer(f).writerows([["id", "name", "score"], [2, "csv", "2.5"]])
+
+    assert table.append("t", pa.table({"id": [0], "name": ["table"]})) == 1
+    assert table.append("t", tmp_path / "rows.parquet") == 1
+    assert table.append("t", str(tmp_path / "rows.csv")) == 1
+    assert table.append("t", pa.table({"ID": [3]}).to_reader()) == 1
+    assert table.append("t", iter([])) == 0
+
+    result = table.query("SELECT id, name, score FROM t", result_format="arrow").to_pylist()
+    assert sorted(tuple(row.values()) for row in result) == [
+        (0, "table", None), (1, "parquet", None), (2, "csv", 2.5), (3, None, None)]
+
+
+def test_appends_to_a_partitioned_table(engine):
+    engine.query("CREATE TABLE p (id INT, region VARCHAR) WITH (partitioning = ARRAY['region'])")
+
+    engine.append("p", pa.table({"id": list(range(6)), "region": ["eu", "us", "ap"] * 2}))
+
+    assert sorted(f.partition["region"] for f in engine.catalog.get_manifest("p").files) == ["ap", "eu", "us"]
+
+
+@pytest.mark.parametrize("source, message", [
+    (pa.table({"id": [1], "other": [2]}), "do not exist"),
+    (pa.table({"id": [[1]]}), "can't be stored"),
+])
+def test_invalid_sources_are_rejected(table, source, message):
+    with pytest.raises(ValueError, match=message):
+        table.append("t", source)
+
+
+def test_failed_load_commits_nothing(table):
+    def failing():
+        yield from batches(2)
+        raise RuntimeError("source broke")
+
+    with pytest.raises(RuntimeError, match="source broke"):
+        table.append("t", failing(), target_file_size=1024)
+
+    assert table.catalog.get_manifest("t").files == []
+    assert not any(path.is_file() for path in (table.storage.base_path / "t").rglob("*.parquet"))
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from tiny_otf.async_reader import AsyncBatchReader
+
+
+@pytest.fixture
+def numbers(engine):
+    engine.query("CREATE TABLE numbers (n INT)")
+    for start in range(0, 50, 10):
+        engine.query("INSERT INTO numbers VALUES " + ", ".join(f"({i})" for i in range(start, start + 10)))
+    return engine
+
+
+def test_query_async_result_formats(numbers):
+    async def main():
+        return await asyncio.gather(numbers.query_async("SELECT n FROM numbers WHERE n < ?", [3]),
+                                    numbers.query_async("SELECT COUNT(*) AS c FROM numbers", result_format="arrow"))
+
+    frame, table = asyncio.run(main())
+
+    assert isinstance(frame, pd.DataFrame) and sorted(frame["n"]) == [0, 1, 2]
+    assert table.to_pylist() == [{"c": 50}]
+
+
+def test_reader_streams_batches_off_the_event_loop(numbers, monkeypatch):
+    threads = {"loop": set(), "select": set()}
+    select = numbers._select
+
+    def recorded_select(plan):
+        threads["select"].add(threading.get_ident())
+        return select(plan)
+    monkeypatch.setattr(numbers, "_select", recorded_select)
+
+    async def main():
+        threads["loop"].add(threading.get_ident())
+        async with await numbers.query_async("SELECT n FROM numbers", result_format="reader") as batches:
+            assert isinstance(batches, AsyncBatchReader)
+            return [batch async for batch in batches]
+
+    batches = asyncio.run(main())
+
+    assert len(batches) == 5
+    assert [n for batch in batches for n in batch["n"].to_pylist()] == list(range(50))
+    assert threads["select"] and not threads["select"] & threads["loop"]
+
+
+def test_concurrent_statements_on_one_engine(numbers):
+    async def insert(i):
+        await numbers.query_async(f"INSERT INTO numbers VALUES ({100 + i})")
+
+    async def main():
+        await asyncio.gather(*(insert(i) for i in range(8)))
+        return await numbers.query_async("SELECT COUNT(*) AS c FROM numbers WHERE n >= 100")
+
+    assert asyncio.run(main())["c"].tolist() == [8]
+
+
+def test_a_slow_consumer_bounds_the_read_ahead(numbers):
+    pulled = []
+
+    def batches():
+        for i in range(20):
+            pulled.append(i)
+            yield pa.record_batch({"n": [i]})
+
+    async def main():
+        reader = AsyncBatchReader(pa.RecordBatchReader.from_batches(pa.schema([("n", pa.int64())]), batches()),
+                                  numbers.query_executor, max_buffered_batches=2)
+        async with reader:
+            first = await anext(reader)
+            await asyncio.sleep(0.05)
+            return first, len(pulled)
+
+    first, pulled_ahead = asyncio.run(main())
+
+    assert first["n"].to_pylist() == [0]
+    # the one consumed, the buffered ones and the one waiting to be queued
+    assert pulled_ahead <= 4
+
+
+def test_errors_are_raised_to_the_consumer(numbers):
+    def batches():
+        yield pa.record_batch({"n": [1]})
+        raise ValueError("broken scan")
+
+    async def main():
+        reader = AsyncBatchReader(pa.RecordBatchReader.from_batches(pa.schema([("n", pa.int64())]), batches()),
+                                  numbers.query_executor)
+        return await reader.read_all()
+
+    with pytest.raises(ValueError, match="broken scan"):
+        asyncio.run(main())
+    with pytest.raises(ValueError, match="does not exist"):
+        asyncio.run(numbers.query_async("SELECT n FROM missing"))
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS = Path(__file__).parents[1] / "benchmarks"
+
+
+def bench_suite(*args, cwd):
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).parents[1] / "src")}
+    return subprocess.run([sys.executable, str(BENCHMARKS / "bench_suite.py"), *args],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+
+
+@pytest.fixture(scope="module")
+def report(tmp_path_factory):
+    """Results of the smallest run of the suite over both backends"""
+    out = tmp_path_factory.mktemp("bench") / "bench.json"
+    process = bench_suite("run", "--sizes", "1000", "--layouts", "1-file", "bucketed", "--repeats", "2",
+                          "--max-sql-rows", "10", "--commits", "3", "--out", str(out), cwd=out.parent)
+    assert process.returncode == 0, process.stderr
+    return out
+
+
+def test_run_reports_every_benchmark(report):
+    results = json.loads(report.read_text())
+
+    assert results["environment"]["pyarrow"] and results["config"]["sizes"] == [1000]
+    names = {(r["name"], r["backend"], r["layout"]) for r in results["results"]}
+    for backend in ("local_fs", "s3_stand_in"):
+        assert ("catalog_commit", backend, None) in names
+        for layout in ("1-file", "bucketed"):
+            assert {(name, backend, layout) for name in ("append", "select_full", "select_filter",
+                                                         "parse_insert", "insert")} <= names
+    assert all(r["p50_ms"] > 0 and r["peak_rss_mb"] > 0 for r in results["results"])
+
+
+def test_compare_flags_slower_benchmarks(report, tmp_path):
+    results = json.loads(report.read_text())
+    for result in results["results"]:
+        result["p50_ms"] /= 10
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results))
+
+    same = bench_suite("compare", str(report), str(report), cwd=tmp_path)
+    slower = bench_suite("compare", str(baseline), str(report), "--min-delta-ms", "0", cwd=tmp_path)
+
+    assert same.returncode == 0 and "0 regression(s)" in same.stdout
+    assert slower.returncode == 1 and "REGRESSION" in slower.stdout
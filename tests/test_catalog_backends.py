@@ -0,0 +1,144 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tiny_otf.config import initialize_catalog_backend
+from tiny_otf.engine import TinyEngine
+from tiny_otf.table_catalog.catalog_backend import CommitConflictError
+from tiny_otf.table_catalog.manifest import DataFile
+from tiny_otf.table_catalog.table_catalog import TableMetadata
+
+BACKENDS = ["sqlite", "json_log"]
+COLUMNS = [{"name": "id", "type": "INT"}]
+
+
+def data_file(name: str) -> DataFile:
+    return DataFile(path=f"t/2025-01-01/{name}.parquet", partition={"_dt": "2025-01-01"},
+                    record_count=1, file_size_bytes=100)
+
+
+@pytest.fixture(params=BACKENDS)
+def backend_name(request, workdir):
+    return request.param
+
+
+def test_commit_with_stale_version_conflicts(backend_name):
+    backend = initialize_catalog_backend(backend_name)
+    version = backend.commit("t", {"v": 1}, 0)
+    backend.commit("t", {"v": 2}, version)
+
+    with pytest.raises(CommitConflictError):
+        backend.commit("t", {"v": 3}, version)
+    assert backend.get("t") == ({"v": 2}, version + 1)
+
+
+def test_concurrent_create_conflicts(backend_name):
+    backend = initialize_catalog_backend(backend_name)
+    backend.commit("t", {"v": 1}, 0)
+
+    with pytest.raises(CommitConflictError):
+        backend.commit("t", {"v": 2}, 0)
+    assert backend.get("t")[0] == {"v": 1}
+
+
+def test_commit_retries_on_the_winners_entry(backend_name):
+    catalog = TableMetadata(initialize_catalog_backend(backend_name))
+    catalog.add_table("t", COLUMNS)
+    other = initialize_catalog_backend(backend_name)
+    seen = []
+
+    def change(meta):
+        seen.append(dict(meta))
+        if len(seen) == 1:
+            # another writer commits between our read and our compare-and-swap
+            current, version = other.get("t")
+            other.commit("t", {**current, "owner": "other"}, version)
+        return {**meta, "comment": "ours"}
+
+    committed = catalog._commit("t", change)
+
+    assert len(seen) == 2
+    assert "owner" not in seen[0] and seen[1]["owner"] == "other"
+    assert committed == catalog.get_table("t")
+    assert committed["owner"] == "other" and committed["comment"] == "ours"
+
+
+def test_append_keeps_the_files_of_a_concurrent_commit(backend_name):
+    catalog = TableMetadata(initialize_catalog_backend(backend_name))
+    catalog.add_table("t", COLUMNS)
+    other = TableMetadata(initialize_catalog_backend(backend_name))
+    attempts = []
+
+    def validate(files):
+        attempts.append([f.path for f in files])
+        if len(attempts) == 1:
+            other.append_files("t", [data_file("theirs")])
+
+    manifest = catalog.append_files("t", [data_file("ours")], validate)
+
+    assert attempts == [[], [data_file("theirs").path]]
+    assert [f.path for f in manifest.files] == [data_file("theirs").path, data_file("ours").path]
+    assert [s["operation"] for s in catalog.snapshots("t")] == ["create", "append", "append"]
+    # the manifest of the failed attempt is removed
+    assert len(list(catalog.manifest_path.joinpath("t").iterdir())) == 3
+
+
+def test_commit_gives_up_after_the_retries(backend_name, monkeypatch):
+    monkeypatch.setattr("tiny_otf.table_catalog.table_catalog.CATALOG_COMMIT_RETRIES", 3)
+    catalog = TableMetadata(initialize_catalog_backend(backend_name))
+    catalog.add_table("t", COLUMNS)
+    other = initialize_catalog_backend(backend_name)
+
+    def change(meta):
+        current, version = other.get("t")
+        other.commit("t", current, version)
+        return meta
+
+    with pytest.raises(CommitConflictError, match="after 3 attempts"):
+        catalog._commit("t", change)
+
+
+def test_concurrent_inserts_are_all_committed(backend_name):
+    TinyEngine("local_fs", catalog_backend=backend_name).query("CREATE TABLE t (id INT PRIMARY KEY)")
+
+    def insert(worker):
+        engine = TinyEngine("local_fs", catalog_backend=backend_name)
+        for i in range(5):
+            engine.query(f"INSERT INTO t VALUES ({worker * 100 + i})")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(insert, range(4)))
+
+    engine = TinyEngine("local_fs", catalog_backend=backend_name)
+    assert engine.query("SELECT COUNT(*) AS c FROM t")["c"].tolist() == [20]
+    assert len(engine.catalog.snapshots("t")) == 1 + 20
+
+
+def test_json_log_commit_built_upon_right_away_stands(workdir, monkeypatch):
+    backend = initialize_catalog_backend("json_log")
+    other = initialize_catalog_backend("json_log")
+    version = backend.commit("t", {"v": 1}, 0)
+    link = os.link
+
+    def link_then_commit_on_top(source, target):
+        link(source, target)
+        monkeypatch.setattr(os, "link", link)
+        other.commit("t", {"v": "on top"}, version + 1)
+
+    monkeypatch.setattr(os, "link", link_then_commit_on_top)
+
+    assert backend.commit("t", {"v": 2}, version) == version + 1
+    assert backend.get("t") == ({"v": "on top"}, version + 2)
+
+
+def test_legacy_catalog_is_imported_once(backend_name, workdir, events):
+    legacy = workdir / "src/tiny_otf/table_catalog/table_metadata.json"
+    legacy.write_text(json.dumps({"t": {"schema": COLUMNS}}))
+
+    backend = initialize_catalog_backend(backend_name)
+    initialize_catalog_backend(backend_name)
+
+    assert backend.get("t") == ({"schema": COLUMNS}, 1)
+    assert [(e["backend"], e["tables"]) for e in events if e["event"] == "catalog_import"] == [(backend_name, 1)]
@@ -0,0 +1,69 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+
+from tiny_otf.compaction import group_by_partition, plan_compaction
+from tiny_otf.table_catalog.manifest import DataFile
+
+
+def data_file(name: str, size: int, day: str = "2025-01-01", deleted: int = 0) -> DataFile:
+    return DataFile(path=f"t/{day}/{name}.parquet", partition={"_dt": day}, record_count=10,
+                    file_size_bytes=size, deleted_count=deleted)
+
+
+def names(groups: list[list[DataFile]]) -> list[list[str]]:
+    return [[f.path.rsplit("/", 1)[1].split(".")[0] for f in group] for group in groups]
+
+
+def test_plan_compaction_bin_packs_small_files():
+    files = [data_file("a", 40), data_file("b", 40), data_file("big", 100), data_file("c", 30), data_file("d", 50)]
+
+    assert names(plan_compaction(files, target_file_size=100)) == [["a", "b"], ["c", "d"]]
+    # a group of a single small file is not worth rewriting
+    assert plan_compaction([data_file("a", 40), data_file("big", 100)], target_file_size=100) == []
+
+
+def test_plan_compaction_rewrites_files_with_deleted_rows():
+    files = [data_file("big", 100, deleted=3), data_file("a", 40, deleted=1)]
+
+    assert names(plan_compaction(files, target_file_size=100)) == [["big"], ["a"]]
+
+
+def test_group_by_partition_keeps_manifest_order():
+    files = [data_file("a", 1, "2025-01-02"), data_file("b", 1), data_file("c", 1, "2025-01-02")]
+
+    assert [names([group]) for group in group_by_partition(files).values()] == [[["a", "c"]], [["b"]]]
+
+
+@pytest.fixture
+def events_table(engine):
+    engine.query("CREATE TABLE ev (id INT, kind VARCHAR)")
+    # three small files in each of two date partitions
+    for day in (1, 2):
+        for i in range(3):
+            data = pa.table({"id": [day * 10 + i], "kind": ["x" if i % 2 else "y"]})
+            engine.catalog.append_files("ev", [engine.storage.write("ev", data, datetime.datetime(2025, 1, day))])
+    return engine
+
+
+def test_compact_merges_the_files_of_each_partition(events_table):
+    before = events_table.catalog.snapshots("ev")[-1]["snapshot_id"]
+
+    assert events_table.compact("ev", sort_by=["kind"]) == {"files_removed": 6, "files_added": 2}
+
+    files = events_table.catalog.get_manifest("ev").files
+    assert sorted((f.partition["_dt"], f.record_count) for f in files) == [("2025-01-01", 3), ("2025-01-02", 3)]
+    assert events_table.catalog.snapshots("ev")[-1]["operation"] == "replace"
+    day1 = events_table.query("SELECT kind, id FROM ev WHERE _dt = DATE '2025-01-01'")
+    assert day1.values.tolist() == [["x", 11], ["y", 10], ["y", 12]]
+    # the replaced files stay readable for older snapshots
+    assert len(events_table.query(f"SELECT id FROM ev FOR VERSION AS OF {before}")) == 6
+    assert events_table.compact("ev") == {"files_removed": 0, "files_added": 0}
+
+
+def test_compact_rejects_unknown_sort_columns(events_table):
+    with pytest.raises(ValueError, match="do not exist"):
+        events_table.compact("ev", sort_by=["nope"])
+    with pytest.raises(ValueError, match="does not exist"):
+        events_table.compact("missing")
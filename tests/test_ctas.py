@@ -0,0 +1,90 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+
+
+@pytest.fixture
+def src(engine):
+    engine.query("CREATE TABLE src (id INT PRIMARY KEY, region VARCHAR, v DOUBLE, d DATE)")
+    engine.append("src", pa.table({"id": pa.array(range(100), pa.int64()),
+                                   "region": ["eu", "us", "ap", "sa"] * 25,
+                                   "v": [float(i) for i in range(100)],
+                                   "d": [datetime.date(2025, 1, 1)] * 100}))
+    engine.query("DELETE FROM src WHERE id < 10")
+    return engine
+
+
+def rows(engine, sql):
+    """Result rows as tuples, sorted: SELECT has no ORDER BY"""
+    return sorted(tuple(row) for row in engine.query(sql).itertuples(index=False))
+
+
+def test_ctas_copies_the_live_rows_in_one_snapshot(src):
+    assert src.query("CREATE TABLE copy AS SELECT * FROM src") == 90
+
+    assert src.catalog.get_table("copy")["schema"] == src.catalog.get_table("src")["schema"]
+    assert [s["operation"] for s in src.catalog.snapshots("copy")] == ["create"]
+    assert rows(src, "SELECT * FROM copy") == rows(src, "SELECT * FROM src")
+
+
+def test_ctas_with_partitioning_and_filter(src):
+    sql = ("CREATE TABLE eu WITH (partitioning = ARRAY['region']) "
+           "AS SELECT id, region, v FROM src WHERE region IN ('eu', 'us') AND id < 50")
+    assert src.query(sql) == 20
+
+    assert sorted(f.partition["region"] for f in src.catalog.get_manifest("eu").files) == ["eu", "us"]
+    assert rows(src, "SELECT region, COUNT(*) AS c FROM eu GROUP BY region") == [("eu", 10), ("us", 10)]
+
+
+def test_ctas_of_an_aggregate_maps_its_types(src):
+    assert src.query("CREATE TABLE agg AS SELECT region, COUNT(*) AS n, SUM(v) AS total FROM src GROUP BY region") == 4
+
+    assert src.catalog.get_table("agg")["schema"] == [{"name": "region", "type": "VARCHAR"},
+                                                      {"name": "n", "type": "INT"},
+                                                      {"name": "total", "type": "DOUBLE"}]
+    assert rows(src, "SELECT region, n FROM agg") == [("ap", 23), ("eu", 22), ("sa", 23), ("us", 22)]
+
+
+def test_ctas_of_an_empty_result_creates_an_empty_table(src):
+    assert src.query("CREATE TABLE empty AS SELECT id FROM src WHERE id < 0") == 0
+
+    assert src.catalog.get_manifest("empty").files == []
+    assert rows(src, "SELECT COUNT(*) AS c FROM empty") == [(0,)]
+
+
+def test_failed_ctas_leaves_no_table(src):
+    with pytest.raises(ValueError, match="already exists"):
+        src.query("CREATE TABLE src AS SELECT * FROM src")
+    with pytest.raises(ValueError):
+        src.query("CREATE TABLE bad WITH (partitioning = ARRAY['nope']) AS SELECT id FROM src")
+    assert not src.catalog.table_exists("bad")
+
+
+def test_insert_select_round_trip(src):
+    src.query("CREATE TABLE dst (id INT, region VARCHAR, v DOUBLE)")
+
+    assert src.query("INSERT INTO dst SELECT id, region, v FROM src WHERE id BETWEEN 20 AND 23") == 4
+    assert src.query("INSERT INTO dst (id, v) SELECT id, v FROM src WHERE id = 50") == 1
+
+    assert rows(src, "SELECT id, region, v FROM dst WHERE region IS NOT NULL") == [
+        (20, "eu", 20.0), (21, "us", 21.0), (22, "ap", 22.0), (23, "sa", 23.0)]
+    assert src.query("SELECT region FROM dst WHERE id = 50")["region"].isna().all()
+
+
+def test_insert_select_column_count_must_match(src):
+    src.query("CREATE TABLE dst (id INT, region VARCHAR, v DOUBLE)")
+
+    with pytest.raises(ValueError, match="returns 2 column"):
+        src.query("INSERT INTO dst SELECT id, v FROM src")
+
+
+def test_insert_select_enforces_the_primary_key(src):
+    src.query("CREATE TABLE pk (id INT PRIMARY KEY, v DOUBLE)")
+    assert src.query("INSERT INTO pk SELECT id, v FROM src WHERE id < 50") == 40
+
+    with pytest.raises(ValueError, match="Duplicate primary key"):
+        src.query("INSERT INTO pk SELECT id, v FROM src")
+    assert rows(src, "SELECT COUNT(*) AS c FROM pk") == [(40,)]
+    # the files of the rejected INSERT were removed
+    assert sum(len(files) for _, _, files in (src.storage.base_path / "pk").walk()) == 1
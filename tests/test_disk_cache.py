@@ -0,0 +1,98 @@
+import pyarrow.fs as fs
+import pytest
+
+from tiny_otf.engine import TinyEngine
+from tiny_otf.storage.disk_cache import DiskCache, shared_disk_cache
+
+
+@pytest.fixture
+def remote(workdir):
+    """A local directory standing in for the object store, the bucket is its first directory"""
+    (workdir / "s3/bucket").mkdir(parents=True)
+    return fs.SubTreeFileSystem(str(workdir / "s3"), fs.LocalFileSystem())
+
+
+def minio_engine(workdir, remote):
+    return TinyEngine("minio", filesystem=remote, bucket_name="bucket", cache_dir=str(workdir / "cache"))
+
+
+def test_scan_event_reports_the_disk_cache_activity_of_the_scan(workdir, remote, events):
+    engine = minio_engine(workdir, remote)
+    engine.query("CREATE TABLE t (id INT, name VARCHAR)")
+    engine.query("INSERT INTO t VALUES (1, 'a'), (2, 'b')")
+    engine.query("INSERT INTO t VALUES (3, 'c')")
+
+    for _ in range(2):
+        assert len(engine.query("SELECT * FROM t", result_format="arrow")) == 3
+    first, second = [e for e in events if e["event"] == "scan"]
+
+    # every object is downloaded once, by the first scan
+    assert first["cache_misses"] == 2 and first["cache_bytes_downloaded"] > 0
+    assert second["cache_misses"] == 0 and second["cache_bytes_downloaded"] == 0
+    assert second["cache_hits"] > 0 and second["cache_bytes_saved"] > 0
+    assert not hasattr(engine.storage, "last_scan_cache_stats")
+
+
+@pytest.fixture
+def objects(remote):
+    """Three remote objects of 100 bytes"""
+    for name in "abc":
+        with remote.open_output_stream(f"bucket/{name}") as f:
+            f.write(name.encode() * 100)
+    return remote
+
+
+def test_objects_are_downloaded_once(workdir, objects):
+    cache = DiskCache(workdir / "cache")
+
+    assert cache.open(objects, "bucket/a").read() == b"a" * 100
+    assert cache.open(objects, "bucket/a").read() == b"a" * 100
+
+    assert cache.info() == {"hits": 1, "misses": 1, "hit_ratio": 0.5, "bytes_saved": 100, "bytes_downloaded": 100,
+                            "entries": 1, "bytes": 100, "max_bytes": cache.max_bytes}
+
+
+def test_least_recently_used_copies_are_evicted(workdir, objects):
+    cache = DiskCache(workdir / "cache", max_bytes=250)
+    cache.open(objects, "bucket/a")
+    cache.open(objects, "bucket/b")
+    cache.open(objects, "bucket/a")
+    cache.open(objects, "bucket/c")
+
+    assert cache.info()["entries"] == 2 and cache.info()["bytes"] == 200
+    assert len(list((workdir / "cache").glob("*.bin"))) == 2
+    cache.open(objects, "bucket/a")
+    cache.open(objects, "bucket/b")
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_copies_of_an_earlier_process_are_reused(workdir, objects):
+    DiskCache(workdir / "cache").open(objects, "bucket/a")
+
+    cache = DiskCache(workdir / "cache")
+
+    assert cache.info()["entries"] == 1 and cache.info()["bytes"] == 100
+    assert cache.open(objects, "bucket/a").read() == b"a" * 100
+    assert (cache.hits, cache.misses) == (1, 0)
+    # the copies are evicted down to the budget of the new process
+    assert DiskCache(workdir / "cache", max_bytes=50).info()["entries"] == 0
+
+
+def test_copy_of_a_changed_object_is_downloaded_again(workdir, objects):
+    DiskCache(workdir / "cache").open(objects, "bucket/a")
+    with objects.open_output_stream("bucket/a") as f:
+        f.write(b"new")
+    # the cached ETag no longer matches the remote one
+    next((workdir / "cache").glob("*.etag")).write_text("old-etag")
+
+    cache = DiskCache(workdir / "cache")
+
+    assert cache.open(objects, "bucket/a").read() == b"new"
+    assert (cache.hits, cache.misses, cache.bytes) == (0, 1, 3)
+
+
+def test_storages_share_the_cache_of_a_directory(workdir, remote):
+    first, second = minio_engine(workdir, remote), minio_engine(workdir, remote)
+
+    assert first.storage.disk_cache is second.storage.disk_cache is shared_disk_cache(workdir / "cache")
+    assert isinstance(first.storage.read_filesystem, fs.PyFileSystem)
@@ -0,0 +1,82 @@
+import pytest
+
+
+@pytest.fixture
+def people(engine):
+    engine.query("CREATE TABLE people (id INT PRIMARY KEY, name STRING, age INT)")
+    for batch in range(3):
+        engine.query("INSERT INTO people VALUES " + ", ".join(f"({i}, 'n{i}', {i % 10})"
+                                                             for i in range(batch * 10, batch * 10 + 10)))
+    return engine
+
+
+def rows(engine, sql):
+    """Result rows as tuples, sorted: SELECT has no ORDER BY"""
+    return sorted(tuple(row) for row in engine.query(sql).itertuples(index=False))
+
+
+def test_delete_marks_rows_in_deletion_vectors(people):
+    assert people.query("DELETE FROM people WHERE age >= 7") == 9
+
+    files = people.catalog.get_manifest("people").files
+    assert len(files) == 3
+    assert all(f.deletion_vector and f.deleted_count == 3 for f in files)
+    assert rows(people, "SELECT COUNT(*) AS c, SUM(age) AS s FROM people") == [(21, 63)]
+    assert rows(people, "SELECT * FROM people WHERE id = 8") == []
+    assert rows(people, "SELECT id FROM people WHERE age > 5") == [(6,), (16,), (26,)]
+
+
+def test_delete_of_every_row_drops_the_files(people):
+    assert people.query("DELETE FROM people WHERE id < 10") == 10
+
+    files = people.catalog.get_manifest("people").files
+    assert len(files) == 2
+    assert rows(people, "SELECT COUNT(*) AS c FROM people") == [(20,)]
+
+
+def test_update_writes_new_rows_and_deletes_old_ones(people):
+    assert people.query("UPDATE people SET age = age + 100, name = 'upd' WHERE id < 3") == 3
+
+    assert rows(people, "SELECT * FROM people WHERE id < 5") == [
+        (0, "upd", 100), (1, "upd", 101), (2, "upd", 102), (3, "n3", 3), (4, "n4", 4)]
+    assert rows(people, "SELECT COUNT(*) AS c FROM people") == [(30,)]
+    assert [s["operation"] for s in people.catalog.snapshots("people")][-1] == "update"
+
+
+def test_update_of_primary_key_is_rejected(people):
+    with pytest.raises(NotImplementedError):
+        people.query("UPDATE people SET id = 5 WHERE id = 1")
+
+
+def test_deleted_key_can_be_inserted_again(people):
+    people.query("DELETE FROM people WHERE id = 8")
+    people.query("INSERT INTO people VALUES (8, 'again', 1)")
+
+    assert rows(people, "SELECT * FROM people WHERE id = 8") == [(8, "again", 1)]
+    with pytest.raises(ValueError, match="Duplicate primary key"):
+        people.query("INSERT INTO people VALUES (9, 'dup', 1)")
+
+
+def test_time_travel_sees_deleted_rows(people):
+    version = people.catalog.snapshots("people")[-1]["snapshot_id"]
+    people.query("DELETE FROM people WHERE age >= 7")
+
+    assert rows(people, f"SELECT COUNT(*) AS c FROM people FOR VERSION AS OF {version}") == [(30,)]
+    assert rows(people, "SELECT COUNT(*) AS c FROM people") == [(21,)]
+
+
+def test_compaction_folds_deletes_and_updates_in(people):
+    people.query("DELETE FROM people WHERE age >= 7")
+    people.query("UPDATE people SET name = 'upd' WHERE id = 3")
+    before = rows(people, "SELECT * FROM people")
+
+    result = people.compact("people")
+
+    files = people.catalog.get_manifest("people").files
+    assert result == {"files_removed": 4, "files_added": 1}
+    assert [(f.record_count, f.deleted_count, f.deletion_vector) for f in files] == [(21, 0, None)]
+    assert rows(people, "SELECT * FROM people") == before
+    assert rows(people, "SELECT name FROM people WHERE id = 3") == [("upd",)]
+    # the compacted file still enforces the primary key
+    with pytest.raises(ValueError, match="Duplicate primary key"):
+        people.query("INSERT INTO people VALUES (3, 'dup', 1)")
@@ -0,0 +1,87 @@
+import json
+import logging
+
+import pytest
+
+from tiny_otf.instrumentation import INSTRUMENTATION, QueryProfile, logging_sink
+
+
+@pytest.fixture
+def table(engine):
+    engine.query("CREATE TABLE t (id INT, v VARCHAR)")
+    engine.query("INSERT INTO t VALUES (1, 'a'), (2, 'b')")
+    engine.query("INSERT INTO t VALUES (3, 'c')")
+    return engine
+
+
+def plan(engine, sql):
+    """Lines of an EXPLAIN [ANALYZE] result by event name"""
+    lines = engine.query(sql)["plan"].tolist()
+    return [line.split(":", 1)[0] for line in lines], lines
+
+
+def test_explain_plans_without_reading(table):
+    events, lines = plan(table, "EXPLAIN SELECT id FROM t WHERE id > 2")
+
+    assert events == ["parse", "plan_files", "scan", "query"]
+    assert "files_total=2, files_pruned=1, files_to_read=1" in lines[1]
+    assert "files_read" not in lines[2] and "rows=0" in lines[3]
+
+
+def test_explain_analyze_reports_what_was_read(table):
+    events, lines = plan(table, "EXPLAIN ANALYZE SELECT id FROM t WHERE id > 2")
+
+    assert events == ["parse", "plan_files", "scan", "query"]
+    assert "files_read=1, row_groups=1" in lines[2] and "rows=1" in lines[2]
+    assert "duration_ms=" in lines[2]
+
+
+def test_explain_leaves_the_table_unchanged(table):
+    _, lines = plan(table, "EXPLAIN INSERT INTO t VALUES (5, 'x'), (6, 'y')")
+    plan(table, "EXPLAIN DELETE FROM t WHERE id = 1")
+
+    assert lines[-1] == "insert: table=t, rows=2, group_commit=False"
+    assert sorted(table.query("SELECT id FROM t")["id"]) == [1, 2, 3]
+
+
+def test_explain_analyze_runs_the_statement(table):
+    events, _ = plan(table, "EXPLAIN ANALYZE DELETE FROM t WHERE id = 1")
+
+    assert events == ["parse", "plan_files", "commit", "query"]
+    assert sorted(table.query("SELECT id FROM t")["id"]) == [2, 3]
+
+
+def test_explain_shows_the_strategies(table):
+    table.query("CREATE TABLE u (id INT, w VARCHAR)")
+    table.query("INSERT INTO u VALUES (1, 'x')")
+
+    _, aggregate = plan(table, "EXPLAIN SELECT COUNT(*) AS c FROM t")
+    events, join = plan(table, "EXPLAIN SELECT t.v, u.w FROM t JOIN u ON t.id = u.id")
+
+    assert "aggregate: table=t, strategy=statistics, files=2" in aggregate
+    assert events.count("plan_files") == 2 and any(line.startswith("join: strategy=hash") for line in join)
+
+
+def test_profiles_stop_when_the_query_ends(table):
+    assert not INSTRUMENTATION.enabled
+    plan(table, "EXPLAIN ANALYZE SELECT id FROM t")
+    assert not INSTRUMENTATION.enabled
+
+    profile = QueryProfile()
+    with INSTRUMENTATION.profile(profile=profile):
+        INSTRUMENTATION.emit("custom", value=1.23456, skipped=None, text="a  b\nc")
+    assert profile.lines() == ["custom: value=1.235, text=a b c"]
+
+
+def test_logging_sink_writes_json_records(table, caplog):
+    sink = logging_sink()
+    INSTRUMENTATION.add_sink(sink)
+    try:
+        with caplog.at_level(logging.INFO, logger="tiny_otf"):
+            table.query("SELECT id FROM t")
+    finally:
+        INSTRUMENTATION.remove_sink(sink)
+
+    events = [json.loads(record.message)["event"] for record in caplog.records]
+    assert events == ["parse", "plan_files", "scan", "query"]
+    assert caplog.records[-1].tiny_otf["rows"] == 3
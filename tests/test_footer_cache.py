@@ -0,0 +1,90 @@
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+import pyarrow.parquet as pq
+import pytest
+
+from tiny_otf.storage.metadata_cache import FOOTER_CACHE, FooterCache
+
+
+@pytest.fixture
+def parquet_files(tmp_path):
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"{i}.parquet")
+        pq.write_table(pa.table({"n": [i] * 10}), path)
+        paths.append(path)
+    return paths
+
+
+def loader(paths, loaded):
+    def make_fragment(i):
+        loaded.append(i)
+        return ds.ParquetFileFormat().make_fragment(paths[i], filesystem=fs.LocalFileSystem())
+    return make_fragment
+
+
+def test_footers_are_loaded_once(parquet_files):
+    cache, loaded = FooterCache(1024 * 1024), []
+
+    first = cache.fragments(parquet_files, loader(parquet_files, loaded))
+    again = cache.fragments(list(reversed(parquet_files)), loader(parquet_files, loaded))
+
+    assert sorted(loaded) == [0, 1, 2]
+    assert again == list(reversed(first))
+    assert [f.metadata.num_rows for f in first] == [10, 10, 10]
+    assert cache.info() | {"bytes": None} == {"hits": 3, "misses": 3, "evictions": 0, "entries": 3,
+                                              "bytes": None, "budget_bytes": 1024 * 1024}
+
+
+def test_least_recently_used_footers_are_evicted(parquet_files):
+    cache, loaded = FooterCache(1024 * 1024), []
+    cache.fragments(parquet_files, loader(parquet_files, loaded))
+    size = cache.info()["bytes"] // 3
+
+    cache.fragments(parquet_files[:1], loader(parquet_files, loaded))  # 0 is now the most recent
+    cache.resize(2 * size)
+
+    assert cache.info()["entries"] == 2 and cache.info()["evictions"] == 1
+    loaded.clear()
+    cache.fragments(parquet_files, loader(parquet_files, loaded))
+    assert loaded == [1]
+
+
+def test_footers_over_the_budget_are_not_cached(parquet_files):
+    cache, loaded = FooterCache(10), []
+
+    cache.fragments(parquet_files[:1], loader(parquet_files, loaded))
+    cache.fragments(parquet_files[:1], loader(parquet_files, loaded))
+
+    assert loaded == [0, 0]
+    assert cache.info()["entries"] == 0 and cache.info()["bytes"] == 0
+
+
+def test_repeated_selects_hit_the_footer_cache(engine, events):
+    FOOTER_CACHE.clear()
+    engine.query("CREATE TABLE t (n INT)")
+    engine.query("INSERT INTO t VALUES (1), (2)")
+    engine.query("INSERT INTO t VALUES (3)")
+
+    for _ in range(2):
+        assert len(engine.query("SELECT n FROM t")) == 3
+    first, second = [(e["footer_cache_hits"], e["footer_cache_misses"]) for e in events
+                     if e["event"] == "query" and e["statement"] == "SELECT"]
+
+    assert first == (0, 2) and second == (2, 0)
+    assert engine.cache_info()["footers"]["entries"] == 2
+
+
+def test_a_rewritten_file_is_not_served_from_the_cache(engine):
+    engine.query("CREATE TABLE t (n INT)")
+    engine.query("INSERT INTO t VALUES (1)")
+    assert engine.query("SELECT n FROM t")["n"].tolist() == [1]
+    data_file = engine.catalog.get_manifest("t").files[0]
+
+    # same path and size, other content: the mtime tells the versions apart
+    path = engine.storage.base_path / data_file.path
+    pq.write_table(pa.table({"n": pa.array([7], pa.int64())}), path)
+    assert path.stat().st_size == data_file.file_size_bytes
+
+    assert engine.query("SELECT n FROM t")["n"].tolist() == [7]
@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pytest
+
+from tiny_otf.engine import TinyEngine
+from tiny_otf.group_commit import GroupCommitter
+
+
+def grouped_engine(**options):
+    engine = TinyEngine("local_fs", **options)
+    engine.query("CREATE TABLE t (id INT PRIMARY KEY, v VARCHAR)")
+    return engine
+
+
+def concurrent_inserts(engine, statements):
+    """Run the statements from as many threads, the error (or None) of each"""
+    def run(sql):
+        try:
+            engine.query(sql)
+        except ValueError as error:
+            return error
+    with ThreadPoolExecutor(max_workers=len(statements)) as pool:
+        return list(pool.map(run, statements))
+
+
+def test_concurrent_inserts_share_one_file_and_one_commit(workdir, events):
+    engine = grouped_engine(group_commit_window=0.2)
+
+    errors = concurrent_inserts(engine, [f"INSERT INTO t VALUES ({i}, 'v{i}')" for i in range(8)])
+
+    assert errors == [None] * 8
+    assert len(engine.catalog.get_manifest("t").files) == 1
+    assert [s["operation"] for s in engine.catalog.snapshots("t")] == ["create", "append"]
+    assert [(e["inserts"], e["rows"]) for e in events if e["event"] == "group_commit"] == [(8, 8)]
+    assert sorted(engine.query("SELECT id FROM t")["id"]) == list(range(8))
+
+
+def test_a_full_group_is_committed_before_the_window_ends(workdir):
+    engine = grouped_engine(group_commit_window=60, group_commit_max_rows=3)
+
+    errors = concurrent_inserts(engine, ["INSERT INTO t VALUES (1, 'a'), (2, 'b')", "INSERT INTO t VALUES (3, 'c')"])
+
+    assert errors == [None, None]
+    assert len(engine.catalog.get_manifest("t").files) == 1
+
+
+def test_only_the_insert_duplicating_a_key_fails(workdir):
+    engine = grouped_engine(group_commit_window=0.2)
+    engine.query("INSERT INTO t VALUES (0, 'existing')")
+
+    errors = concurrent_inserts(engine, ["INSERT INTO t VALUES (1, 'a')", "INSERT INTO t VALUES (0, 'dup')",
+                                         "INSERT INTO t VALUES (2, 'b'), (2, 'c')"])
+
+    assert errors[0] is None
+    assert "Duplicate primary key" in str(errors[1])
+    assert "within the inserted rows" in str(errors[2])
+    assert sorted(engine.query("SELECT id FROM t")["id"]) == [0, 1]
+
+
+def test_failed_group_fails_every_insert():
+    def commit(table_name, tables):
+        raise RuntimeError("conflict")
+    committer = GroupCommitter(commit, window=60)
+
+    futures = [committer.submit("t", pa.table({"id": [i]})) for i in range(3)]
+    committer.flush()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="conflict"):
+            future.result(timeout=1)
+
+
+def test_groups_are_per_table():
+    committed, lock = [], threading.Lock()
+
+    def commit(table_name, tables):
+        with lock:
+            committed.append((table_name, sum(t.num_rows for t in tables)))
+        return [None] * len(tables)
+    committer = GroupCommitter(commit, window=0.05)
+
+    futures = [committer.submit(name, pa.table({"id": [1, 2]})) for name in ("a", "b", "a")]
+    for future in futures:
+        future.result(timeout=1)
+
+    assert sorted(committed) == [("a", 4), ("b", 2)]
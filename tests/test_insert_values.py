@@ -0,0 +1,58 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+from sqlglot import parse_one
+
+from tiny_otf.sql_parser import InsertPlan, SqlParser
+
+SCHEMA = pa.schema([("id", pa.int64()), ("name", pa.string()), ("score", pa.float64()),
+                    ("hired", pa.date32()), ("seen", pa.timestamp("us")), ("active", pa.bool_())])
+ROWS = ("(1, 'it''s', 1.5, DATE '2024-02-29', TIMESTAMP '2024-03-01 10:30:00', true), "
+        "(-2, NULL, -3, DATE '2024-01-01', NULL, FALSE)")
+
+
+def test_scanned_values_build_the_same_tree_as_sqlglot():
+    sql = f"INSERT INTO t VALUES {ROWS};"
+
+    assert SqlParser("presto", sql).parsed_sql == parse_one(sql, dialect="presto")
+    # anything but plain literals is left to sqlglot
+    expression = "INSERT INTO t VALUES (1 + 1, 'a')"
+    assert SqlParser("presto", expression).parsed_sql == parse_one(expression, dialect="presto")
+
+
+def test_values_are_typed_by_the_table_schema():
+    plan = SqlParser("presto", f"INSERT INTO t VALUES {ROWS}").to_plan()
+
+    table = plan.to_arrow(SCHEMA)
+    assert table.schema == SCHEMA
+    assert table.to_pylist() == [
+        {"id": 1, "name": "it's", "score": 1.5, "hired": datetime.date(2024, 2, 29),
+         "seen": datetime.datetime(2024, 3, 1, 10, 30), "active": True},
+        {"id": -2, "name": None, "score": -3.0, "hired": datetime.date(2024, 1, 1), "seen": None, "active": False}]
+
+
+def test_columns_missing_from_the_insert_are_null():
+    plan = InsertPlan.from_expr(parse_one("INSERT INTO t (SCORE, id) VALUES (2.5, 7)"))
+
+    assert plan.to_arrow(SCHEMA).to_pylist() == [
+        {"id": 7, "name": None, "score": 2.5, "hired": None, "seen": None, "active": None}]
+
+
+@pytest.mark.parametrize("sql, message", [
+    ("INSERT INTO t (id, name) VALUES (1, 'a'), (2)", "Every row must have 2 values"),
+    ("INSERT INTO t (id) VALUES ('x')", "Values of column 'id' can't be converted"),
+    ("INSERT INTO t (hired) VALUES ('2024-13-01')", "Values of column 'hired' can't be converted"),
+])
+def test_invalid_values_are_rejected(sql, message):
+    with pytest.raises(ValueError, match=message):
+        SqlParser("presto", sql).to_plan().to_arrow(SCHEMA)
+
+
+def test_insert_values_round_trip(engine):
+    engine.query("CREATE TABLE t (id INT, name VARCHAR, score DOUBLE, hired DATE, seen TIMESTAMP, active BOOLEAN)")
+    engine.query(f"INSERT INTO t VALUES {ROWS}")
+
+    result = engine.query("SELECT * FROM t", result_format="arrow")
+    assert result.schema == SCHEMA
+    assert sorted(result["id"].to_pylist()) == [-2, 1]
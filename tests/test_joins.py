@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.fixture
+def shop(engine):
+    engine.query("CREATE TABLE customers (id INT PRIMARY KEY, name VARCHAR, country VARCHAR)")
+    engine.query("INSERT INTO customers VALUES (1, 'ann', 'fr'), (2, 'bob', 'us'), (3, 'cy', 'fr')")
+    engine.query("CREATE TABLE orders (id INT PRIMARY KEY, customer_id INT, amount DOUBLE)")
+    for start in (0, 100):
+        engine.query("INSERT INTO orders VALUES " + ", ".join(f"({start + i}, {start + i % 2 + 1}, {float(i)})"
+                                                              for i in range(10)))
+    engine.query("CREATE TABLE countries (code VARCHAR, label VARCHAR)")
+    engine.query("INSERT INTO countries VALUES ('fr', 'France'), ('us', 'United States')")
+    return engine
+
+
+def rows(engine, sql):
+    """Result rows as tuples, sorted: SELECT has no ORDER BY"""
+    return sorted(tuple(row.values()) for row in engine.query(sql, result_format="arrow").to_pylist())
+
+
+def test_inner_join(shop):
+    assert rows(shop, "SELECT c.name, o.amount FROM customers c JOIN orders o ON o.customer_id = c.id "
+                      "WHERE o.amount >= 7") == [("ann", 8.0), ("bob", 7.0), ("bob", 9.0)]
+
+
+def test_left_join_keeps_unmatched_rows(shop):
+    assert rows(shop, "SELECT c.name, COUNT(o.id) AS n FROM customers c LEFT JOIN orders o "
+                      "ON c.id = o.customer_id GROUP BY c.name") == [("ann", 5), ("bob", 5), ("cy", 0)]
+    assert rows(shop, "SELECT c.name, o.id FROM customers c LEFT JOIN orders o ON c.id = o.customer_id "
+                      "WHERE o.id IS NULL") == [("cy", None)]
+
+
+def test_three_table_join(shop):
+    assert rows(shop, "SELECT k.label, SUM(o.amount) AS total FROM orders o "
+                      "JOIN customers c ON o.customer_id = c.id JOIN countries k ON k.code = c.country "
+                      "GROUP BY k.label") == [("France", 20.0), ("United States", 25.0)]
+
+
+def test_where_terms_are_pushed_to_both_sides_of_the_key(shop, events):
+    assert rows(shop, "SELECT o.id, c.name FROM orders o JOIN customers c ON o.customer_id = c.id "
+                      "WHERE o.customer_id = 101") == []
+    assert rows(shop, "SELECT o.id, c.name FROM orders o JOIN customers c ON o.customer_id = c.id "
+                      "WHERE c.id = 2 AND o.amount < 4") == [(1, "bob"), (3, "bob")]
+
+    planned = {e["table"]: e["files_to_read"] for e in events if e["event"] == "plan_files"}
+    # c.id = 2 also prunes the orders by customer_id: the second file only has 101 and 102
+    assert planned == {"orders": 1, "customers": 1}
+    joins = [e for e in events if e["event"] == "join"]
+    assert [(e["build"], e["probe"]) for e in joins] == [("c", "o"), ("c", "o")]
+
+
+def test_build_side_keys_filter_the_probe_scan(shop, events):
+    rows(shop, "SELECT o.id FROM orders o JOIN customers c ON o.customer_id = c.id WHERE c.name = 'ann'")
+
+    join_filter, = [e for e in events if e["event"] == "join_filter"]
+    assert join_filter["table"] == "orders" and join_filter["distinct_keys"] == 1
+    assert join_filter["files_to_read"] == 1
+
+
+def test_unsupported_joins_are_rejected(shop):
+    with pytest.raises(NotImplementedError):
+        shop.query("SELECT o.amount * 2 FROM orders o JOIN customers c ON o.customer_id = c.id")
+    with pytest.raises(NotImplementedError, match="must compare"):
+        shop.query("SELECT o.id FROM orders o JOIN customers c ON o.id = o.customer_id")
@@ -0,0 +1,60 @@
+import datetime
+
+import pyarrow as pa
+
+from tiny_otf.table_catalog.manifest import Manifest
+
+
+def test_files_with_fewer_columns_are_read_as_the_table_schema(engine):
+    engine.query("CREATE TABLE t (id INT, name VARCHAR, score DOUBLE)")
+    # a file written before `score` existed, e.g. taken over from a legacy table
+    narrow = engine.storage.write("t", pa.table({"id": pa.array([1, 2], pa.int32()), "name": ["a", "b"]}),
+                                  datetime.datetime.today())
+    engine.catalog.append_files("t", [narrow])
+    engine.query("INSERT INTO t VALUES (3, 'c', 1.5)")
+
+    result = engine.query("SELECT * FROM t", result_format="arrow")
+    assert result.schema == engine.catalog.arrow_schema("t")
+    assert sorted(result.to_pylist(), key=lambda row: row["id"]) == [
+        {"id": 1, "name": "a", "score": None}, {"id": 2, "name": "b", "score": None},
+        {"id": 3, "name": "c", "score": 1.5}]
+    assert engine.query("SELECT id FROM t WHERE score > 1")["id"].tolist() == [3]
+    assert engine.query("DELETE FROM t WHERE score IS NULL") == 2
+
+    engine.query("INSERT INTO t VALUES (4, 'd', 2.5)")
+    engine.catalog.append_files("t", [engine.storage.write("t", pa.table({"id": [5]}), datetime.datetime.today())])
+    assert engine.compact("t")["files_removed"] == 3
+    assert engine.query("SELECT COUNT(*) AS c, SUM(score) AS s FROM t")[["c", "s"]].values.tolist() == [[3, 4.0]]
+
+
+def test_inserts_commit_manifests_with_file_stats(engine, events):
+    engine.query("CREATE TABLE t (id INT, name VARCHAR)")
+    engine.query("INSERT INTO t VALUES (1, 'a'), (5, NULL)")
+    engine.query("INSERT INTO t VALUES (7, 'b')")
+
+    manifest = engine.catalog.get_manifest("t")
+    assert (manifest.sequence_number, manifest.operation, manifest.record_count) == (3, "append", 3)
+    assert [f.record_count for f in manifest.files] == [2, 1]
+    assert manifest.files[0].column_stats["id"] == {"min": 1, "max": 5, "null_count": 0}
+    assert manifest.files[0].column_stats["name"]["null_count"] == 1
+    assert Manifest.read(engine.catalog.get_table("t")["manifest"]) == manifest
+
+    assert sorted(engine.query("SELECT id FROM t")["id"]) == [1, 5, 7]
+    # planned from the manifest, the table directory is not listed
+    assert [e["event"] for e in events if e["event"] in ("plan_files", "list_files")] == ["plan_files"]
+
+
+def test_table_without_manifest_is_listed_then_taken_over(engine, events):
+    engine.catalog.backend.commit("legacy", {"schema": [{"name": "id", "type": "INT"}],
+                                             "storage": {"format": "parquet", "path": "data/legacy"}}, 0)
+    engine.storage.write("legacy", pa.table({"id": [1, 2]}), datetime.datetime(2025, 1, 1))
+
+    assert sorted(engine.query("SELECT id FROM legacy")["id"]) == [1, 2]
+    assert [e["files"] for e in events if e["event"] == "list_files"] == [1]
+    assert engine.catalog.get_manifest("legacy") is None
+
+    engine.query("INSERT INTO legacy VALUES (3)")
+    manifest = engine.catalog.get_manifest("legacy")
+    assert len(manifest.files) == 2
+    assert manifest.files[0].partition == {"_dt": "2025-01-01"}
+    assert sorted(engine.query("SELECT id FROM legacy")["id"]) == [1, 2, 3]
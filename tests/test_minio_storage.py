@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.fs as fs
+import pyarrow.parquet as pq
+import pytest
+
+from tiny_otf.engine import TinyEngine
+from tiny_otf.storage.storage import MinioDataStorage
+
+
+@pytest.fixture
+def remote(workdir):
+    """A local directory standing in for the object store, the bucket is its first directory"""
+    (workdir / "s3/bucket").mkdir(parents=True)
+    return fs.SubTreeFileSystem(str(workdir / "s3"), fs.LocalFileSystem())
+
+
+@pytest.fixture
+def storage(remote):
+    return MinioDataStorage("data", filesystem=remote, bucket_name="bucket", cache_dir=None, io_concurrency=4)
+
+
+def numbers(start: int, stop: int) -> pa.Table:
+    return pa.table({"n": pa.array(range(start, stop), pa.int64())})
+
+
+def test_written_objects_are_scanned_back(storage, workdir):
+    files = [storage.write("t", numbers(0, 10), datetime(2025, 1, 1)),
+             storage.write("t", numbers(10, 15), datetime(2025, 1, 2))]
+
+    assert (workdir / "s3/bucket/data" / files[0].path).is_file()
+    assert [(f.partition, f.record_count) for f in files] == [({"_dt": "2025-01-01"}, 10), ({"_dt": "2025-01-02"}, 5)]
+    assert files[0].file_size_bytes == (workdir / "s3/bucket/data" / files[0].path).stat().st_size
+    assert storage.scan("t", ["n"], files=files).read_all()["n"].to_pylist() == list(range(15))
+    assert storage.list_files("t") == files
+
+
+def test_filesystem_and_executor_are_created_once(storage, remote):
+    assert storage.filesystem is remote
+    assert storage.read_filesystem is remote  # no disk cache
+    assert storage._executor is storage._executor
+    assert storage._executor._max_workers == 4
+
+
+def test_byte_ranges_are_fetched_in_order(storage, workdir):
+    data_file = storage.write("t", numbers(0, 100), datetime(2025, 1, 1))
+    content = (workdir / "s3/bucket/data" / data_file.path).read_bytes()
+    ranges = [(0, 4), (len(content) - 4, 4), (100, 50)]
+
+    assert storage.read_ranges(data_file.path, ranges) == [content[:4], content[-4:], content[100:150]]
+    assert content[:4] == content[-4:] == b"PAR1"
+
+
+def test_whole_objects_are_fetched_in_order(storage, workdir):
+    files = [storage.write("t", numbers(i, i + 1), datetime(2025, 1, 1)) for i in range(5)]
+    paths = [f.path for f in reversed(files)]
+
+    objects = storage.read_objects(paths)
+
+    assert objects == [(workdir / "s3/bucket/data" / path).read_bytes() for path in paths]
+    assert [pq.read_table(pa.BufferReader(o))["n"][0].as_py() for o in objects] == [4, 3, 2, 1, 0]
+
+
+def test_deleted_objects_are_no_longer_listed(storage):
+    files = [storage.write("t", numbers(i, i + 1), datetime(2025, 1, 1)) for i in range(3)]
+
+    storage.delete_files([files[0].path, files[0].path, "t/2025-01-01/missing.parquet"])
+
+    assert [path for path, _ in storage.list_paths("t")] == sorted(f.path for f in files[1:])
+
+
+def test_engine_on_minio_storage(workdir, remote):
+    engine = TinyEngine("minio", filesystem=remote, bucket_name="bucket", cache_dir=None)
+    engine.query("CREATE TABLE t (id INT PRIMARY KEY, name VARCHAR)")
+    engine.query("INSERT INTO t VALUES (1, 'a'), (2, 'b')")
+    engine.query("INSERT INTO t VALUES (3, 'c')")
+    engine.query("DELETE FROM t WHERE id = 2")
+
+    assert sorted(engine.query("SELECT id FROM t")["id"]) == [1, 3]
+    assert engine.compact("t") == {"files_removed": 2, "files_added": 1}
+    assert sorted(engine.query("SELECT name FROM t")["name"]) == ["a", "c"]
@@ -0,0 +1,83 @@
+from datetime import date, datetime
+
+import pyarrow as pa
+import pytest
+
+from tiny_otf.partitioning import PartitionField, parse_partitioning, partition_path, split_by_partition
+
+
+def scanned(events):
+    return [(e["files_total"], e["files_to_read"]) for e in events if e["event"] == "plan_files"]
+
+
+@pytest.mark.parametrize("spec, values, expected", [
+    ("region", pa.array(["eu", None]), ["eu", None]),
+    ("year(ts)", pa.array([datetime(2025, 6, 4, 13)]), ["2025"]),
+    ("month(ts)", pa.array([date(2025, 6, 4)]), ["2025-06"]),
+    ("day(ts)", pa.array([datetime(2025, 6, 4, 13)]), ["2025-06-04"]),
+    ("hour(ts)", pa.array([datetime(2025, 6, 4, 13, 59)]), ["2025-06-04-13"]),
+    ("truncate(10, n)", pa.array([19, -1, None]), ["10", "-10", None]),
+    ("truncate(2, name)", pa.array(["abc", "x"]), ["ab", "x"]),
+])
+def test_transforms(spec, values, expected):
+    assert PartitionField.parse(spec).apply(values).to_pylist() == expected
+
+
+def test_buckets_are_stable_and_in_range():
+    field = PartitionField.parse("bucket(4, id)")
+    buckets = field.apply(pa.array(range(1000))).to_pylist()
+
+    assert field.name == "id_bucket" and not field.is_monotonic
+    assert set(buckets) == {"0", "1", "2", "3"}
+    assert field.apply(pa.array(range(1000))).to_pylist() == buckets
+    assert field.value_of(7, pa.int64()) == buckets[7]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("bucket(id)", "needs a positive width"),
+    ("bucket(0, id)", "needs a positive width"),
+    ("day(3, ts)", "takes a single column"),
+    ("week(ts)", "Unsupported partition transform"),
+    ("day(ts", "Invalid partition transform"),
+])
+def test_invalid_specs(spec, message):
+    with pytest.raises(ValueError, match=message):
+        PartitionField.parse(spec)
+
+
+def test_source_columns_must_exist():
+    assert [f.name for f in parse_partitioning(["day(TS)", "region"], ["ts", "region"])] == ["TS_day", "region"]
+    with pytest.raises(ValueError, match="do not exist"):
+        parse_partitioning(["day(other)"], ["ts"])
+
+
+def test_rows_are_split_by_partition():
+    table = pa.table({"region": ["eu", "us", "eu", None], "n": [1, 2, 3, 4]})
+    fields = parse_partitioning(["region", "truncate(2, n)"], table.column_names)
+
+    parts = {partition_path(partition): part["n"].to_pylist() for partition, part in split_by_partition(table, fields)}
+
+    assert parts == {"region=eu/n_truncate=0": [1], "region=eu/n_truncate=2": [3],
+                     "region=us/n_truncate=2": [2], "region=__NULL__/n_truncate=4": [4]}
+
+
+@pytest.fixture
+def events_table(engine):
+    engine.query("CREATE TABLE ev (id INT, ts TIMESTAMP, region VARCHAR) "
+                 "WITH (partitioning = ARRAY['day(ts)', 'bucket(4, id)', 'region'])")
+    engine.query("INSERT INTO ev VALUES (1, TIMESTAMP '2025-06-04 10:00:00', 'eu'), "
+                 "(2, TIMESTAMP '2025-06-04 11:00:00', 'us'), (3, TIMESTAMP '2025-06-05 10:00:00', 'eu'), "
+                 "(4, TIMESTAMP '2025-06-06 10:00:00', NULL)")
+    return engine
+
+
+def test_partitioned_writes_and_pruning(events_table, events):
+    files = events_table.catalog.get_manifest("ev").files
+    assert len(files) == 4
+    assert all(set(f.partition) == {"ts_day", "id_bucket", "region"} for f in files)
+
+    assert sorted(events_table.query("SELECT id FROM ev WHERE ts >= TIMESTAMP '2025-06-05 00:00:00'")["id"]) == [3, 4]
+    assert sorted(events_table.query("SELECT id FROM ev WHERE region = 'eu'")["id"]) == [1, 3]
+    assert events_table.query("SELECT id FROM ev WHERE id = 2")["id"].tolist() == [2]
+    assert events_table.query("SELECT id FROM ev WHERE region IS NULL")["id"].tolist() == [4]
+    assert scanned(events) == [(4, 2), (4, 2), (4, 1), (4, 1)]
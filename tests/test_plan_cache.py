@@ -0,0 +1,93 @@
+import datetime
+
+import pytest
+
+from tiny_otf.sql_parser import PLAN_CACHE, PlanCache, SqlParser, normalize_sql
+
+
+@pytest.fixture(autouse=True)
+def empty_plan_cache():
+    PLAN_CACHE.clear()
+    yield
+    PLAN_CACHE.clear()
+
+
+@pytest.fixture
+def people(engine):
+    engine.query("CREATE TABLE people (id INT, name VARCHAR, born DATE)")
+    engine.query("INSERT INTO people VALUES (1, 'ann', DATE '1990-01-01'), (2, 'bob', DATE '2000-06-15'), "
+                 "(3, 'o''neil', NULL)")
+    return engine
+
+
+def test_normalized_statements_share_a_plan():
+    assert normalize_sql("SELECT  a\n FROM t ;") == "SELECT a FROM t"
+    assert normalize_sql("SELECT 'a  b' FROM t") == "SELECT 'a  b' FROM t"
+
+    first = SqlParser("presto", "SELECT a FROM t").prepare()
+    assert SqlParser("presto", "SELECT a\n  FROM t;").prepare() is first
+    assert SqlParser("duckdb", "SELECT a FROM t").prepare() is not first
+    assert SqlParser.cache_info() == {"hits": 1, "misses": 2, "size": 2, "maxsize": PLAN_CACHE.maxsize}
+
+
+def test_parse_event_reports_cache_use(events, monkeypatch):
+    monkeypatch.setattr("tiny_otf.sql_parser.PLAN_CACHE_MAX_SQL_LENGTH", 30)
+    SqlParser("presto", "SELECT a FROM t").prepare()
+    SqlParser("presto", "SELECT a FROM t").prepare()
+    SqlParser("presto", "SELECT a, b, c, d, e, f, g, h FROM t").prepare()
+
+    assert [e["cached"] for e in events if e["event"] == "parse"] == [False, True, False]
+    assert SqlParser.cache_info()["size"] == 1
+
+
+def test_plan_cache_evicts_the_least_recently_used():
+    cache = PlanCache(2)
+    cache.put(("a", "presto"), "A")
+    cache.put(("b", "presto"), "B")
+    cache.get(("a", "presto"))
+    cache.put(("c", "presto"), "C")
+
+    assert cache.get(("b", "presto")) is None
+    assert cache.get(("a", "presto")) == "A"
+    assert cache.info()["size"] == 2
+
+
+def test_positional_and_named_parameters(people):
+    sql = "SELECT name FROM people WHERE id = ? OR name = ?"
+    assert people.query(sql, [1, "o'neil"])["name"].tolist() == ["ann", "o'neil"]
+    assert people.query(sql, [2, "nobody"])["name"].tolist() == ["bob"]
+    assert SqlParser.cache_info()["hits"] >= 1
+
+    named = "SELECT id FROM people WHERE born >= :since AND id > :id"
+    assert people.query(named, {"since": datetime.date(1995, 1, 1), "id": 0})["id"].tolist() == [2]
+
+
+def test_question_marks_in_strings_are_not_parameters(people):
+    people.query("INSERT INTO people (id, name) VALUES (?, 'who?')", [4])
+
+    assert people.query("SELECT id FROM people WHERE name = 'who?'")["id"].tolist() == [4]
+
+
+def test_insert_with_parameters(people):
+    sql = "INSERT INTO people VALUES (?, ?, ?)"
+    people.query(sql, [10, None, datetime.date(2010, 1, 1)])
+    people.query(sql, [-11, "neg", None])
+
+    assert sorted(people.query("SELECT id FROM people WHERE id > 5 OR id < 0")["id"]) == [-11, 10]
+
+
+@pytest.mark.parametrize("params, message", [
+    (None, "Statement has 2 parameter"),
+    ([1], "Statement has 2 parameter"),
+    ({"id": 1}, "Missing value"),
+])
+def test_unbound_parameters_are_rejected(people, params, message):
+    with pytest.raises(ValueError, match=message):
+        people.query("SELECT id FROM people WHERE id = ? OR id = ?", params)
+
+
+def test_parameters_of_a_statement_without_placeholders_are_rejected(people):
+    with pytest.raises(ValueError, match="no parameters"):
+        people.query("SELECT id FROM people", [1])
+    with pytest.raises(ValueError, match="Missing value"):
+        people.query("SELECT id FROM people WHERE id = :id", {"other": 1})
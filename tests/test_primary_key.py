@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import pyarrow as pa
+import pytest
+
+from tiny_otf.table_catalog.key_index import KeyIndex
+
+
+def probed_files(engine, monkeypatch):
+    """Paths of the files whose key index an INSERT probes"""
+    probed = []
+    key_index = engine._key_index
+
+    def spy(table_name, data_file, primary_key):
+        probed.append(data_file.path)
+        return key_index(table_name, data_file, primary_key)
+    monkeypatch.setattr(engine, "_key_index", spy)
+    return probed
+
+
+def test_composite_key_inserts_only_probe_files_in_the_key_range(engine, monkeypatch):
+    engine.query("CREATE TABLE orders (region VARCHAR, id INT, amount DOUBLE, PRIMARY KEY (region, id))")
+    for region in ("ap", "eu", "us"):
+        engine.query(f"INSERT INTO orders VALUES ('{region}', 1, 1.0), ('{region}', 3, 3.0)")
+    files = {f.column_stats["region"]["min"]: f.path for f in engine.catalog.get_manifest("orders").files}
+    probed = probed_files(engine, monkeypatch)
+
+    engine.query("INSERT INTO orders VALUES ('eu', 2, 2.0)")
+    assert probed == [files["eu"]]
+
+    probed.clear()
+    with pytest.raises(ValueError, match="Duplicate primary key"):
+        engine.query("INSERT INTO orders VALUES ('us', 3, 5.0)")
+    assert probed == [files["us"]]
+
+    # in the range of every file's region, but not of their ids
+    probed.clear()
+    engine.query("INSERT INTO orders VALUES ('ap', 4, 1.0), ('us', 5, 1.0)")
+    assert probed == []
+
+
+@pytest.fixture
+def users(engine):
+    engine.query("CREATE TABLE users (id INT PRIMARY KEY, name VARCHAR)")
+    engine.query("INSERT INTO users VALUES " + ", ".join(f"({i}, 'u{i}')" for i in range(100)))
+    return engine
+
+
+def test_key_index_is_persisted_with_the_data_file(users):
+    data_file = users.catalog.get_manifest("users").files[0]
+
+    index = KeyIndex.read(data_file.key_index)
+    assert index.keys.to_pylist() == sorted(str(i) for i in range(100))
+    assert index.contains(pa.array(["5", "99", "100", "-1"])).tolist() == [True, True, False, False]
+    assert not index.might_contain(pa.array([str(i) for i in range(1000, 2000)])).all()
+
+
+def test_duplicate_keys_are_rejected(users):
+    with pytest.raises(ValueError, match=r"Duplicate primary key value\(s\) \['7'\]"):
+        users.query("INSERT INTO users VALUES (200, 'new'), (7, 'dup')")
+    with pytest.raises(ValueError, match="within the inserted rows"):
+        users.query("INSERT INTO users VALUES (300, 'a'), (300, 'b')")
+    with pytest.raises(ValueError, match="can't be NULL"):
+        users.query("INSERT INTO users VALUES (NULL, 'null')")
+
+    # rejected INSERTs commit nothing
+    assert len(users.catalog.get_manifest("users").files) == 1
+    assert len(users.query("SELECT id FROM users")) == 100
+
+
+def test_appended_rows_are_checked_too(users):
+    with pytest.raises(ValueError, match="Duplicate primary key"):
+        users.append("users", pa.table({"id": pa.array([1000, 42], pa.int64()), "name": ["a", "b"]}))
+    with pytest.raises(ValueError, match="within the appended rows"):
+        users.append("users", pa.table({"id": pa.array([1000, 1000], pa.int64()), "name": ["a", "b"]}))
+
+
+def test_files_written_without_a_key_index_get_one(users):
+    data_file = users.storage.write("users", pa.table({"id": pa.array([500], pa.int64()), "name": ["x"]}),
+                                    datetime.today())
+    users.catalog.append_files("users", [data_file])
+    assert data_file.key_index is None
+
+    with pytest.raises(ValueError, match="Duplicate primary key"):
+        users.query("INSERT INTO users VALUES (500, 'dup')")
+    users.query("INSERT INTO users VALUES (501, 'ok')")
+
+    assert all(f.key_index for f in users.catalog.get_manifest("users").files)
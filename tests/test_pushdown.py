@@ -0,0 +1,73 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+
+
+@pytest.fixture
+def emp(engine):
+    engine.query("CREATE TABLE emp (emp_id INT, dept VARCHAR, salary DOUBLE)")
+    for batch in range(4):
+        engine.query("INSERT INTO emp VALUES " + ", ".join(f"({i}, 'd{i % 3}', {i * 10.0})"
+                                                          for i in range(batch * 10, batch * 10 + 10)))
+    return engine
+
+
+def rows(engine, sql):
+    """Result rows as tuples, sorted: SELECT has no ORDER BY"""
+    return sorted(tuple(row) for row in engine.query(sql).itertuples(index=False))
+
+
+def plan(events):
+    return [e for e in events if e["event"] == "plan_files"][-1]
+
+
+def test_where_columns_match_case_insensitively(emp, events):
+    assert rows(emp, "SELECT emp_id, salary FROM emp WHERE EMP_ID = 12") == [(12, 120.0)]
+    assert plan(events)["files_to_read"] == 1
+    assert rows(emp, "SELECT emp_id FROM emp WHERE Salary BETWEEN 50 AND 70 AND DEPT = 'd0'") == [(6,)]
+    assert plan(events)["files_to_read"] == 1
+
+    assert emp.query("UPDATE emp SET SALARY = Salary + 1 WHERE EMP_ID IN (1, 2)") == 2
+    assert plan(events)["files_to_read"] == 1
+    assert emp.query("DELETE FROM emp WHERE EMP_ID >= 35") == 5
+    assert plan(events)["files_to_read"] == 1
+    assert rows(emp, "SELECT emp_id, salary FROM emp WHERE emp_id < 3 OR emp_id > 33") == [
+        (0, 0.0), (1, 11.0), (2, 21.0), (34, 340.0)]
+
+
+def test_unknown_where_column_is_rejected(emp):
+    with pytest.raises(ValueError, match="do not exist"):
+        emp.query("SELECT * FROM emp WHERE nope = 1")
+    with pytest.raises(ValueError, match="do not exist"):
+        emp.query("DELETE FROM emp WHERE nope = 1")
+
+
+@pytest.mark.parametrize("where, expected, files_to_read", [
+    ("emp_id BETWEEN 12 AND 25", list(range(12, 26)), 2),
+    ("emp_id IN (1, 35)", [1, 35], 2),
+    ("emp_id > 100", [], 0),
+    ("emp_id >= 38 OR emp_id < 1", [0, 38, 39], 2),
+    ("dept = 'd1' AND emp_id < 8", [1, 4, 7], 1),
+    ("emp_id >= 30 AND salary <> 350", [30, 31, 32, 33, 34, 36, 37, 38, 39], 1),
+    # NOT is filtered on, not pruned
+    ("NOT emp_id < 38", [38, 39], 4),
+    # no file has nulls
+    ("dept IS NULL", [], 0),
+])
+def test_file_stats_prune_the_scan(emp, events, where, expected, files_to_read):
+    assert sorted(emp.query(f"SELECT emp_id FROM emp WHERE {where}")["emp_id"]) == expected
+    assert plan(events)["files_total"] == 4
+    assert plan(events)["files_to_read"] == files_to_read
+
+
+def test_date_partitions_prune_the_scan(emp, events):
+    old = emp.storage.write("emp", pa.table({"emp_id": [100], "dept": ["old"], "salary": [1.0]}),
+                            datetime.datetime(2020, 1, 1))
+    emp.catalog.append_files("emp", [old])
+
+    assert emp.query("SELECT emp_id, _dt FROM emp WHERE _dt = DATE '2020-01-01'").values.tolist() == [
+        [100, datetime.date(2020, 1, 1)]]
+    assert plan(events)["files_to_read"] == 1
+    assert len(emp.query("SELECT emp_id FROM emp WHERE _dt > DATE '2020-01-01'")) == 40
+    assert plan(events)["files_to_read"] == 4
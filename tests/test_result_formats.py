@@ -0,0 +1,55 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from tiny_otf.config import ResultFormat
+from tiny_otf.sql_parser import SqlParser
+
+
+@pytest.fixture
+def numbers(engine):
+    engine.query("CREATE TABLE numbers (n INT, label VARCHAR)")
+    for start in (0, 10):
+        engine.query("INSERT INTO numbers VALUES " + ", ".join(f"({i}, 'l{i}')" for i in range(start, start + 10)))
+    return engine
+
+
+def test_pandas_is_the_default(numbers):
+    result = numbers.query("SELECT n FROM numbers WHERE n < 3")
+
+    assert isinstance(result, pd.DataFrame)
+    assert sorted(result["n"]) == [0, 1, 2]
+
+
+def test_arrow_result_keeps_the_table_types(numbers):
+    result = numbers.query("SELECT n, label FROM numbers", result_format="arrow")
+
+    assert isinstance(result, pa.Table)
+    assert result.schema == pa.schema([("n", pa.int64()), ("label", pa.string())])
+    assert sorted(result["n"].to_pylist()) == list(range(20))
+
+
+def test_reader_streams_one_batch_per_file(numbers):
+    reader = numbers.query("SELECT n FROM numbers", result_format=ResultFormat.READER)
+
+    assert isinstance(reader, pa.RecordBatchReader)
+    assert reader.schema == pa.schema([("n", pa.int64())])
+    batches = list(reader)
+    assert len(batches) == 2
+    assert sorted(n for batch in batches for n in batch["n"].to_pylist()) == list(range(20))
+
+
+def test_empty_result_has_the_schema_in_every_format(numbers):
+    sql = "SELECT n, label FROM numbers WHERE n > 100"
+
+    assert numbers.query(sql, result_format="reader").read_all().num_rows == 0
+    assert numbers.query(sql, result_format="arrow").column_names == ["n", "label"]
+    assert list(numbers.query(sql).columns) == ["n", "label"]
+
+
+def test_execute_takes_a_result_format(numbers):
+    plan = SqlParser("presto", "SELECT COUNT(*) AS c FROM numbers").to_plan()
+
+    assert numbers.execute(plan, "arrow").to_pylist() == [{"c": 20}]
+    with pytest.raises(ValueError):
+        numbers.execute(plan, "csv")
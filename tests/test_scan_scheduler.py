@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from tiny_otf.engine import TinyEngine
+from tiny_otf.storage.scan_scheduler import ScanScheduler
+from tiny_otf.table_catalog.deletion_vector import DeletionVector
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Three files of four 25-row row groups, n = 0..299 in file order"""
+    for i in range(3):
+        table = pa.table({"n": pa.array(range(i * 100, i * 100 + 100), pa.int64()), "s": [str(i)] * 100})
+        pq.write_table(table, tmp_path / f"{i}.parquet", row_group_size=25)
+    return ds.dataset(sorted(str(p) for p in tmp_path.glob("*.parquet")), format="parquet")
+
+
+def values(batches):
+    return [n for batch in batches for n in batch["n"].to_pylist()]
+
+
+def new_stats():
+    return {"files_read": 0, "row_groups": 0, "bytes_read": 0}
+
+
+def test_ordered_scan_keeps_file_and_row_group_order(dataset):
+    scheduler = ScanScheduler(max_workers=4, prefetch_bytes=1)
+
+    assert values(scheduler.scan(dataset, ["n"])) == list(range(300))
+
+
+def test_unordered_scan_returns_every_row(dataset):
+    scheduler = ScanScheduler(max_workers=4)
+
+    batches = list(scheduler.scan(dataset, ["n"], ordered=False))
+
+    assert sorted(values(batches)) == list(range(300))
+    assert all(batch.schema.names == ["n"] for batch in batches)
+
+
+def test_row_groups_are_pruned_by_their_statistics(dataset):
+    stats = new_stats()
+
+    result = values(ScanScheduler(2).scan(dataset, ["n"], ds.field("n").isin([10, 260]), stats=stats))
+
+    assert result == [10, 260]
+    assert stats["files_read"] == 3 and stats["row_groups"] == 2 and stats["bytes_read"] > 0
+
+
+def test_deleted_rows_are_masked(dataset):
+    deletes = {dataset.files[1]: DeletionVector.build([0, 30, 99])}
+
+    result = values(ScanScheduler(2).scan(dataset, ["n"], ds.field("n") >= 100, deletes=deletes))
+
+    assert result == [n for n in range(100, 300) if n not in (100, 130, 199)]
+
+
+class TrackingExecutor(ThreadPoolExecutor):
+    """Thread pool recording the peak number of tasks running at once"""
+    def __init__(self, max_workers):
+        super().__init__(max_workers)
+        self.running = self.peak = 0
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        def tracked():
+            with self.lock:
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+            time.sleep(0.02)
+            try:
+                return fn(*args)
+            finally:
+                with self.lock:
+                    self.running -= 1
+        return super().submit(tracked)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_row_groups_are_decoded_on_the_pool(dataset, max_workers):
+    scheduler = ScanScheduler(max_workers)
+    scheduler._executor = executor = TrackingExecutor(max_workers)
+
+    assert values(scheduler.scan(dataset, ["n"])) == list(range(300))
+    assert executor.peak == max_workers
+
+
+def test_early_stop_leaves_no_work_behind(dataset):
+    scheduler = ScanScheduler(2)
+    scan = scheduler.scan(dataset, ["n"])
+
+    assert next(scan).num_rows == 25
+    scan.close()
+    scheduler.shutdown()
+    assert scheduler._executor is None
+
+
+def test_engine_storage_scans_with_its_own_pool(workdir):
+    engine = TinyEngine("local_fs", max_workers=2, scan_prefetch_bytes=1024)
+    engine.query("CREATE TABLE t (n INT)")
+    for start in (0, 10, 20):
+        engine.query("INSERT INTO t VALUES " + ", ".join(f"({i})" for i in range(start, start + 10)))
+
+    assert engine.storage.scan_scheduler.max_workers == 2
+    assert engine.query("SELECT n FROM t")["n"].tolist() == list(range(30))
+    assert sorted(engine.query("SELECT SUM(n) AS s FROM t")["s"]) == [435]
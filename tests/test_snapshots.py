@@ -0,0 +1,71 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+def test_expire_snapshots_keeps_young_orphans(engine):
+    engine.query("CREATE TABLE t (id INT)")
+    for i in range(3):
+        engine.query(f"INSERT INTO t VALUES ({i})")
+    orphans = {}
+    for name, age in (("old", timedelta(days=1)), ("young", timedelta(minutes=1))):
+        path = engine.storage.base_path / f"t/2020-01-01/raw_{name}.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+        modified = (datetime.now(timezone.utc) - age).timestamp()
+        os.utime(path, (modified, modified))
+        orphans[name] = path
+
+    result = engine.expire_snapshots("t", older_than=datetime.now(timezone.utc) + timedelta(seconds=1))
+
+    assert result == {"snapshots_expired": 3, "files_removed": 0, "orphans_removed": 1}
+    assert not orphans["old"].exists() and orphans["young"].exists()
+    assert [s["operation"] for s in engine.catalog.snapshots("t")] == ["append"]
+    assert sorted(engine.query("SELECT id FROM t")["id"]) == [0, 1, 2]
+
+
+@pytest.fixture
+def history(engine):
+    """Table t after three appends of one row, with its snapshots, oldest (the create) first"""
+    engine.query("CREATE TABLE t (id INT)")
+    for i in range(3):
+        engine.query(f"INSERT INTO t VALUES ({i})")
+    return engine, engine.catalog.snapshots("t")
+
+
+def ids(engine, sql, params=None):
+    return sorted(engine.query(sql, params)["id"])
+
+
+def test_version_as_of_reads_a_snapshot(history):
+    engine, snapshots = history
+
+    assert [ids(engine, f"SELECT id FROM t FOR VERSION AS OF {s['snapshot_id']}") for s in snapshots[1:]] == [
+        [0], [0, 1], [0, 1, 2]]
+    assert ids(engine, f"SELECT id FROM t FOR VERSION AS OF {snapshots[0]['snapshot_id']}") == []
+    engine.query("DELETE FROM t WHERE id = 0")
+    assert ids(engine, f"SELECT id FROM t FOR VERSION AS OF {snapshots[-1]['snapshot_id']}") == [0, 1, 2]
+
+
+def test_system_time_as_of_reads_the_last_snapshot_before(history):
+    engine, snapshots = history
+    second = snapshots[2]["timestamp"]
+
+    assert ids(engine, f"SELECT id FROM t FOR SYSTEM_TIME AS OF TIMESTAMP '{second}'") == [0, 1]
+    assert ids(engine, f"SELECT id FROM t FOR TIMESTAMP AS OF '{second}'") == [0, 1]
+    assert ids(engine, "SELECT id FROM t FOR SYSTEM_TIME AS OF ?", [datetime.fromisoformat(second)]) == [0, 1]
+    assert ids(engine, "SELECT id FROM t FOR SYSTEM_TIME AS OF TIMESTAMP '2999-01-01 00:00:00'") == [0, 1, 2]
+
+
+def test_time_travel_to_a_missing_snapshot_is_rejected(history):
+    engine, snapshots = history
+
+    with pytest.raises(ValueError, match="has no snapshot version 999"):
+        engine.query("SELECT id FROM t FOR VERSION AS OF 999")
+    with pytest.raises(ValueError, match="has no snapshot at or before"):
+        engine.query("SELECT id FROM t FOR SYSTEM_TIME AS OF TIMESTAMP '2000-01-01 00:00:00'")
+
+    engine.expire_snapshots("t", older_than=datetime.now(timezone.utc) + timedelta(seconds=1))
+    with pytest.raises(ValueError, match="has no snapshot version"):
+        engine.query(f"SELECT id FROM t FOR VERSION AS OF {snapshots[1]['snapshot_id']}")
+    assert ids(engine, f"SELECT id FROM t FOR VERSION AS OF {snapshots[-1]['snapshot_id']}") == [0, 1, 2]
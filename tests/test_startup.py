@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from tiny_otf.config import STORAGE_BACKENDS, register_storage_backend
+from tiny_otf.engine import TinyEngine
+
+HEAVY_MODULES = ["pyarrow", "pyarrow.dataset", "pyarrow.fs", "pandas", "sqlglot", "minio"]
+
+
+def imported_modules(code, cwd):
+    """The heavy modules imported by `code`, run in a fresh interpreter"""
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).parents[1] / "src")}
+    script = f"import json, sys\n{code}\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    process = subprocess.run([sys.executable, "-c", script], cwd=cwd, env=env, capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    return set(json.loads(process.stdout.splitlines()[-1]))
+
+
+def test_cli_import_pulls_in_no_dependency(workdir):
+    assert imported_modules("import tiny_otf", workdir) == set()
+
+
+def test_cli_help_does_not_import_the_engine(workdir):
+    code = "import tiny_otf\nsys.argv = ['tiny-otf', '--help']\ntry:\n    tiny_otf.main()\nexcept SystemExit:\n    pass"
+    assert imported_modules(code, workdir) == set()
+
+
+def test_engine_backends_are_imported_on_first_use(workdir):
+    created = imported_modules("from tiny_otf.engine import TinyEngine\nTinyEngine('minio')", workdir)
+    assert not created & {"pandas", "minio", "pyarrow.dataset", "pyarrow.fs"}
+
+    queried = imported_modules("from tiny_otf.engine import TinyEngine\n"
+                               "engine = TinyEngine('local_fs')\n"
+                               "engine.query('CREATE TABLE t (id INT)')\n"
+                               "engine.query('INSERT INTO t VALUES (1)')", workdir)
+    assert "pyarrow.dataset" in queried and "minio" not in queried
+
+
+def test_catalog_and_storage_are_opened_on_first_use(workdir):
+    engine = TinyEngine("local_fs", catalog_backend="json_log")
+    assert engine._catalog is None and engine._storage is None
+
+    engine.query("CREATE TABLE t (id INT)")
+    assert engine._catalog is not None and engine._storage is None
+    engine.query("INSERT INTO t VALUES (1)")
+    assert engine.storage is engine._storage is not None
+
+
+def test_backends_are_checked_at_construction(workdir, monkeypatch):
+    with pytest.raises(ValueError, match="Unsupported storage type"):
+        TinyEngine("ftp")
+    with pytest.raises(ValueError, match="Unsupported catalog backend"):
+        TinyEngine("local_fs", catalog_backend="postgres")
+
+    monkeypatch.setitem(STORAGE_BACKENDS, "local_copy", None)  # removed again after the test
+    register_storage_backend("Local_Copy", "tiny_otf.storage.storage:LocalFSDataStorage")
+    assert type(TinyEngine("local_copy").storage).__name__ == "LocalFSDataStorage"
@@ -0,0 +1,59 @@
+import pyarrow as pa
+import pytest
+
+
+@pytest.fixture
+def numbers(engine):
+    engine.query("CREATE TABLE numbers (n INT, label VARCHAR)")
+    for start in range(0, 300, 100):
+        engine.append("numbers", pa.table({"n": pa.array(range(start, start + 100), pa.int64()),
+                                           "label": [f"l{i}" for i in range(start, start + 100)]}))
+    return engine
+
+
+def scans(events):
+    return [e for e in events if e["event"] == "scan"]
+
+
+def test_limit_scan_counts_the_row_groups_and_bytes_it_reads(numbers, events):
+    assert numbers.query("SELECT n FROM numbers LIMIT 5")["n"].tolist() == [0, 1, 2, 3, 4]
+    assert numbers.query("SELECT n FROM numbers LIMIT 5 OFFSET 150")["n"].tolist() == list(range(150, 155))
+    limited, offset = scans(events)
+
+    assert (limited["files"], limited["files_read"], limited["row_groups"]) == (3, 1, 1)
+    assert limited["bytes_read"] > 0
+    # the first file is skipped from its manifest row count
+    assert (offset["files"], offset["files_read"], offset["row_groups"]) == (2, 1, 1)
+
+    numbers.query("SELECT n FROM numbers")
+    full = scans(events)[-1]
+    assert (full["files_read"], full["row_groups"]) == (3, 3)
+    assert 0 < limited["bytes_read"] < full["bytes_read"]
+
+
+def test_limit_offset_across_files(numbers, events):
+    assert numbers.query("SELECT n FROM numbers LIMIT 10 OFFSET 95")["n"].tolist() == list(range(95, 105))
+    assert numbers.query("SELECT n FROM numbers LIMIT 5 OFFSET 298")["n"].tolist() == [298, 299]
+    assert numbers.query("SELECT n FROM numbers LIMIT 0").empty
+
+
+def test_filtered_limit_stops_at_the_first_file_with_enough_rows(numbers, events):
+    assert numbers.query("SELECT n, label FROM numbers WHERE label IN ('l7', 'l14', 'l21', 'l250') LIMIT 3").values.tolist() == [
+        [7, "l7"], [14, "l14"], [21, "l21"]]
+    assert scans(events)[-1]["files_read"] == 1
+
+
+def test_limit_skips_deleted_rows(numbers):
+    numbers.query("DELETE FROM numbers WHERE n < 3 OR n = 5")
+
+    assert numbers.query("SELECT n FROM numbers LIMIT 4")["n"].tolist() == [3, 4, 6, 7]
+    assert numbers.query("SELECT n FROM numbers LIMIT 2 OFFSET 96")["n"].tolist() == [100, 101]
+
+
+def test_limit_result_streams_from_a_reader(numbers, events):
+    reader = numbers.query("SELECT n FROM numbers LIMIT 150", result_format="reader")
+    assert isinstance(reader, pa.RecordBatchReader)
+    assert scans(events) == []  # nothing read before the batches are pulled
+
+    assert reader.read_all()["n"].to_pylist() == list(range(150))
+    assert scans(events)[-1]["files_read"] == 2